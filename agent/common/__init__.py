@@ -7,6 +7,8 @@ Các module:
 - config: Đọc và validate cấu hình từ YAML
 - logger: Logging system thống nhất
 - http_client: HTTP client để giao tiếp với backend API
+- control_channel: WebSocket control channel (heartbeat + lệnh push từ backend)
+- rule_sync: Đồng bộ rule bundle từ backend (ETag + cache trên disk)
 - models: Pydantic models cho data validation
 - system_info: Thu thập thông tin hệ thống
 """
@@ -17,6 +19,8 @@ __version__ = "1.0.0"
 from .config import AgentConfig, get_config
 from .logger import setup_logger, get_logger
 from .http_client import BackendAPIClient
+from .control_channel import ControlChannel
+from .rule_sync import RuleBundleSync
 from .models import (
     ViolationReport,
     ViolationStatus,
@@ -33,6 +37,8 @@ __all__ = [
     "setup_logger",
     "get_logger",
     "BackendAPIClient",
+    "ControlChannel",
+    "RuleBundleSync",
     "ViolationReport",
     "ViolationStatus",
     "ScanResult",
@@ -129,6 +129,24 @@ class AgentConfig:
         return self._config_data['backend'].get('retry_attempts', 3)
     
 
+    @property
+    def api_pool_size(self) -> int:
+        """HTTP connection pool size."""
+        return self._config_data['backend'].get('pool_size', 4)
+    
+
+    @property
+    def api_gzip_min_bytes(self) -> int:
+        """Gzip request body khi lớn hơn ngưỡng này (0 = tắt)."""
+        return self._config_data['backend'].get('gzip_min_bytes', 4096)
+    
+
+    @property
+    def control_channel(self) -> bool:
+        """Dùng WebSocket control channel (heartbeat + lệnh push) thay cho HTTP heartbeat."""
+        return self._config_data['backend'].get('control_channel', True)
+    
+
     # Scanner properties
     @property
     def scan_interval(self) -> int:
@@ -142,16 +160,28 @@ class AgentConfig:
         return self._config_data['scanner']['rules_path']
     
 
+    @property
+    def sync_rules(self) -> bool:
+        """Lấy active rules từ backend (rule bundle) thay vì chỉ dùng file rules_path."""
+        return self._config_data['scanner'].get('sync_rules', True)
+    
+
     @property
     def command_timeout(self) -> int:
         """Command timeout."""
         return self._config_data['scanner'].get('command_timeout', 10)
     
 
+    @property
+    def max_parallel(self) -> int:
+        """Số rules được execute song song."""
+        return max(1, int(self._config_data['scanner'].get('max_parallel', 4)))
+    
+
     @property
     def report_pass_results(self) -> bool:
-        """Report PASS results."""
-        return self._config_data['scanner'].get('report_pass_results', False)
+        """Report PASS results (backend auto-resolves the rule's open finding)."""
+        return self._config_data['scanner'].get('report_pass_results', True)
     
 
     # Logging properties
@@ -221,6 +251,7 @@ if __name__ == "__main__":
         print("\n Scanner:")
         print(f"   Interval:   {config.scan_interval}s")
         print(f"   Rules:      {config.rules_path}")
+        print(f"   Parallel:   {config.max_parallel}")
         
         print("\n Logging:")
         print(f"   Level:      {config.log_level}")
@@ -0,0 +1,166 @@
+"""
+Control Channel Module
+======================
+Kênh WebSocket lâu dài tới backend (/api/v1/agents/{id}/control).
+
+- Agent gửi {"type": "ping"} mỗi ping_interval giây → backend ghi nhận
+  heartbeat (thay cho POST /heartbeat)
+- Backend push lệnh: rules_changed, scan_now → đưa vào queue `commands`
+  để main loop xử lý
+
+Cần package `websocket-client` (agent/requirements.txt); nếu chưa cài hoặc
+chưa kết nối được, agent dùng HTTP heartbeat như cũ.
+"""
+
+import json
+import queue
+import random
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+try:
+    import websocket  # websocket-client
+except ImportError:  # Fallback về HTTP heartbeat
+    websocket = None
+
+logger = logging.getLogger("agent")
+
+# Lệnh backend có thể push xuống agent
+COMMAND_TYPES = {"rules_changed", "scan_now"}
+
+# Backoff tối đa giữa các lần reconnect (giây)
+RECONNECT_MAX_DELAY = 60.0
+
+# Không nhận được gì trong số ping_interval này → coi như mất kết nối
+MISSED_PONGS_LIMIT = 3
+
+
+class ControlChannel:
+    """
+    Kết nối control channel chạy trong một background thread.
+
+    Tự reconnect với exponential backoff + jitter (tránh cả fleet reconnect
+    cùng lúc khi backend restart). `connected` cho biết heartbeat đang đi qua
+    channel hay chưa.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        agent_id: int,
+        api_token: str = '',
+        version: str = '1.0.0',
+        ping_interval: float = 30.0,
+        timeout: int = 30
+    ):
+        base = api_url.rstrip('/')
+        if base.startswith('https://'):
+            base = 'wss://' + base[len('https://'):]
+        elif base.startswith('http://'):
+            base = 'ws://' + base[len('http://'):]
+
+        self.url = f"{base}/api/v1/agents/{agent_id}/control"
+        self.api_token = api_token
+        self.version = version
+        self.ping_interval = ping_interval
+        self.timeout = timeout
+
+        # Lệnh nhận từ backend, main loop lấy ra xử lý
+        self.commands: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+
+        self._connected = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+        self._attempt = 0
+
+    @property
+    def connected(self) -> bool:
+        """True khi channel đang mở (heartbeat đi qua ping)."""
+        return self._connected.is_set()
+
+    def start(self) -> bool:
+        """Chạy background thread. Trả về False nếu thiếu websocket-client."""
+        if websocket is None:
+            logger.warning(
+                " websocket-client not installed (pip install -r agent/requirements.txt)"
+                " - control channel disabled, using HTTP heartbeat"
+            )
+            return False
+
+        self._thread = threading.Thread(target=self._run, name="control-channel", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Đóng channel và dừng thread."""
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._session()
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning(f" Control channel error: {e}")
+            finally:
+                if self._connected.is_set():
+                    logger.info(" Control channel disconnected")
+                self._connected.clear()
+                self._ws = None
+
+            delay = min(RECONNECT_MAX_DELAY, 2 ** self._attempt)
+            self._attempt += 1
+            self._stop.wait(delay / 2 + random.uniform(0, delay / 2))
+
+    def _session(self):
+        """Một kết nối: nhận hello, rồi vừa ping vừa nhận lệnh cho tới khi đóng."""
+        header = [f"Authorization: Bearer {self.api_token}"] if self.api_token else None
+        ws = websocket.create_connection(self.url, timeout=self.timeout, header=header)
+        self._ws = ws
+
+        try:
+            hello = json.loads(ws.recv())
+            ping_interval = float(hello.get('ping_interval', self.ping_interval))
+            self._connected.set()
+            self._attempt = 0
+            logger.info(f" Control channel connected (ping every {ping_interval:.0f}s)")
+
+            next_ping = time.monotonic()
+            last_seen = time.monotonic()
+
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if now - last_seen > ping_interval * MISSED_PONGS_LIMIT:
+                    raise TimeoutError("no reply from backend")
+                if now >= next_ping:
+                    ws.send(json.dumps({'type': 'ping', 'version': self.version}))
+                    next_ping = now + ping_interval
+
+                ws.settimeout(max(0.1, next_ping - time.monotonic()))
+                try:
+                    raw = ws.recv()
+                except websocket.WebSocketTimeoutException:
+                    continue
+
+                if not raw:
+                    return  # Backend đóng kết nối
+                last_seen = time.monotonic()
+
+                message = json.loads(raw)
+                if message.get('type') in COMMAND_TYPES:
+                    logger.info(f" Received command: {message['type']}")
+                    self.commands.put(message)
+        finally:
+            ws.close()
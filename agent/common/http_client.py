@@ -2,15 +2,23 @@
 HTTP Client Module
 """
 
+import gzip
+import json
+import random
 import time
 import requests
-from typing import Optional, Dict, Any, List
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import datetime, timezone
 import logging
 from .models import ViolationReport, ScanResult
 
 logger = logging.getLogger("agent")
 
+# Status codes được retry (kèm Retry-After nếu backend gửi)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
 class BackendAPIClient:
     """Client để giao tiếp với backend API."""
     
@@ -19,18 +27,85 @@ class BackendAPIClient:
         api_url: str,
         api_token: str,
         timeout: int = 30,
-        retry_attempts: int = 3
+        retry_attempts: int = 3,
+        pool_size: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        gzip_min_bytes: int = 4096
     ):
        
         self.api_url = api_url.rstrip('/')
         self.api_token = api_token
         self.timeout = timeout
-        self.retry_attempts = retry_attempts
+        self.retry_attempts = max(1, retry_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.gzip_min_bytes = gzip_min_bytes
         
         self.headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {api_token}' if api_token else ''
         }
+        
+        # Một Session dùng chung → keep-alive, tái sử dụng TCP/TLS connection
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(self.headers)
+    
+    def close(self):
+        """Đóng connection pool."""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+
+    def _encode_body(self, data: Optional[Dict[str, Any]]) -> tuple[Optional[bytes], Dict[str, str]]:
+        """Serialize JSON body, gzip nếu lớn hơn gzip_min_bytes."""
+        if data is None:
+            return None, {}
+        
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        
+        if self.gzip_min_bytes and len(body) >= self.gzip_min_bytes:
+            compressed = gzip.compress(body, compresslevel=6)
+            logger.debug(f" Gzip request body: {len(body)} -> {len(compressed)} bytes")
+            return compressed, {'Content-Encoding': 'gzip'}
+        
+        return body, {}
+    
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """
+        Thời gian chờ trước lần retry tiếp theo.
+        
+        Ưu tiên header Retry-After của backend, nếu không có thì dùng
+        exponential backoff với jitter để tránh cả fleet retry cùng lúc.
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), self.backoff_max)
+        
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
     
 
     def _make_request(
@@ -38,22 +113,26 @@ class BackendAPIClient:
         method: str,
         endpoint: str,
         data: Optional[Dict[str, Any]] = None,
-        params: Optional[Dict[str, Any]] = None
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
     ) -> Optional[Dict[str, Any]]:
         
         url = f"{self.api_url}{endpoint}"
+        body, extra_headers = self._encode_body(data)
         
         for attempt in range(self.retry_attempts):
+            is_last_attempt = attempt == self.retry_attempts - 1
+            
             try:
                 logger.debug(f" {method} {url} (attempt {attempt + 1}/{self.retry_attempts})")
                 
-                response = requests.request(
+                response = self.session.request(
                     method=method,
                     url=url,
-                    json=data,
+                    data=body,
                     params=params,
-                    headers=self.headers,
-                    timeout=self.timeout
+                    headers=extra_headers,
+                    timeout=timeout or self.timeout
                 )
                 
                 
@@ -61,6 +140,11 @@ class BackendAPIClient:
                     logger.debug(f" Success: {response.status_code}")
                     return response.json()
                 
+                elif response.status_code == 204:
+                    # Success without body (caller must check `is not None`)
+                    logger.debug(" Success: 204")
+                    return {}
+                
                 elif response.status_code == 401:
                     logger.error("Authentication failed: Invalid token")
                     return None
@@ -73,28 +157,29 @@ class BackendAPIClient:
                     logger.warning(f"  Status {response.status_code}: {response.text}")
                     
                     
-                    if response.status_code >= 500:
-                        if attempt < self.retry_attempts - 1:
-                            wait_time = 2 ** attempt  
-                            logger.info(f" Retrying in {wait_time}s...")
-                            time.sleep(wait_time)
-                            continue
+                    if response.status_code in RETRY_STATUS_CODES and not is_last_attempt:
+                        wait_time = self._retry_delay(attempt, response)
+                        logger.info(f" Retrying in {wait_time:.1f}s...")
+                        time.sleep(wait_time)
+                        continue
                     
                     return None
             
             except requests.exceptions.Timeout:
-                logger.error(f" Timeout after {self.timeout}s")
-                if attempt < self.retry_attempts - 1:
-                    logger.info(" Retrying...")
-                    time.sleep(1)
+                logger.error(f" Timeout after {timeout or self.timeout}s")
+                if not is_last_attempt:
+                    wait_time = self._retry_delay(attempt)
+                    logger.info(f" Retrying in {wait_time:.1f}s...")
+                    time.sleep(wait_time)
                     continue
                 return None
             
             except requests.exceptions.ConnectionError:
                 logger.error(" Connection error: Backend unreachable")
-                if attempt < self.retry_attempts - 1:
-                    logger.info(" Retrying in 3s...")
-                    time.sleep(3)
+                if not is_last_attempt:
+                    wait_time = self._retry_delay(attempt)
+                    logger.info(f" Retrying in {wait_time:.1f}s...")
+                    time.sleep(wait_time)
                     continue
                 return None
             
@@ -165,7 +250,8 @@ class BackendAPIClient:
             data=heartbeat_data
         )
         
-        if response:
+        # Backend replies 204 No Content
+        if response is not None:
             logger.debug(" Heartbeat sent")
             return True
         else:
@@ -206,33 +292,68 @@ class BackendAPIClient:
             return []
     
 
+    def get_rules_bundle(
+        self,
+        os_type: str,
+        etag: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Conditional GET rule bundle (/api/v1/rules/bundle).
+        
+        Trả về (etag, bundle); bundle là None khi backend trả 304 (bundle
+        đang cache vẫn mới nhất). Lỗi → (None, None), caller dùng cache cũ.
+        """
+        headers = {'If-None-Match': etag} if etag else {}
+        
+        try:
+            response = self.session.get(
+                f"{self.api_url}/api/v1/rules/bundle",
+                params={'os_type': os_type},
+                headers=headers,
+                timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            logger.warning(f" Failed to fetch rule bundle: {e}")
+            return None, None
+        
+        if response.status_code == 304:
+            logger.debug(" Rule bundle not modified")
+            return etag, None
+        
+        if response.status_code == 200:
+            bundle = response.json()
+            logger.info(f" Fetched rule bundle {bundle.get('version')} ({bundle.get('count')} rules)")
+            return response.headers.get('ETag'), bundle
+        
+        logger.warning(f" Failed to fetch rule bundle: status {response.status_code}")
+        return None, None
+    
+
     def report_violations(
         self,
         agent_id: int,
         violations: List[ViolationReport]
-    ) -> bool:
+    ) -> Optional[Dict[str, Any]]:
         
         if not violations:
             logger.debug("No violations to report")
-            return True
+            return {"created_count": 0, "total_submitted": 0, "errors": None}
         
         logger.info(f" Reporting {len(violations)} violations for agent {agent_id}")
         
-        # Convert Pydantic models sang dict
-        violations_data = [v.model_dump() for v in violations]
+        violations_data = [v.to_backend_payload() for v in violations]
         
         response = self._make_request(
             'POST',
-            f'/api/v1/agents/{agent_id}/violations/bulk',
+            f'/api/v1/violations/agents/{agent_id}/violations/bulk',
             data={'violations': violations_data}
         )
         
-        if response:
-            logger.info(" Violations reported successfully")
-            return True
+        if response is not None:
+            logger.info(f" Bulk report accepted: {response.get('created_count', 0)}/{len(violations)}")
         else:
             logger.error(" Failed to report violations")
-            return False
+        return response
     
 
     def get_agent_violations(
@@ -261,21 +382,13 @@ class BackendAPIClient:
         
         logger.debug(" Health check...")
         
-        try:
-            response = requests.get(
-                f"{self.api_url}/health",
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                logger.debug(" Backend is healthy")
-                return True
-            else:
-                logger.warning(f"  Backend returned {response.status_code}")
-                return False
-        
-        except Exception as e:
-            logger.error(f" Backend is down: {e}")
+        response = self._make_request('GET', '/health', timeout=5)
+        
+        if response is not None:
+            logger.debug(" Backend is healthy")
+            return True
+        else:
+            logger.error(" Backend is down")
             return False
 
 
@@ -347,6 +460,8 @@ if __name__ == "__main__":
     else:
         print("    Report failed")
     
+    client.close()
+    
     print("\n" + "=" * 60)
     print(" ALL HTTP CLIENT TESTS COMPLETED!")
     print("=" * 60)
@@ -50,6 +50,25 @@ class ViolationReport(BaseModel):
         description="Thời điểm phát hiện"
     )
     raw_output: Optional[str] = Field(None, description="Output của audit command")
+    duration_ms: Optional[float] = Field(None, description="Thời gian chạy audit command (ms)")
+    
+    def to_backend_payload(self) -> dict:
+        """
+        Payload cho /violations/from-agent và bulk endpoint.
+        
+        status PASS sẽ auto-resolve finding đang mở của rule trên backend.
+        """
+        message = self.details or "Rule violation detected"
+        if self.raw_output:
+            message += f"\nRaw output: {self.raw_output[:200]}"
+        
+        return {
+            "agent_id": self.agent_id,
+            "agent_rule_id": self.rule_id,
+            "message": message,
+            "confidence_score": 1.0,
+            "status": ViolationStatus(self.status).value
+        }
     
     class Config:
         use_enum_values = True
@@ -0,0 +1,126 @@
+"""
+Rule Sync Module
+================
+Đồng bộ rule bundle từ backend (GET /api/v1/rules/bundle) và cache trên disk.
+
+- Gửi If-None-Match với ETag đã cache → backend trả 304 khi rules không đổi
+- Bundle (kèm ETag) được lưu vào cache file, dùng lại khi restart hoặc khi
+  backend không truy cập được
+- Bundle chỉ quyết định rule nào active và severity của rule. Command audit,
+  expected_output, remediation luôn lấy từ file rules local: agent chạy
+  command với quyền root, không bao giờ chạy command nhận từ backend
+"""
+
+import json
+import os
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .http_client import BackendAPIClient
+
+logger = logging.getLogger("agent")
+
+
+class RuleBundleSync:
+    """
+    Đồng bộ rules của một OS type.
+
+    sync() trả về đường dẫn file rules (format giống ubuntu_rules.json) để
+    scanner dùng: file đã merge từ bundle, hoặc file local nếu chưa từng tải
+    được bundle.
+    """
+
+    def __init__(
+        self,
+        client: BackendAPIClient,
+        os_type: str,
+        local_rules_path: str,
+        cache_path: str = ".rules_bundle.json"
+    ):
+        self.client = client
+        self.os_type = os_type
+        self.local_rules_path = Path(local_rules_path)
+        self.cache_path = Path(cache_path)
+        self.rules_path = self.cache_path.with_suffix('.rules.json')
+
+        self.etag: Optional[str] = None
+        self.bundle: Optional[Dict[str, Any]] = None
+        self._load_cache()
+
+    def _load_cache(self):
+        """Đọc bundle + ETag đã cache (bỏ qua nếu file hỏng)."""
+        if not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            self.etag = cache.get('etag')
+            self.bundle = cache.get('bundle')
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f" Ignoring invalid rule bundle cache: {e}")
+            self.etag = self.bundle = None
+
+    @staticmethod
+    def _write_json(path: Path, data: Any):
+        """Ghi file atomic (tmp + rename) để scan không đọc phải file ghi dở."""
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def _merge(self, bundle_rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Lọc file rules local theo bundle: giữ các rule active trên backend,
+        lấy severity từ bundle. Rule không có trong file local bị bỏ qua.
+        """
+        local_rules = {}
+        try:
+            with open(self.local_rules_path, 'r', encoding='utf-8') as f:
+                local_rules = {rule.get('id'): rule for rule in json.load(f)}
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f" Could not read local rules {self.local_rules_path}: {e}")
+
+        merged = []
+        for rule in bundle_rules:
+            rule_id = rule.get('agent_rule_id')
+            local = local_rules.get(rule_id)
+            if local is None or not local.get('audit_command'):
+                if rule_id:
+                    logger.warning(f" Rule {rule_id} is not in local rules - skipped")
+                continue
+
+            # check_expression của bundle bị bỏ qua: không chạy command từ xa
+            merged.append({
+                **local,
+                'severity': rule.get('severity') or local.get('severity', 'medium'),
+            })
+        return merged
+
+    def sync(self) -> str:
+        """Tải bundle nếu có thay đổi; trả về file rules để scan."""
+        etag, bundle = self.client.get_rules_bundle(self.os_type, self.etag)
+
+        if bundle is not None:
+            self.etag, self.bundle = etag, bundle
+            try:
+                self._write_json(self.cache_path, {'etag': etag, 'bundle': bundle})
+            except IOError as e:
+                logger.warning(f" Could not save rule bundle cache: {e}")
+        elif etag is None and self.bundle is not None:
+            logger.warning(" Backend unreachable - using cached rule bundle")
+
+        if self.bundle is None:
+            logger.info(f" No rule bundle yet - using local rules {self.local_rules_path}")
+            return str(self.local_rules_path)
+
+        # Ghi lại file merged khi bundle đổi, file bị xoá hoặc file rules local mới hơn
+        stale = (
+            not self.rules_path.exists()
+            or self.local_rules_path.stat().st_mtime > self.rules_path.stat().st_mtime
+        )
+        if bundle is not None or stale:
+            self._write_json(self.rules_path, self._merge(self.bundle.get('rules', [])))
+            logger.info(f" Active rules: {self.bundle.get('count')} (bundle {self.bundle.get('version')})")
+
+        return str(self.rules_path)
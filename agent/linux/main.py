@@ -12,6 +12,8 @@ Usage:
 
 import sys
 import time
+import queue
+import random
 import signal
 import argparse
 from pathlib import Path
@@ -24,10 +26,12 @@ from agent.common import (
     setup_logger,
     get_logger,
     BackendAPIClient,
+    ControlChannel,
+    RuleBundleSync,
     system_info
 )
 from agent.linux.scanner import run_scan
-from agent.linux.violation_reporter import report_violations
+from agent.linux.violation_reporter import report_violations_batch
 
 
 class LinuxAgent:
@@ -41,6 +45,8 @@ class LinuxAgent:
         self.logger = None
         self.running = False
         self.agent_id = None
+        self.channel = None
+        self.rule_sync = None
         
     def setup(self):
     
@@ -88,7 +94,9 @@ class LinuxAgent:
                 api_url=self.config.api_url,
                 api_token=self.config.api_token,
                 timeout=self.config.api_timeout,
-                retry_attempts=self.config.api_retry_attempts
+                retry_attempts=self.config.api_retry_attempts,
+                pool_size=self.config.api_pool_size,
+                gzip_min_bytes=self.config.api_gzip_min_bytes
             )
             print(f"    API client created")
         except Exception as e:
@@ -194,6 +202,43 @@ class LinuxAgent:
             self.logger.error(f"Heartbeat error: {e}")
             return False
     
+    def start_control_channel(self):
+        """Mở control channel: heartbeat qua ping, nhận rules_changed / scan_now."""
+        if not self.config.control_channel:
+            return
+        
+        self.channel = ControlChannel(
+            api_url=self.config.api_url,
+            agent_id=self.agent_id,
+            api_token=self.config.api_token,
+            timeout=self.config.api_timeout
+        )
+        if not self.channel.start():
+            self.channel = None
+    
+    def wait_for_command(self, timeout: float):
+        """Chờ lệnh từ control channel tối đa `timeout` giây (None nếu không có)."""
+        if self.channel is None:
+            time.sleep(timeout)
+            return None
+        try:
+            return self.channel.commands.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def get_rules_path(self) -> str:
+        """File rules cho lần scan này: bundle từ backend (nếu bật sync_rules) hoặc file local."""
+        if not self.config.sync_rules:
+            return self.config.rules_path
+        
+        if self.rule_sync is None:
+            self.rule_sync = RuleBundleSync(
+                client=self.client,
+                os_type=self.config.os_type,
+                local_rules_path=self.config.rules_path
+            )
+        return self.rule_sync.sync()
+    
     def run_scan_and_report(self):
        
         if not self.agent_id:
@@ -206,20 +251,23 @@ class LinuxAgent:
             
             scan_result = run_scan(
                 agent_id=self.agent_id,
-                rules_path="agent/rules/ubuntu_rules.json",
-                timeout_per_rule=30
+                rules_path=self.get_rules_path(),
+                timeout_per_rule=30,
+                max_parallel=self.config.max_parallel
             )
             
             self.logger.info(f"Scan completed: {scan_result.compliance_rate:.1f}% compliance")
             self.logger.info(f"  Pass: {scan_result.pass_count}, Fail: {scan_result.fail_count}, Error: {scan_result.error_count}")
             
            
-            if scan_result.fail_count > 0 or scan_result.error_count > 0:
+            # PASS results let the backend auto-resolve findings that were fixed
+            report_pass = self.config.report_pass_results
+            if scan_result.fail_count > 0 or scan_result.error_count > 0 or report_pass:
                 self.logger.info(" Reporting violations to backend...")
-                report_success = report_violations(
+                report_success = report_violations_batch(
                     client=self.client,
                     scan_result=scan_result,
-                    report_pass=False  
+                    report_pass=report_pass
                 )
                 
                 if report_success:
@@ -263,7 +311,7 @@ class LinuxAgent:
         print(f"=" * 60)
         print(f"    Agent ID: {self.agent_id}")
         print(f"    Hostname: {self.config.hostname}")
-        print(f"    Heartbeat interval: 60 seconds")
+        print(f"    Heartbeat: {'control channel' if self.config.control_channel else 'HTTP every 60 seconds'}")
         print(f"    Scan interval: {self.config.scan_interval} seconds")
         print(f"\n    Press Ctrl+C to stop...")
         print("=" * 60)
@@ -278,6 +326,11 @@ class LinuxAgent:
         last_heartbeat = 0
         last_scan = 0
         
+        # Scan được yêu cầu qua control channel (timestamp, None = không có)
+        scan_requested_at = None
+        
+        self.start_control_channel()
+        
         self.logger.info("Running initial compliance scan...")
         self.run_scan_and_report()
         last_scan = time.time()
@@ -286,15 +339,29 @@ class LinuxAgent:
             while self.running:
                 current_time = time.time()
                 
-                if current_time - last_heartbeat >= heartbeat_interval:
+                # Khi control channel đang mở, heartbeat đi qua ping của channel
+                channel_up = self.channel is not None and self.channel.connected
+                if not channel_up and current_time - last_heartbeat >= heartbeat_interval:
                     self.send_heartbeat()
                     last_heartbeat = current_time
                 
-                if current_time - last_scan >= scan_interval:
+                scan_due = current_time - last_scan >= scan_interval
+                if scan_due or (scan_requested_at is not None and current_time >= scan_requested_at):
                     self.run_scan_and_report()
-                    last_scan = current_time
+                    last_scan = time.time()
+                    scan_requested_at = None
                 
-                time.sleep(5)
+                command = self.wait_for_command(timeout=5)
+                if command is None:
+                    continue
+                
+                if command['type'] == 'scan_now':
+                    scan_requested_at = time.time()
+                elif command['type'] == 'rules_changed' and scan_requested_at is None:
+                    # Rải đều thời điểm re-scan để cả fleet không đồng loạt gọi backend
+                    delay = random.uniform(0, float(command.get('jitter', 0)))
+                    self.logger.info(f"Rules changed - re-scanning in {delay:.0f}s")
+                    scan_requested_at = time.time() + delay
                 
         except KeyboardInterrupt:
             print(f"\n\n    Received shutdown signal...")
@@ -313,6 +380,12 @@ class LinuxAgent:
         
         self.running = False
         
+        if self.channel:
+            self.channel.stop()
+        
+        if self.client:
+            self.client.close()
+        
         print(f"    Agent stopped")
         self.logger.info("Agent stopped successfully")
         print("=" * 60)
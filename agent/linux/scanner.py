@@ -6,6 +6,8 @@ Scanner Engine Module
 
 import json
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, UTC
 from pathlib import Path
 from typing import List, Optional
@@ -25,11 +27,14 @@ logger = get_logger(__name__)
 def run_scan(
     agent_id: int,
     rules_path: str,
-    timeout_per_rule: int = 30
+    timeout_per_rule: int = 30,
+    max_parallel: int = 4
 ) -> ScanResult:
     """
     Run full scan của tất cả rules.
-   
+    
+    Rules được execute song song (tối đa max_parallel commands cùng lúc),
+    kết quả trong ScanResult.violations vẫn giữ đúng thứ tự của rules file.
     """
     scan_started_at = datetime.now(UTC)
     
@@ -38,6 +43,7 @@ def run_scan(
     logger.info("=" * 60)
     logger.info(f"Agent ID: {agent_id}")
     logger.info(f"Rules file: {rules_path}")
+    logger.info(f"Max parallel: {max_parallel}")
     logger.info(f"Started at: {scan_started_at.isoformat()}")
     
   
@@ -61,35 +67,45 @@ def run_scan(
         logger.info("\n Scanning rules...")
         logger.info("-" * 60)
         
-        for idx, rule in enumerate(rules, 1):
-            logger.info(f"\n[{idx}/{len(rules)}] Checking {rule.rule_id}: {rule.title}")
-            logger.info(f"  Category: {rule.category} | Severity: {rule.severity}")
-            
-     
-            expected_output = expected_outputs.get(rule.rule_id)
-            
-          
-            violation = check_rule(
-                agent_id=agent_id,
-                rule=rule,
-                expected_output=expected_output,
-                timeout=timeout_per_rule
-            )
+        workers = max(1, min(max_parallel, len(rules)))
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rule") as executor:
+            futures = [
+                executor.submit(
+                    check_rule,
+                    agent_id=agent_id,
+                    rule=rule,
+                    expected_output=expected_outputs.get(rule.rule_id),
+                    timeout=timeout_per_rule
+                )
+                for rule in rules
+            ]
             
+            # Collect theo thứ tự submit để kết quả deterministic
+            for idx, (rule, future) in enumerate(zip(rules, futures), 1):
+                violation = future.result()
+                
+                logger.info(f"\n[{idx}/{len(rules)}] Checked {rule.rule_id}: {rule.title} ({violation.duration_ms:.0f}ms)")
+                logger.info(f"  Category: {rule.category} | Severity: {rule.severity}")
+                
        
-            scan_result.violations.append(violation)
-            
+                scan_result.violations.append(violation)
+                
          
-            if violation.status == ViolationStatus.PASS:
-                logger.info(f"   PASS")
-            elif violation.status == ViolationStatus.FAIL:
-                logger.warning(f"   FAIL - {violation.details}")
-            else:
-                logger.error(f"   ERROR - {violation.details}")
+                if violation.status == ViolationStatus.PASS:
+                    logger.info(f"   PASS")
+                elif violation.status == ViolationStatus.FAIL:
+                    logger.warning(f"   FAIL - {violation.details}")
+                else:
+                    logger.error(f"   ERROR - {violation.details}")
         
        
         scan_result.scan_completed_at = datetime.now(UTC)
         
+        if scan_result.violations:
+            slowest = max(scan_result.violations, key=lambda v: v.duration_ms or 0)
+            logger.info(f"\n Slowest rule: {slowest.rule_id} ({slowest.duration_ms:.0f}ms)")
+        
        
         logger.info("\n" + "=" * 60)
         logger.info(" SCAN COMPLETED")
@@ -115,12 +131,15 @@ def check_rule(
    
     logger.debug(f"  Executing: {rule.check_expression}")
     
+    started = time.perf_counter()
  
     exit_code, stdout, stderr = execute_command(
         cmd=rule.check_expression,
         timeout=timeout
     )
     
+    duration_ms = (time.perf_counter() - started) * 1000
+    
    
     if exit_code == -1:
       
@@ -152,7 +171,8 @@ def check_rule(
         rule_id=rule.rule_id,
         status=status,
         details=details,
-        raw_output=stdout if stdout else stderr
+        raw_output=stdout if stdout else stderr,
+        duration_ms=round(duration_ms, 2)
     )
     
     return violation
@@ -226,7 +246,8 @@ def test_scanner():
     scan_result = run_scan(
         agent_id=agent_id,
         rules_path=rules_path,
-        timeout_per_rule=30
+        timeout_per_rule=30,
+        max_parallel=4
     )
     
   
@@ -244,7 +265,7 @@ def test_scanner():
         print(f"\n PASSED ({len(pass_violations)} rules):")
         print("-" * 70)
         for v in pass_violations:
-            print(f"  • {v.rule_id}: {v.details}")
+            print(f"  • {v.rule_id}: {v.details} ({v.duration_ms:.0f}ms)")
     
 
     if fail_violations:
@@ -6,9 +6,11 @@ Module để report violations tới backend API.
 
 """
 
+import json
+import re
 import sys
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional
 
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
@@ -20,6 +22,12 @@ from agent.common import get_logger
 
 logger = get_logger(__name__)
 
+# Giới hạn mỗi bulk request (số violations và kích thước JSON body)
+MAX_BATCH_ITEMS = 100
+MAX_BATCH_BYTES = 256 * 1024
+
+_ERROR_INDEX_RE = re.compile(r"^Violation (\d+):")
+
 
 def report_violations(
     client: BackendAPIClient,
@@ -33,20 +41,7 @@ def report_violations(
     logger.info(f"Total violations: {len(scan_result.violations)}")
     
    
-    violations_to_report = []
-    for violation in scan_result.violations:
-        if violation.status == ViolationStatus.FAIL:
-            violations_to_report.append(violation)
-        elif violation.status == ViolationStatus.ERROR:
-            violations_to_report.append(violation)
-        elif violation.status == ViolationStatus.PASS and report_pass:
-            violations_to_report.append(violation)
-    
-    logger.info(f"Violations to report: {len(violations_to_report)}")
-    logger.info(f"  FAIL: {sum(1 for v in violations_to_report if v.status == ViolationStatus.FAIL)}")
-    logger.info(f"  ERROR: {sum(1 for v in violations_to_report if v.status == ViolationStatus.ERROR)}")
-    if report_pass:
-        logger.info(f"  PASS: {sum(1 for v in violations_to_report if v.status == ViolationStatus.PASS)}")
+    violations_to_report = _select_violations(scan_result, report_pass)
     
     if not violations_to_report:
         logger.info(" No violations to report - system is compliant!")
@@ -87,51 +82,196 @@ def report_violations(
         return True
 
 
+def _select_violations(
+    scan_result: ScanResult,
+    report_pass: bool
+) -> List[ViolationReport]:
+    """Lọc các kết quả cần report (FAIL/ERROR, và PASS nếu report_pass)."""
+    violations_to_report = []
+    for violation in scan_result.violations:
+        if violation.status == ViolationStatus.FAIL:
+            violations_to_report.append(violation)
+        elif violation.status == ViolationStatus.ERROR:
+            violations_to_report.append(violation)
+        elif violation.status == ViolationStatus.PASS and report_pass:
+            violations_to_report.append(violation)
+
+    logger.info(f"Violations to report: {len(violations_to_report)}")
+    logger.info(f"  FAIL: {sum(1 for v in violations_to_report if v.status == ViolationStatus.FAIL)}")
+    logger.info(f"  ERROR: {sum(1 for v in violations_to_report if v.status == ViolationStatus.ERROR)}")
+    if report_pass:
+        logger.info(f"  PASS: {sum(1 for v in violations_to_report if v.status == ViolationStatus.PASS)}")
+
+    return violations_to_report
+
+
 def _report_single_violation(
     client: BackendAPIClient,
     violation: ViolationReport
 ) -> bool:
-   
-    payload = {
-        "agent_id": violation.agent_id,
-        "agent_rule_id": violation.rule_id, 
-        "message": violation.details or "Rule violation detected",
-        "confidence_score": 1.0  
-    }
-    
 
-    if violation.raw_output:
-        payload["message"] += f"\nRaw output: {violation.raw_output[:200]}"
-    
+    payload = violation.to_backend_payload()
+
     logger.debug(f"  Payload: {payload}")
-    
+
     try:
-     
+
         response = client.post(
             endpoint="/api/v1/violations/from-agent",
             data=payload
         )
-        
-        if response and response.get("id"):
+
+        if response is None:
+            logger.error("  No response from backend")
+            return False
+
+        if violation.status == ViolationStatus.PASS:
+            # PASS chỉ resolve finding đang mở; 204 (không có gì để resolve) → {}
+            return True
+
+        # FAIL/ERROR: backend phải trả về violation đã tạo/cập nhật
+        if response.get("id"):
             logger.debug(f"  Backend violation ID: {response.get('id')}")
             return True
-        else:
-            logger.error(f"  Invalid response from backend: {response}")
-            return False
-            
+
+        logger.error(f"  Invalid response from backend: {response}")
+        return False
+
     except Exception as e:
         logger.error(f"  Failed to report violation: {e}")
         return False
 
 
+def _chunk_violations(
+    violations: List[ViolationReport],
+    max_items: int = MAX_BATCH_ITEMS,
+    max_bytes: int = MAX_BATCH_BYTES
+) -> List[List[ViolationReport]]:
+    """
+    Chia violations thành các chunk theo số lượng và kích thước JSON body.
+
+    Một violation lớn hơn max_bytes vẫn được gửi riêng trong một chunk.
+    """
+    chunks = []
+    current = []
+    current_bytes = 0
+
+    for violation in violations:
+        size = len(json.dumps(violation.to_backend_payload()).encode('utf-8'))
+
+        if current and (len(current) >= max_items or current_bytes + size > max_bytes):
+            chunks.append(current)
+            current = []
+            current_bytes = 0
+
+        current.append(violation)
+        current_bytes += size
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+def _failed_indexes(response: Dict[str, Any], chunk_size: int) -> Optional[List[int]]:
+    """
+    Lấy index của các item bị lỗi trong một bulk response.
+
+    Trả về None nếu response không cho biết item nào lỗi (coi như cả chunk lỗi).
+    """
+    results = response.get("results")
+    if isinstance(results, list) and len(results) == chunk_size:
+        return [i for i, item in enumerate(results) if item.get("status") == "error"]
+    
+    failed = set()
+
+    for error in response.get("errors") or []:
+        match = _ERROR_INDEX_RE.match(str(error))
+        if not match:
+            return None
+        failed.add(int(match.group(1)))
+
+    created = response.get("created_count")
+    if created is None or created + len(failed) != chunk_size:
+        return None
+
+    return sorted(failed)
+
+
 def report_violations_batch(
     client: BackendAPIClient,
     scan_result: ScanResult,
-    report_pass: bool = False
+    report_pass: bool = False,
+    max_items: int = MAX_BATCH_ITEMS,
+    max_bytes: int = MAX_BATCH_BYTES
 ) -> bool:
-   
-    logger.warning("Batch reporting not implemented yet - falling back to individual reporting")
-    return report_violations(client, scan_result, report_pass=report_pass)
+    """
+    Report violations qua bulk endpoint.
+
+    Violations được chia chunk theo max_items/max_bytes. Chỉ những item bị
+    backend từ chối (hoặc cả chunk nếu request thất bại) mới được gửi lại
+    từng cái qua /violations/from-agent.
+    """
+    logger.info("=" * 60)
+    logger.info("REPORTING VIOLATIONS TO BACKEND (BULK)")
+    logger.info("=" * 60)
+    logger.info(f"Total violations: {len(scan_result.violations)}")
+
+    violations_to_report = _select_violations(scan_result, report_pass)
+
+    if not violations_to_report:
+        logger.info(" No violations to report - system is compliant!")
+        return True
+
+    chunks = _chunk_violations(violations_to_report, max_items, max_bytes)
+    logger.info(f"Sending {len(violations_to_report)} violations in {len(chunks)} request(s)")
+
+    success_count = 0
+    retry_violations = []
+
+    for idx, chunk in enumerate(chunks, 1):
+        response = client.report_violations(scan_result.agent_id, chunk)
+
+        if response is None:
+            logger.warning(f"  Chunk {idx}/{len(chunks)} failed - falling back for {len(chunk)} item(s)")
+            retry_violations.extend(chunk)
+            continue
+
+        failed = _failed_indexes(response, len(chunk))
+        if failed is None:
+            logger.warning(f"  Chunk {idx}/{len(chunks)}: unexpected response {response}")
+            retry_violations.extend(chunk)
+            continue
+
+        success_count += len(chunk) - len(failed)
+        if failed:
+            logger.warning(f"  Chunk {idx}/{len(chunks)}: {len(failed)} item(s) rejected")
+            for error in response.get("errors") or []:
+                logger.debug(f"    {error}")
+            retry_violations.extend(chunk[i] for i in failed if i < len(chunk))
+
+    failed_count = 0
+    if retry_violations:
+        logger.info(f"\nFalling back to individual reporting for {len(retry_violations)} violation(s)")
+        for violation in retry_violations:
+            if _report_single_violation(client, violation):
+                success_count += 1
+            else:
+                failed_count += 1
+
+    logger.info("\n" + "=" * 60)
+    logger.info("REPORTING SUMMARY")
+    logger.info("=" * 60)
+    logger.info(f"Total violations: {len(violations_to_report)}")
+    logger.info(f" Reported successfully: {success_count}")
+    logger.info(f" Failed to report: {failed_count}")
+
+    if failed_count > 0:
+        logger.warning(f" {failed_count} violation(s) failed to report")
+        return False
+    else:
+        logger.info(" All violations reported successfully!")
+        return True
 
 
 def test_violation_reporter():
@@ -160,7 +300,9 @@ def test_violation_reporter():
         api_url=config.api_url,
         api_token=config.api_token,
         timeout=config.api_timeout,
-        retry_attempts=config.api_retry_attempts
+        retry_attempts=config.api_retry_attempts,
+        pool_size=config.api_pool_size,
+        gzip_min_bytes=config.api_gzip_min_bytes
     )
     
 
@@ -234,7 +376,7 @@ def test_violation_reporter():
     print("Testing violation reporting...")
     print("=" * 70)
     
-    success = report_violations(
+    success = report_violations_batch(
         client=client,
         scan_result=scan_result,
         report_pass=False 
@@ -119,7 +119,9 @@ class AgentSetup:
             'api_url': backend_url,
             'api_token': api_token,
             'timeout': 30,
-            'retry_attempts': 3
+            'retry_attempts': 3,
+            'pool_size': 4,
+            'gzip_min_bytes': 4096
         }
         
         print("\n Backend configuration saved\n")
@@ -188,7 +190,8 @@ class AgentSetup:
             'scan_interval': scan_interval,
             'rules_path': rules_path,
             'command_timeout': 10,
-            'report_pass_results': False
+            'max_parallel': 4,
+            'report_pass_results': True
         }
         
         self.config_data['logging'] = {
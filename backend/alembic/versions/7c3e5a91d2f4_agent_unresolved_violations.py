@@ -0,0 +1,43 @@
+"""agent_unresolved_violations
+
+Revision ID: 7c3e5a91d2f4
+Revises: 49422152bd1b
+Create Date: 2026-10-17 09:12:40.512381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e5a91d2f4'
+down_revision: Union[str, Sequence[str], None] = '49422152bd1b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('agents',
+        sa.Column('unresolved_violations', sa.Integer(), nullable=False, server_default='0')
+    )
+    
+    # Backfill counters from existing violations
+    op.execute("""
+        UPDATE agents
+        SET unresolved_violations = counts.unresolved
+        FROM (
+            SELECT agent_id, COUNT(*) AS unresolved
+            FROM violations
+            WHERE resolved_at IS NULL
+            GROUP BY agent_id
+        ) AS counts
+        WHERE agents.id = counts.agent_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('agents', 'unresolved_violations')
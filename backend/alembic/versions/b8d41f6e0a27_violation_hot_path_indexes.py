@@ -0,0 +1,83 @@
+"""violation_hot_path_indexes
+
+Revision ID: b8d41f6e0a27
+Revises: 7c3e5a91d2f4
+Create Date: 2026-10-17 10:02:17.348210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d41f6e0a27'
+down_revision: Union[str, Sequence[str], None] = '7c3e5a91d2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fail early with a clear message instead of a unique-violation error
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT hostname FROM agents GROUP BY hostname HAVING COUNT(*) > 1 LIMIT 5"
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"Duplicate agent hostnames must be merged before adding the unique index: {duplicates}"
+        )
+    
+    # CONCURRENTLY keeps the violations table writable while indexes build
+    with op.get_context().autocommit_block():
+        # List / keyset paging by agent, by rule and globally (newest first)
+        op.create_index('ix_violations_agent_id_detected_at', 'violations',
+                        ['agent_id', sa.text('detected_at DESC'), sa.text('id DESC')],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_violations_rule_id_detected_at', 'violations',
+                        ['rule_id', sa.text('detected_at DESC'), sa.text('id DESC')],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_violations_detected_at_id', 'violations',
+                        [sa.text('detected_at DESC'), sa.text('id DESC')],
+                        postgresql_concurrently=True, if_not_exists=True)
+        
+        # Open findings per agent (compliance recount, unresolved filters)
+        op.create_index('ix_violations_unresolved_agent_id', 'violations', ['agent_id'],
+                        postgresql_where=sa.text('resolved_at IS NULL'),
+                        postgresql_concurrently=True, if_not_exists=True)
+        
+        # Covered by the composite indexes above (same leading column)
+        op.drop_index('ix_violations_agent_id', table_name='violations',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_violations_rule_id', table_name='violations',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_violations_detected_at', table_name='violations',
+                      postgresql_concurrently=True, if_exists=True)
+    
+    # Hostname is the registration upsert key
+    op.drop_index('ix_agents_hostname', table_name='agents')
+    op.create_index('ix_agents_hostname', 'agents', ['hostname'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_agents_hostname', table_name='agents')
+    op.create_index('ix_agents_hostname', 'agents', ['hostname'], unique=False)
+    
+    with op.get_context().autocommit_block():
+        op.create_index('ix_violations_detected_at', 'violations', ['detected_at'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_violations_rule_id', 'violations', ['rule_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_violations_agent_id', 'violations', ['agent_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        
+        op.drop_index('ix_violations_unresolved_agent_id', table_name='violations',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_violations_detected_at_id', table_name='violations',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_violations_rule_id_detected_at', table_name='violations',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_violations_agent_id_detected_at', table_name='violations',
+                      postgresql_concurrently=True, if_exists=True)
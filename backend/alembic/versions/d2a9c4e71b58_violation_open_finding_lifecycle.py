@@ -0,0 +1,99 @@
+"""violation_open_finding_lifecycle
+
+Revision ID: d2a9c4e71b58
+Revises: b8d41f6e0a27
+Create Date: 2026-10-17 11:20:05.913402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a9c4e71b58'
+down_revision: Union[str, Sequence[str], None] = 'b8d41f6e0a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('violations',
+        sa.Column('last_seen_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True)
+    )
+    op.add_column('violations',
+        sa.Column('occurrence_count', sa.Integer(), nullable=False, server_default='1')
+    )
+    op.execute("UPDATE violations SET last_seen_at = detected_at")
+    
+    # Collapse duplicate open findings: keep the first row per (agent, rule),
+    # fold the others into its last_seen_at / occurrence_count, then drop them
+    op.execute("""
+        UPDATE violations
+        SET last_seen_at = dup.last_seen_at,
+            occurrence_count = dup.occurrences
+        FROM (
+            SELECT MIN(id) AS keep_id, MAX(detected_at) AS last_seen_at, COUNT(*) AS occurrences
+            FROM violations
+            WHERE resolved_at IS NULL
+            GROUP BY agent_id, rule_id
+            HAVING COUNT(*) > 1
+        ) AS dup
+        WHERE violations.id = dup.keep_id
+    """)
+    op.execute("""
+        DELETE FROM violations v
+        USING (
+            SELECT agent_id, rule_id, MIN(id) AS keep_id
+            FROM violations
+            WHERE resolved_at IS NULL
+            GROUP BY agent_id, rule_id
+            HAVING COUNT(*) > 1
+        ) AS dup
+        WHERE v.resolved_at IS NULL
+          AND v.agent_id = dup.agent_id
+          AND v.rule_id = dup.rule_id
+          AND v.id <> dup.keep_id
+    """)
+    
+    # Recount unresolved counters and compliance after the dedup
+    op.execute("""
+        UPDATE agents
+        SET unresolved_violations = counts.unresolved,
+            compliance_rate = CASE
+                WHEN rules.total = 0 THEN 100.0
+                WHEN counts.unresolved >= rules.total THEN 0.0
+                ELSE ROUND(((rules.total - counts.unresolved) * 100.0 / rules.total)::numeric, 2)
+            END
+        FROM (
+            SELECT a.id AS agent_id, COUNT(v.id) AS unresolved
+            FROM agents a
+            LEFT JOIN violations v ON v.agent_id = a.id AND v.resolved_at IS NULL
+            GROUP BY a.id
+        ) AS counts,
+        (SELECT COUNT(*) AS total FROM rules WHERE active) AS rules
+        WHERE agents.id = counts.agent_id
+    """)
+    
+    with op.get_context().autocommit_block():
+        # One open finding per (agent, rule); also serves open-per-agent lookups
+        op.create_index('uq_violations_open_finding', 'violations', ['agent_id', 'rule_id'],
+                        unique=True, postgresql_where=sa.text('resolved_at IS NULL'),
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_violations_unresolved_agent_id', table_name='violations',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_violations_unresolved_agent_id', 'violations', ['agent_id'],
+                        postgresql_where=sa.text('resolved_at IS NULL'),
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('uq_violations_open_finding', table_name='violations',
+                      postgresql_concurrently=True, if_exists=True)
+    
+    op.drop_column('violations', 'occurrence_count')
+    op.drop_column('violations', 'last_seen_at')
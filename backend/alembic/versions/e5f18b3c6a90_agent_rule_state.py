@@ -0,0 +1,47 @@
+"""agent_rule_state
+
+Revision ID: e5f18b3c6a90
+Revises: d2a9c4e71b58
+Create Date: 2026-10-17 12:41:33.207615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f18b3c6a90'
+down_revision: Union[str, Sequence[str], None] = 'd2a9c4e71b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Latest check result per (agent, rule)
+    op.create_table('agent_rule_state',
+        sa.Column('agent_id', sa.Integer(), nullable=False),
+        sa.Column('rule_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=5), nullable=False),
+        sa.Column('checked_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('output_hash', sa.String(length=16), nullable=True),
+        sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['rule_id'], ['rules.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('agent_id', 'rule_id')
+    )
+    
+    # Seed FAIL state from open findings; PASS is only known after the next scan
+    op.execute("""
+        INSERT INTO agent_rule_state (agent_id, rule_id, status, checked_at)
+        SELECT agent_id, rule_id, 'FAIL', COALESCE(last_seen_at, detected_at, now())
+        FROM violations
+        WHERE resolved_at IS NULL AND agent_id IS NOT NULL AND rule_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('agent_rule_state')
@@ -0,0 +1,35 @@
+"""agent_offline_sweep_index
+
+Revision ID: f3b72d8e1c45
+Revises: e5f18b3c6a90
+Create Date: 2026-10-17 14:08:52.611384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b72d8e1c45'
+down_revision: Union[str, Sequence[str], None] = 'e5f18b3c6a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only online agents are indexed, so the sweep scans just the stale ones
+    with op.get_context().autocommit_block():
+        op.create_index('ix_agents_online_last_seen', 'agents',
+                        [sa.text('coalesce(last_heartbeat, last_checkin)')],
+                        postgresql_where=sa.text('is_online'),
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_agents_online_last_seen', table_name='agents',
+                      postgresql_concurrently=True, if_exists=True)
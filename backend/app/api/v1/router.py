@@ -7,6 +7,7 @@ from app.modules.agents.router import router as agents_router
 from app.modules.violations.router import router as violations_router
 from app.modules.websocket.router import router as websocket_router
 from app.modules.reports.router import router as reports_router
+from app.modules.compliance.router import router as compliance_router
 
 api_router = APIRouter(prefix="/api/v1")
 
@@ -17,4 +18,5 @@ api_router.include_router(agents_router)
 api_router.include_router(violations_router)
 api_router.include_router(websocket_router, tags=["WebSocket"])
 api_router.include_router(reports_router)
+api_router.include_router(compliance_router)
 
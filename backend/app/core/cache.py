@@ -0,0 +1,95 @@
+"""In-process caching helpers."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _InFlight:
+    """A computation in progress that other callers can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlightCache:
+    """
+    TTL cache where concurrent misses for the same key share one computation.
+
+    Thread-safe, so it can be used from sync FastAPI handlers running in the
+    threadpool. invalidate() bumps a generation counter, so a result that was
+    being computed while the data changed is returned to its waiters but not
+    stored.
+
+    Expired entries are dropped whenever a new value is stored, and with
+    max_entries the least recently used entries are evicted beyond that
+    bound, so caches keyed by request parameters stay bounded.
+    """
+
+    def __init__(self, ttl: float, max_entries: Optional[int] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, _InFlight] = {}
+        self._generation = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return cached value for key, computing it at most once concurrently."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[0]
+
+            inflight = self._inflight.get(key)
+            is_leader = inflight is None
+            if is_leader:
+                inflight = _InFlight()
+                self._inflight[key] = inflight
+                generation = self._generation
+
+        if not is_leader:
+            inflight.event.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.value
+
+        try:
+            value = compute()
+        except BaseException as e:
+            inflight.error = e
+            raise
+        else:
+            inflight.value = value
+            with self._lock:
+                if generation == self._generation and self.ttl > 0:
+                    self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.event.set()
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        """Store value (lock held), dropping expired and least recently used entries."""
+        now = time.monotonic()
+        for stale_key in [k for k, (_, expires) in self._entries.items() if expires <= now]:
+            del self._entries[stale_key]
+
+        self._entries[key] = (value, now + self.ttl)
+        self._entries.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or every key when key is None."""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -3,7 +3,45 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     DATABASE_URL: str
     
+    # Connection pools. The sync and the async engine each have their own pool,
+    # so one worker can open up to
+    #   DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW
+    # connections (30 by default); keep workers x that below max_connections.
+    DB_POOL_SIZE: int = 5                  # Persistent connections, sync engine
+    DB_MAX_OVERFLOW: int = 10              # Extra connections under burst load, sync engine
+    DB_ASYNC_POOL_SIZE: int = 5            # Persistent connections, async engine
+    DB_ASYNC_MAX_OVERFLOW: int = 10        # Extra connections under burst load, async engine
+    DB_POOL_TIMEOUT: float = 30.0          # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800            # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True          # Check connections before use (drops stale ones)
+    
+    # Dashboard statistics
+    STATS_CACHE_TTL: float = 30.0          # Seconds /violations/stats stays cached
+    STATS_PUSH_DEBOUNCE: float = 2.0       # Seconds to coalesce changes into one stats_changed event
+    
+    # WebSocket fan-out
+    WS_SEND_QUEUE_SIZE: int = 256          # Outbound messages buffered per client
+    WS_SLOW_CLIENT_POLICY: str = "drop_oldest"  # When a client's queue is full: drop_oldest | disconnect
+    WS_COALESCE_WINDOW: float = 0.25       # Seconds to merge violation events into one batch message
+    WS_REPLAY_BUFFER: int = 1000           # Recent events kept per worker for resume_from replay
+    EVENT_BUS: str = "inprocess"           # Relay events between workers: inprocess | postgres (LISTEN/NOTIFY)
+    EVENT_BUS_CHANNEL: str = "baseline_monitor_events"  # NOTIFY channel for the postgres bus
+    
+    # Agents
+    HEARTBEAT_FLUSH_INTERVAL: float = 5.0  # Seconds between batched heartbeat writes
+    AGENT_OFFLINE_GRACE: float = 180.0     # Seconds without a heartbeat before an agent is offline
+    AGENT_SWEEP_INTERVAL: float = 30.0     # Seconds between offline sweeps
+    AGENT_PING_INTERVAL: float = 30.0      # Seconds between agent pings (heartbeats) on the control channel
+    AGENT_RULES_SYNC_JITTER: float = 30.0  # Agents spread rule refetches over this window after rules_changed
+    
+    # Rules
+    RULE_BUNDLE_CACHE_TTL: float = 3600.0  # Seconds a rule bundle stays cached (also dropped on any rule change)
+    
+    # Reports
+    REPORT_CACHE_TTL: float = 60.0         # Seconds a PDF report dataset stays cached
+    REPORT_CACHE_MAX_ENTRIES: int = 32     # Report datasets kept at once (keys come from query params)
+    
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
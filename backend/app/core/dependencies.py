@@ -1,7 +1,8 @@
 """Global dependencies for FastAPI."""
-from typing import Generator
+from typing import AsyncGenerator, Generator
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, AsyncSessionLocal
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -18,3 +19,19 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency to get an async database session.
+    
+    Use in `async def` handlers; a sync Session there would block the
+    event loop on every query.
+    
+    Usage:
+        @app.get("/endpoint")
+        async def endpoint(db: AsyncSession = Depends(get_async_db)):
+            result = await db.execute(...)
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
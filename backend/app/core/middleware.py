@@ -0,0 +1,68 @@
+"""Custom ASGI middleware."""
+import zlib
+
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class GZipRequestMiddleware:
+    """
+    Decompress request bodies sent with `Content-Encoding: gzip`.
+
+    Agents gzip large payloads (e.g. bulk violation reports). Decompressed
+    size is capped by max_body_size to guard against gzip bombs.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int = 10 * 1024 * 1024):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if headers.get(b"content-encoding", b"").lower() != b"gzip":
+            await self.app(scope, receive, send)
+            return
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = []
+        size = 0
+        more_body = True
+
+        try:
+            while more_body:
+                message = await receive()
+                more_body = message.get("more_body", False)
+                chunk = decompressor.decompress(message.get("body", b""), self.max_body_size - size + 1)
+                size += len(chunk)
+                if size > self.max_body_size or decompressor.unconsumed_tail:
+                    response = PlainTextResponse("Request body too large", status_code=413)
+                    await response(scope, receive, send)
+                    return
+                chunks.append(chunk)
+            chunks.append(decompressor.flush())
+        except zlib.error:
+            response = PlainTextResponse("Invalid gzip request body", status_code=400)
+            await response(scope, receive, send)
+            return
+
+        body = b"".join(chunks)
+        scope = dict(scope)
+        scope["headers"] = [
+            (key, value) for key, value in scope["headers"]
+            if key not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode())]
+
+        body_sent = False
+
+        async def receive_decompressed() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, receive_decompressed, send)
@@ -0,0 +1,62 @@
+"""Keyset (cursor) pagination helpers."""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from fastapi import HTTPException, Response, status
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+T = TypeVar("T")
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], *types: type) -> Optional[Tuple]:
+    """
+    Decode a cursor produced by encode_cursor() into a typed key tuple.
+
+    Returns None when no cursor was given. Raises 400 if the cursor is
+    malformed or does not match the expected key shape.
+    """
+    if not cursor:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("cursor shape mismatch")
+        return tuple(
+            datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for kind, value in zip(types, payload)
+        )
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def paginate(
+    response: Response,
+    items: Sequence[T],
+    limit: int,
+    key: Callable[[T], Tuple]
+) -> List[T]:
+    """
+    Trim a page fetched with one look-ahead row (limit + 1) and set the
+    next-page cursor header if there are more rows.
+    """
+    page = list(items[:limit])
+    if len(items) > limit and page:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(page[-1]))
+    return page
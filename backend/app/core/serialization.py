@@ -0,0 +1,43 @@
+"""Fast JSON encoding for API responses and WebSocket events."""
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(value: Any):
+    """Encode values the stdlib json module does not handle natively."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with json_dumps.
+
+    Only for routes without a response_model. With the FastAPI version
+    pinned in requirements.txt (0.143), routes with a response_model and
+    the default response class are serialized straight to JSON bytes by
+    pydantic-core; setting any response class (this one included) turns
+    that path off. Older FastAPI releases (e.g. 0.115) still run those
+    routes through jsonable_encoder + json.dumps, so keep the pin.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
@@ -0,0 +1,50 @@
+"""Newline-delimited JSON (NDJSON) streaming for large list endpoints."""
+from typing import Callable, Iterator, Type
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Query, Session
+
+from app.core.database import SessionLocal
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Rows fetched per round trip (server-side cursor) and flushed per chunk
+STREAM_BATCH_ROWS = 500
+
+
+def wants_ndjson(request: Request, stream: bool = False) -> bool:
+    """True if the client opted into NDJSON via ?stream=true or the Accept header."""
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _ndjson_rows(build_query: Callable[[Session], Query], schema: Type[BaseModel]) -> Iterator[bytes]:
+    """
+    Encode query rows as NDJSON, one chunk per STREAM_BATCH_ROWS rows.
+
+    Uses its own session: the request-scoped one may be closed before the
+    response body is sent.
+    """
+    db = SessionLocal()
+    try:
+        chunk = []
+        for row in build_query(db).yield_per(STREAM_BATCH_ROWS):
+            chunk.append(schema.model_validate(row).model_dump_json())
+            if len(chunk) == STREAM_BATCH_ROWS:
+                yield ("\n".join(chunk) + "\n").encode("utf-8")
+                chunk = []
+        if chunk:
+            yield ("\n".join(chunk) + "\n").encode("utf-8")
+    finally:
+        db.close()
+
+
+def ndjson_response(build_query: Callable[[Session], Query], schema: Type[BaseModel]) -> StreamingResponse:
+    """
+    Stream the rows of build_query(db) as NDJSON, serialized with `schema`.
+
+    Rows are read with yield_per, so memory use and time to first byte do
+    not depend on the result size.
+    """
+    return StreamingResponse(_ndjson_rows(build_query, schema), media_type=NDJSON_MEDIA_TYPE)
@@ -1,27 +1,49 @@
 """
 Baseline Monitor API - Main application.
 """
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.router import api_router
 from app.core.database import engine, Base
+from app.core.middleware import GZipRequestMiddleware
+from app.core.pagination import NEXT_CURSOR_HEADER
 
 # Import all models to ensure they're registered with SQLAlchemy
 from app.modules.users.models import User
 from app.modules.rules.models import Rule
 from app.modules.agents.models import Agent
 from app.modules.violations.models import Violation
+from app.modules.agents.service import control_hub, heartbeat_buffer, offline_sweeper
+from app.modules.websocket.service import manager
 
 # Create all tables (for development - in production use Alembic migrations)
 # Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start/stop background tasks."""
+    await manager.start()
+    await control_hub.start()
+    heartbeat_buffer.start()
+    offline_sweeper.start()
+    yield
+    await offline_sweeper.stop()
+    await control_hub.stop()
+    await heartbeat_buffer.stop()
+    await manager.stop()
+
+
 app = FastAPI(
     title="Baseline Monitor API",
     version="1.0.0",
     description="CIS Compliance Monitoring System",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -31,8 +53,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # Let browsers read the pagination cursor
 )
 
+# Accept gzip-compressed request bodies from agents
+app.add_middleware(GZipRequestMiddleware)
+
 # Include API v1 router
 app.include_router(api_router)
 
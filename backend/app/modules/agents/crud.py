@@ -1,6 +1,9 @@
 """Agent CRUD operations."""
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
+from sqlalchemy import update, select, case, cast, Numeric
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import Optional, List
 from datetime import datetime
 from fastapi import HTTPException, status
@@ -20,56 +23,81 @@ def get_agent(db: Session, agent_id: int) -> Agent:
     return db_agent
 
 
+async def get_agent_async(db: AsyncSession, agent_id: int) -> Agent:
+    """Get agent by ID (async session). Raises 404 if not found."""
+    db_agent = await db.get(Agent, agent_id)
+    if not db_agent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Agent with id {agent_id} not found"
+        )
+    return db_agent
+
+
 def get_agent_by_hostname(db: Session, hostname: str) -> Optional[Agent]:
     """Get agent by hostname."""
     return db.query(Agent).filter(Agent.hostname == hostname).first()
 
 
-def get_agents(
+def agents_query(
     db: Session,
-    skip: int = 0,
-    limit: int = 100,
     is_online: Optional[bool] = None,
-    os: Optional[str] = None
-) -> List[Agent]:
-    """Get list of agents with optional filters."""
+    os: Optional[str] = None,
+    after_id: Optional[int] = None
+):
+    """Filtered agents query ordered by id (see get_agents)."""
     query = db.query(Agent)
     
+    if after_id is not None:
+        query = query.filter(Agent.id > after_id)
+    
     if is_online is not None:
         query = query.filter(Agent.is_online == is_online)
     
     if os:
         query = query.filter(Agent.os.ilike(f"%{os}%"))
     
-    return query.offset(skip).limit(limit).all()
+    return query.order_by(Agent.id)
+
+
+def get_agents(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    is_online: Optional[bool] = None,
+    os: Optional[str] = None,
+    after_id: Optional[int] = None
+) -> List[Agent]:
+    """Get list of agents with optional filters, ordered by id (keyset after `after_id`)."""
+    return agents_query(db, is_online, os, after_id).offset(skip).limit(limit).all()
 
 
 def create_agent(db: Session, agent: AgentCreate) -> Agent:
     """
     Register new agent or update existing one (UPSERT).
+    
+    Single INSERT ... ON CONFLICT (hostname) DO UPDATE on the unique
+    hostname index, so concurrent registrations cannot create duplicates.
     """
-    # Check if agent with this hostname already exists
-    existing_agent = get_agent_by_hostname(db, agent.hostname)
-    
-    if existing_agent:
-        # Agent exists → Update information
-        existing_agent.ip_address = agent.ip_address
-        existing_agent.os = agent.os
-        existing_agent.version = agent.version
-        existing_agent.is_online = True
-        existing_agent.last_checkin = datetime.now()
-        
-        db.commit()
-        db.refresh(existing_agent)
-        return existing_agent
-    
-    # Agent doesn't exist → Create new
-    db_agent = Agent(
-        **agent.model_dump(),
+    agent_data = agent.model_dump()
+    
+    stmt = pg_insert(Agent).values(
+        **agent_data,
         is_online=True,
-        last_checkin=datetime.now()
+        last_checkin=func.now()
     )
-    db.add(db_agent)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Agent.hostname],
+        set_={
+            "ip_address": stmt.excluded.ip_address,
+            "os": stmt.excluded.os,
+            "version": stmt.excluded.version,
+            "is_online": True,
+            "last_checkin": func.now(),
+        }
+    ).returning(Agent)
+    
+    db_agent = db.scalars(stmt, execution_options={"populate_existing": True}).one()
     db.commit()
     db.refresh(db_agent)
     return db_agent
@@ -95,6 +123,26 @@ def update_agent(db: Session, agent_id: int, agent_update: AgentUpdate) -> Agent
     return db_agent
 
 
+async def update_agent_async(db: AsyncSession, agent_id: int, agent_update: AgentUpdate) -> Agent:
+    """Update agent (async session). Raises 404 if not found."""
+    db_agent = await get_agent_async(db, agent_id)
+    
+    update_data = agent_update.model_dump(exclude_unset=True)
+    
+    if not update_data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No fields to update"
+        )
+    
+    for field, value in update_data.items():
+        setattr(db_agent, field, value)
+    
+    await db.commit()
+    await db.refresh(db_agent)
+    return db_agent
+
+
 def delete_agent(db: Session, agent_id: int) -> None:
     """Delete agent. Raises 404 if not found."""
     db_agent = get_agent(db, agent_id)  # ← Auto raise 404
@@ -103,6 +151,14 @@ def delete_agent(db: Session, agent_id: int) -> None:
     db.commit()
 
 
+async def delete_agent_async(db: AsyncSession, agent_id: int) -> None:
+    """Delete agent (async session). Raises 404 if not found."""
+    db_agent = await get_agent_async(db, agent_id)
+    
+    await db.delete(db_agent)
+    await db.commit()
+
+
 def update_agent_heartbeat(
     db: Session,
     agent_id: int,
@@ -132,40 +188,84 @@ def get_total_agents_count(db: Session) -> int:
     return db.query(Agent).count()
 
 
+def _compliance_rate(total_rules: int, unresolved_violations: int) -> float:
+    """Compliance = (Total Active Rules - Unresolved Violations) / Total Active Rules * 100"""
+    if total_rules == 0:
+        return 100.0  # No rules = 100% compliant
+    return round(max(0, (total_rules - unresolved_violations) / total_rules * 100), 2)
+
+
 def calculate_agent_compliance(db: Session, agent_id: int) -> float:
     """
     Calculate compliance rate for an agent.
     
-    Compliance = (Total Active Rules - Unresolved Violations) / Total Active Rules * 100
+    Uses the maintained unresolved_violations counter and the cached
+    active-rule count, so no COUNT(*) query is issued.
     
     Returns:
         float: Compliance percentage (0-100)
     """
-    from app.modules.rules.models import Rule
-    from app.modules.violations.models import Violation
+    from app.modules.rules.crud import get_active_rules_count
+    
+    db_agent = get_agent(db, agent_id)
+    return _compliance_rate(get_active_rules_count(db), db_agent.unresolved_violations or 0)
+
+
+def _unresolved_delta_stmt(agent_id: int, delta: int):
+    """UPDATE bumping the unresolved counter (clamped at 0), returning the new value."""
+    return (
+        update(Agent)
+        .where(Agent.id == agent_id)
+        .values(unresolved_violations=case(
+            (Agent.unresolved_violations + delta < 0, 0),
+            else_=Agent.unresolved_violations + delta
+        ))
+        .returning(Agent.unresolved_violations)
+    )
+
+
+def _compliance_rate_stmt(agent_id: int, total_rules: int, unresolved: int):
+    """UPDATE setting compliance_rate from the counter value."""
+    return (
+        update(Agent)
+        .where(Agent.id == agent_id)
+        .values(compliance_rate=_compliance_rate(total_rules, unresolved))
+    )
+
+
+def apply_unresolved_delta(db: Session, agent_id: int, delta: int) -> None:
+    """
+    Adjust agent's unresolved violation counter and compliance rate.
     
-    # Get total active rules
-    total_rules = db.query(Rule).filter(Rule.active == True).count()
+    Runs inside the caller's transaction (no commit), so the counter
+    changes atomically with the violation write that caused it.
+    """
+    from app.modules.rules.crud import get_active_rules_count
     
-    print(f"[COMPLIANCE DEBUG] Agent {agent_id}: total_rules={total_rules}")
+    if not delta:
+        return
     
-    if total_rules == 0:
-        return 100.0  # No rules = 100% compliant
+    unresolved = db.execute(_unresolved_delta_stmt(agent_id, delta)).scalar_one_or_none()
     
-    # Get unresolved violations for this agent
-    unresolved_violations = db.query(Violation).filter(
-        Violation.agent_id == agent_id,
-        Violation.resolved_at.is_(None)
-    ).count()
+    if unresolved is None:
+        return
+    
+    db.execute(_compliance_rate_stmt(agent_id, get_active_rules_count(db), unresolved))
+
+
+async def apply_unresolved_delta_async(db: AsyncSession, agent_id: int, delta: int) -> None:
+    """Async session variant of apply_unresolved_delta (no commit)."""
+    from app.modules.rules.crud import get_active_rules_count_async
     
-    print(f"[COMPLIANCE DEBUG] Agent {agent_id}: unresolved_violations={unresolved_violations}")
+    if not delta:
+        return
     
-    # Calculate compliance rate
-    compliance = max(0, (total_rules - unresolved_violations) / total_rules * 100)
+    unresolved = (await db.execute(_unresolved_delta_stmt(agent_id, delta))).scalar_one_or_none()
     
-    print(f"[COMPLIANCE DEBUG] Agent {agent_id}: compliance={compliance}")
+    if unresolved is None:
+        return
     
-    return round(compliance, 2)
+    await db.execute(_compliance_rate_stmt(agent_id, await get_active_rules_count_async(db), unresolved))
 
 
 def update_agent_compliance(db: Session, agent_id: int) -> Agent:
@@ -180,8 +280,41 @@ def update_agent_compliance(db: Session, agent_id: int) -> Agent:
 
 
 def update_all_agents_compliance(db: Session) -> None:
-    """Update compliance rate for all agents."""
-    agents = db.query(Agent).all()
-    for agent in agents:
-        agent.compliance_rate = calculate_agent_compliance(db, agent.id)
+    """
+    Recount unresolved violations and compliance rate for all agents.
+    
+    Single UPDATE ... FROM a grouped subquery, regardless of agent count.
+    """
+    from app.modules.rules.crud import get_active_rules_count
+    from app.modules.violations.models import Violation
+    
+    total_rules = get_active_rules_count(db)
+    
+    counts = (
+        select(Agent.id.label("agent_id"), func.count(Violation.id).label("unresolved"))
+        .select_from(Agent)
+        .outerjoin(
+            Violation,
+            (Violation.agent_id == Agent.id) & Violation.resolved_at.is_(None)
+        )
+        .group_by(Agent.id)
+        .subquery()
+    )
+    
+    if total_rules == 0:
+        compliance = 100.0
+    else:
+        compliance = case(
+            (counts.c.unresolved >= total_rules, 0.0),
+            else_=func.round(
+                cast((total_rules - counts.c.unresolved) * 100.0 / total_rules, Numeric), 2
+            )
+        )
+    
+    db.execute(
+        update(Agent)
+        .where(Agent.id == counts.c.agent_id)
+        .values(unresolved_violations=counts.c.unresolved, compliance_rate=compliance),
+        execution_options={"synchronize_session": False}
+    )
     db.commit()
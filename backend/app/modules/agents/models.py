@@ -1,5 +1,5 @@
 """Agent model."""
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -11,7 +11,7 @@ class Agent(Base):
     __tablename__ = "agents"
 
     id = Column(Integer, primary_key=True, index=True)
-    hostname = Column(String, nullable=False)
+    hostname = Column(String, nullable=False, unique=True, index=True)
     ip_address = Column(String)
     os = Column(String)
     version = Column(String)  # Agent software version
@@ -20,6 +20,15 @@ class Agent(Base):
     last_heartbeat = Column(DateTime(timezone=True), nullable=True)
     last_scan_at = Column(DateTime(timezone=True), nullable=True)
     compliance_rate = Column(Float, default=0.0)  
+    unresolved_violations = Column(Integer, nullable=False, default=0, server_default="0")  # Maintained on violation writes
     
     violations = relationship("Violation", back_populates="agent")
 
+    __table_args__ = (
+        # Offline sweep: online agents ordered by when they were last heard from
+        Index(
+            "ix_agents_online_last_seen", func.coalesce(last_heartbeat, last_checkin),
+            postgresql_where=is_online
+        ),
+    )
+
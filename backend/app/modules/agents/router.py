@@ -1,12 +1,19 @@
 """Agent API router."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query, WebSocket, WebSocketDisconnect
+from loguru import logger
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from app.core.dependencies import get_db
+from app.core.dependencies import get_db, get_async_db
+from app.core.pagination import decode_cursor, paginate
+from app.core.serialization import FastJSONResponse
+from app.core.streaming import ndjson_response, wants_ndjson
 from app.modules.websocket.service import manager
 from . import crud
+from .service import control_hub, heartbeat_buffer
 from .schemas import AgentCreate, AgentUpdate, AgentResponse, AgentHeartbeat
+from app.modules.violations.schemas import ViolationResponse
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 
@@ -20,18 +27,38 @@ def register_agent(agent: AgentCreate, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[AgentResponse])
 def list_agents(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
     is_online: Optional[bool] = None,
     os: Optional[str] = None,
+    stream: bool = Query(False, description="Stream rows as NDJSON (same as Accept: application/x-ndjson)"),
     db: Session = Depends(get_db)
 ):
     """
-    Get list of agents with optional filters.
+    Get list of agents with optional filters, ordered by id (cursor-paginated).
+    
+    With `?stream=true` or `Accept: application/x-ndjson` the rows are
+    streamed as NDJSON (one object per line, no X-Next-Cursor).
     """
-    return crud.get_agents(db, skip=skip, limit=limit, is_online=is_online, os=os)
+    after = decode_cursor(cursor, int)
+    after_id = after[0] if after else None
+    
+    if wants_ndjson(request, stream):
+        return ndjson_response(
+            lambda stream_db: crud.agents_query(stream_db, is_online, os, after_id)
+            .offset(skip).limit(limit),
+            AgentResponse
+        )
+    
+    agents = crud.get_agents(
+        db, skip=skip, limit=limit + 1, is_online=is_online, os=os, after_id=after_id
+    )
+    return paginate(response, agents, limit, lambda agent: (agent.id,))
 
-@router.get("/stats")
+@router.get("/stats", response_class=FastJSONResponse)
 def get_agents_stats(db: Session = Depends(get_db)):
     """
     Get agent statistics.
@@ -52,12 +79,12 @@ def get_agent(agent_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{agent_id}", response_model=AgentResponse)
-async def update_agent(agent_id: int, agent_update: AgentUpdate, db: Session = Depends(get_db)):
+async def update_agent(agent_id: int, agent_update: AgentUpdate, db: AsyncSession = Depends(get_async_db)):
     """
     Update agent information.
     
     """
-    updated_agent = crud.update_agent(db, agent_id, agent_update)
+    updated_agent = await crud.update_agent_async(db, agent_id, agent_update)
     
     # Broadcast update
     await manager.broadcast_agent_updated({
@@ -72,16 +99,78 @@ async def update_agent(agent_id: int, agent_update: AgentUpdate, db: Session = D
     return updated_agent
 
 
-@router.post("/{agent_id}/heartbeat", response_model=AgentResponse)
-def agent_heartbeat(
-    agent_id: int,
-    heartbeat: AgentHeartbeat,
-    db: Session = Depends(get_db)
-):
-    return crud.update_agent_heartbeat(db, agent_id, heartbeat)
+@router.post("/{agent_id}/heartbeat", status_code=status.HTTP_204_NO_CONTENT)
+async def agent_heartbeat(agent_id: int, heartbeat: AgentHeartbeat):
+    """
+    Agent keep-alive signal.
+    
+    Recorded in memory and written to last_heartbeat / last_checkin in a
+    batched flush every HEARTBEAT_FLUSH_INTERVAL seconds. Returns 204.
+    """
+    if not await heartbeat_buffer.is_known(agent_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Agent with id {agent_id} not found"
+        )
+    
+    heartbeat_buffer.record(agent_id, heartbeat.is_online, heartbeat.version)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.websocket("/{agent_id}/control")
+async def agent_control_channel(websocket: WebSocket, agent_id: int):
+    """
+    Persistent control channel for an agent.
+    
+    URL: ws://localhost:8000/api/v1/agents/{agent_id}/control
+    
+    The server sends {"type": "hello", "ping_interval": N} on connect, then
+    pushes {"type": "rules_changed", "jitter": S} and {"type": "scan_now"}.
+    The agent sends {"type": "ping", "version": "..."} every N seconds as its
+    heartbeat (answered with pong) instead of POST /heartbeat.
+    """
+    if not await heartbeat_buffer.is_known(agent_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    channel = await control_hub.connect(agent_id, websocket)
+    try:
+        while True:
+            data = await websocket.receive_json()
+            if isinstance(data, dict) and data.get("type") == "ping":
+                control_hub.ping(agent_id, data.get("version"))
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Agent {agent_id} control channel error: {e}")
+    finally:
+        control_hub.disconnect(agent_id, channel)
+
+
+@router.post("/{agent_id}/scan", status_code=status.HTTP_202_ACCEPTED, response_class=FastJSONResponse)
+async def request_scan(agent_id: int):
+    """
+    Ask an agent to run a compliance scan now (pushed over its control channel).
+    
+    `delivered` is false if the agent has no channel open on this worker; the
+    command is then relayed to the other workers, and an agent that is not
+    connected at all scans on its regular schedule.
+    """
+    if not await heartbeat_buffer.is_known(agent_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Agent with id {agent_id} not found"
+        )
+    
+    delivered = control_hub.send(agent_id, {"type": "scan_now"})
+    return {
+        "message": "Scan requested",
+        "agent_id": agent_id,
+        "delivered": delivered
+    }
 
 
-@router.get("/{agent_id}/violations")
+@router.get("/{agent_id}/violations", response_model=List[ViolationResponse])
 def get_agent_violations(
     agent_id: int,
     limit: int = 100,
@@ -94,12 +183,13 @@ def get_agent_violations(
     return violations_crud.get_violations_by_agent(db, agent_id, limit=limit)
 
 
-@router.delete("/{agent_id}")
-async def delete_agent(agent_id: int, db: Session = Depends(get_db)):
+@router.delete("/{agent_id}", response_class=FastJSONResponse)
+async def delete_agent(agent_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Delete agent.
     """
-    crud.delete_agent(db, agent_id)
+    await crud.delete_agent_async(db, agent_id)
+    heartbeat_buffer.forget(agent_id)
     
     # Broadcast deletion
     await manager.broadcast_agent_deleted(str(agent_id))
@@ -0,0 +1,384 @@
+"""
+Agent presence service.
+
+Heartbeats are buffered in memory and written to the agents table in
+batches, instead of one transaction per heartbeat. A periodic sweep marks
+agents whose heartbeats stopped as offline. Connected agents keep a control
+channel open, over which they heartbeat and receive pushed commands.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+from sqlalchemy import Boolean, DateTime, Integer, String, column, func, select, update, values
+from loguru import logger
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.serialization import json_dumps
+from app.modules.websocket.bus import EventBus, create_event_bus
+from app.modules.websocket.service import DROP_OLDEST, ClientConnection, manager
+from .models import Agent
+
+# Rows per UPDATE ... FROM (VALUES ...); keeps bind params under the driver limit
+FLUSH_BATCH_ROWS = 5000
+
+# Outbound control messages buffered per agent (oldest dropped when full)
+CONTROL_QUEUE_SIZE = 16
+
+# Close code for a control channel taken over by a newer connection of the same agent
+CONTROL_REPLACED_CLOSE_CODE = 4000
+
+
+class HeartbeatBuffer:
+    """
+    Write-behind presence map for agent heartbeats.
+
+    record() only touches memory; a background task flushes all pending
+    heartbeats every flush_interval seconds with UPDATE agents ... FROM
+    (VALUES ...) (one statement per FLUSH_BATCH_ROWS agents). Only the
+    latest heartbeat per agent is kept between flushes.
+    """
+
+    def __init__(self, flush_interval: float = settings.HEARTBEAT_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+
+        # {agent_id: (received_at, is_online, version)}
+        self._pending: Dict[int, Tuple[datetime, bool, Optional[str]]] = {}
+
+        # Agent ids known to exist, so heartbeats skip the lookup query
+        self._known_agents: Set[int] = set()
+
+        self._task: Optional[asyncio.Task] = None
+
+    async def is_known(self, agent_id: int) -> bool:
+        """Check the agent exists (cached after the first successful lookup)."""
+        if agent_id in self._known_agents:
+            return True
+
+        async with AsyncSessionLocal() as db:
+            exists = await db.scalar(select(Agent.id).where(Agent.id == agent_id))
+
+        if exists is not None:
+            self._known_agents.add(agent_id)
+            return True
+        return False
+
+    def forget(self, agent_id: int):
+        """Drop a deleted agent from the cache and pending heartbeats."""
+        self._known_agents.discard(agent_id)
+        self._pending.pop(agent_id, None)
+
+    def forget_remote(self, event: str = ""):
+        """
+        Drop the known-agent cache after an agent was deleted on another worker.
+
+        Relayed events carry no listener data, so the whole cache is cleared and
+        rebuilt by the next lookups; heartbeats for the deleted agent then get 404.
+        Pending rows for it match no agent in the flush UPDATE and are dropped there.
+        """
+        if event == "agent_deleted":
+            self._known_agents.clear()
+
+    def record(self, agent_id: int, is_online: bool = True, version: Optional[str] = None):
+        """Record a heartbeat; written to the DB on the next flush."""
+        self._pending[agent_id] = (datetime.now(timezone.utc), is_online, version)
+
+    @staticmethod
+    def _update_stmt(rows):
+        """UPDATE agents ... FROM (VALUES (id, received_at, is_online, version), ...)."""
+        heartbeats = values(
+            column("id", Integer),
+            column("received_at", DateTime(timezone=True)),
+            column("is_online", Boolean),
+            column("version", String),
+            name="heartbeats"
+        ).data(rows)
+
+        return (
+            update(Agent)
+            .where(Agent.id == heartbeats.c.id)
+            .values(
+                last_heartbeat=heartbeats.c.received_at,
+                last_checkin=heartbeats.c.received_at,
+                is_online=heartbeats.c.is_online,
+                version=func.coalesce(heartbeats.c.version, Agent.version)
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def flush(self) -> int:
+        """Write all pending heartbeats in one transaction. Returns rows sent."""
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        rows = [
+            (agent_id, received_at, is_online, version)
+            for agent_id, (received_at, is_online, version) in pending.items()
+        ]
+
+        try:
+            async with AsyncSessionLocal() as db:
+                for start in range(0, len(rows), FLUSH_BATCH_ROWS):
+                    await db.execute(self._update_stmt(rows[start:start + FLUSH_BATCH_ROWS]))
+                await db.commit()
+        except Exception:
+            # Keep heartbeats for the next flush unless newer ones arrived
+            for agent_id, heartbeat in pending.items():
+                self._pending.setdefault(agent_id, heartbeat)
+            raise
+
+        logger.debug(f"Flushed {len(pending)} heartbeat(s)")
+        return len(pending)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Heartbeat flush failed: {e}")
+
+    def start(self):
+        """Start the periodic flush task (call from the app's event loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and write what is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final heartbeat flush failed: {e}")
+
+
+class OfflineSweeper:
+    """
+    Periodically marks agents offline when they stop sending heartbeats.
+
+    Each sweep is a single UPDATE agents SET is_online = false ... RETURNING id
+    over the partial index ix_agents_online_last_seen, so the cost depends on
+    the number of stale agents, not the fleet size. Agents flipped by one sweep
+    are announced in one agent_status_changed event.
+    """
+
+    def __init__(
+        self,
+        grace: float = settings.AGENT_OFFLINE_GRACE,
+        interval: float = settings.AGENT_SWEEP_INTERVAL
+    ):
+        self.grace = grace
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def _sweep_stmt(self):
+        """UPDATE agents SET is_online = false WHERE is_online AND last seen < cutoff."""
+        # Heartbeats are stamped with the app clock (see HeartbeatBuffer.record)
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.grace)
+        return (
+            update(Agent)
+            .where(
+                Agent.is_online,
+                func.coalesce(Agent.last_heartbeat, Agent.last_checkin) < cutoff
+            )
+            .values(is_online=False)
+            .returning(Agent.id)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def sweep(self) -> List[int]:
+        """Mark stale agents offline and broadcast the change. Returns their ids."""
+        async with AsyncSessionLocal() as db:
+            agent_ids = (await db.scalars(self._sweep_stmt())).all()
+            await db.commit()
+
+        if agent_ids:
+            logger.info(f"Marked {len(agent_ids)} agent(s) offline")
+            await manager.broadcast_agent_status_changed({
+                "agent_ids": agent_ids,
+                "is_online": False,
+                "count": len(agent_ids)
+            })
+        return agent_ids
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Offline sweep failed: {e}")
+
+    def start(self):
+        """Start the periodic sweep task (call from the app's event loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the sweep task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class AgentControlHub:
+    """
+    Persistent control channels to agents, one WebSocket per agent.
+    
+    The agent's {"type": "ping"} every ping_interval seconds is its heartbeat
+    (recorded in heartbeat_buffer, answered with pong), replacing the HTTP
+    heartbeat. The server pushes:
+    
+        {"type": "rules_changed", "jitter": <seconds>}  after any rule change
+        {"type": "scan_now"}                             on POST /agents/{id}/scan
+    
+    Each channel has a small queue drained by its own writer task, so a
+    fleet-wide push never waits on one slow agent. Commands for agents
+    connected to another worker are relayed over the event bus; rule changes
+    reach every worker through the WebSocket manager's listeners.
+    """
+    
+    def __init__(
+        self,
+        ping_interval: float = settings.AGENT_PING_INTERVAL,
+        rules_sync_jitter: float = settings.AGENT_RULES_SYNC_JITTER,
+        bus: Optional[EventBus] = None
+    ):
+        self.ping_interval = ping_interval
+        self.rules_sync_jitter = rules_sync_jitter
+        
+        # Open channels: {agent_id: ClientConnection}
+        self.channels: Dict[int, ClientConnection] = {}
+        
+        # Relays commands for agents connected to other workers
+        self.bus = bus or create_event_bus(channel=f"{settings.EVENT_BUS_CHANNEL}_control")
+    
+    async def connect(self, agent_id: int, websocket: WebSocket) -> ClientConnection:
+        """Accept an agent's channel (replacing an older one) and send the hello message."""
+        await websocket.accept()
+        channel = ClientConnection(str(agent_id), websocket, CONTROL_QUEUE_SIZE)
+        channel.writer = asyncio.get_running_loop().create_task(self._write_loop(agent_id, channel))
+        
+        previous = self.channels.get(agent_id)
+        self.channels[agent_id] = channel
+        if previous is not None:
+            self._close(previous, CONTROL_REPLACED_CLOSE_CODE)
+        
+        heartbeat_buffer.record(agent_id)
+        channel.enqueue(json_dumps({
+            "type": "hello",
+            "agent_id": agent_id,
+            "ping_interval": self.ping_interval
+        }).decode("utf-8"), DROP_OLDEST)
+        logger.info(f"Agent {agent_id} control channel open. Total: {len(self.channels)}")
+        return channel
+    
+    def disconnect(self, agent_id: int, channel: ClientConnection):
+        """Forget a closed channel (unless a newer one already replaced it)."""
+        if self.channels.get(agent_id) is channel:
+            del self.channels[agent_id]
+            logger.info(f"Agent {agent_id} control channel closed. Total: {len(self.channels)}")
+        if channel.writer is not None:
+            channel.writer.cancel()
+    
+    def _close(self, channel: ClientConnection, code: int):
+        if channel.writer is not None:
+            channel.writer.cancel()
+        asyncio.get_running_loop().create_task(self._close_quietly(channel.websocket, code))
+    
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+    
+    async def _write_loop(self, agent_id: int, channel: ClientConnection):
+        try:
+            while True:
+                await channel.websocket.send_text(await channel.queue.get())
+        except Exception as e:
+            logger.warning(f"Agent {agent_id} control channel send failed: {e}")
+    
+    def ping(self, agent_id: int, version: Optional[str] = None):
+        """Record an agent's heartbeat and acknowledge it."""
+        heartbeat_buffer.record(agent_id, True, version)
+        channel = self.channels.get(agent_id)
+        if channel is not None:
+            channel.enqueue('{"type":"pong"}', DROP_OLDEST)
+    
+    def _push(self, text: str, agent_ids: Optional[List[int]] = None) -> int:
+        """Queue a message for local channels (all if agent_ids is None). Returns the count."""
+        if agent_ids is None:
+            channels = list(self.channels.values())
+        else:
+            channels = [self.channels[a] for a in agent_ids if a in self.channels]
+        for channel in channels:
+            channel.enqueue(text, DROP_OLDEST)
+        return len(channels)
+    
+    def send(self, agent_id: int, message: dict) -> bool:
+        """
+        Push a command to one agent. Returns True if its channel is on this
+        worker; otherwise the command is relayed to the other workers.
+        """
+        text = json_dumps(message).decode("utf-8")
+        if self._push(text, [agent_id]):
+            return True
+        self.bus.publish(text, [str(agent_id)])
+        return False
+    
+    def _relay(self, text: str, topics: Optional[List[str]]):
+        """Deliver a command relayed by another worker to local channels"""
+        self._push(text, [int(topic) for topic in topics] if topics is not None else None)
+    
+    def notify_rules_changed(self, event: str = ""):
+        """Tell every connected agent to refetch its rules (manager listener)."""
+        if not event.startswith("rule_") or not self.channels:
+            return
+        count = self._push(json_dumps({
+            "type": "rules_changed",
+            "jitter": self.rules_sync_jitter
+        }).decode("utf-8"))
+        logger.info(f"Pushed rules_changed to {count} agent(s)")
+    
+    async def start(self):
+        """Start relaying commands between workers (call from the app's event loop)."""
+        await self.bus.start(self._relay)
+    
+    async def stop(self):
+        """Close all channels and stop the event bus."""
+        channels, self.channels = list(self.channels.values()), {}
+        for channel in channels:
+            if channel.writer is not None:
+                channel.writer.cancel()
+            await self._close_quietly(channel.websocket, 1001)  # going away
+        await self.bus.stop()
+
+
+# Global heartbeat buffer instance; agents deleted on other workers leave its cache
+heartbeat_buffer = HeartbeatBuffer()
+manager.add_remote_listener(heartbeat_buffer.forget_remote)
+
+# Global offline sweeper instance
+offline_sweeper = OfflineSweeper()
+
+# Global agent control hub; rule changes here and on other workers reach all agents
+control_hub = AgentControlHub()
+manager.add_listener(control_hub.notify_rules_changed)
+manager.add_remote_listener(control_hub.notify_rules_changed)
@@ -0,0 +1,7 @@
+"""Compliance module - Trạng thái mới nhất của từng rule trên từng agent."""
+
+from .models import AgentRuleState
+from .schemas import ComplianceMatrix
+from .router import router
+
+__all__ = ["AgentRuleState", "ComplianceMatrix", "router"]
@@ -0,0 +1,118 @@
+"""Agent rule state CRUD operations."""
+import hashlib
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Dict, Optional, Tuple
+
+from .models import AgentRuleState
+from app.modules.agents.models import Agent
+from app.modules.rules.models import Rule
+
+# One character per status in the packed matrix; "-" = never checked
+STATUS_CODES = {"PASS": "P", "FAIL": "F", "ERROR": "E"}
+UNKNOWN_CODE = "-"
+
+
+def output_hash(output: Optional[str]) -> Optional[str]:
+    """Short fingerprint of a check's output, to spot changes between scans."""
+    if output is None:
+        return None
+    return hashlib.sha256(output.encode("utf-8")).hexdigest()[:16]
+
+
+def record_rule_states(
+    db: Session,
+    agent_id: int,
+    states: Dict[int, Tuple[str, Optional[str]]]
+) -> None:
+    """
+    Upsert the latest check result for each rule (no commit).
+    
+    states maps rule_id -> (status, check output). Written with one
+    executemany INSERT ... ON CONFLICT on the (agent_id, rule_id) key.
+    """
+    if not states:
+        return
+    
+    stmt = pg_insert(AgentRuleState)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AgentRuleState.agent_id, AgentRuleState.rule_id],
+        set_={
+            "status": stmt.excluded.status,
+            "output_hash": stmt.excluded.output_hash,
+            "checked_at": func.now(),
+        }
+    )
+    db.execute(stmt, [
+        {
+            "agent_id": agent_id,
+            "rule_id": rule_id,
+            "status": check_status,
+            "output_hash": output_hash(output),
+        }
+        for rule_id, (check_status, output) in states.items()
+    ])
+
+
+def get_compliance_matrix(
+    db: Session,
+    os_type: Optional[str] = None,
+    packed: bool = False
+) -> dict:
+    """
+    Build the fleet x active-rules status grid.
+    
+    Agents and rules are listed once; all cell states come from a single
+    query on agent_rule_state (primary key order). Cells never checked are
+    None (or "-" when packed).
+    """
+    rules_query = db.query(Rule.id, Rule.agent_rule_id, Rule.name, Rule.severity)\
+        .filter(Rule.active == True)
+    if os_type:
+        rules_query = rules_query.filter(Rule.os_type == os_type)
+    rules = rules_query.order_by(Rule.id).all()
+    
+    agents = db.query(Agent.id, Agent.hostname).order_by(Agent.id).all()
+    
+    column = {rule.id: idx for idx, rule in enumerate(rules)}
+    grid = {agent.id: [None] * len(rules) for agent in agents}
+    
+    states = db.execute(
+        select(AgentRuleState.agent_id, AgentRuleState.rule_id, AgentRuleState.status)
+        .where(AgentRuleState.rule_id.in_(list(column)))
+        .order_by(AgentRuleState.agent_id, AgentRuleState.rule_id)
+    ) if rules else []
+    
+    for agent_id, rule_id, check_status in states:
+        row = grid.get(agent_id)
+        if row is not None:
+            row[column[rule_id]] = check_status
+    
+    agent_rows = []
+    for agent in agents:
+        statuses = grid[agent.id]
+        counts = {
+            "pass": statuses.count("PASS"),
+            "fail": statuses.count("FAIL"),
+            "error": statuses.count("ERROR"),
+            "unknown": statuses.count(None)
+        }
+        if packed:
+            statuses = "".join(STATUS_CODES.get(s, UNKNOWN_CODE) for s in statuses)
+        agent_rows.append({
+            "id": agent.id,
+            "hostname": agent.hostname,
+            "statuses": statuses,
+            "counts": counts
+        })
+    
+    return {
+        "packed": packed,
+        "legend": {**{code: s for s, code in STATUS_CODES.items()}, UNKNOWN_CODE: None} if packed else None,
+        "rules": [
+            {"id": r.id, "agent_rule_id": r.agent_rule_id, "name": r.name, "severity": r.severity}
+            for r in rules
+        ],
+        "agents": agent_rows
+    }
@@ -0,0 +1,16 @@
+"""Agent rule state model."""
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class AgentRuleState(Base):
+    """Latest check result of one rule on one agent (one row per pair)."""
+    
+    __tablename__ = "agent_rule_state"
+
+    agent_id = Column(Integer, ForeignKey("agents.id", ondelete="CASCADE"), primary_key=True)
+    rule_id = Column(Integer, ForeignKey("rules.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String(5), nullable=False)  # PASS, FAIL, ERROR
+    checked_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    output_hash = Column(String(16), nullable=True)  # Changes when the check output changes
@@ -0,0 +1,26 @@
+"""Compliance API router."""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.core.dependencies import get_db
+from . import crud
+from .schemas import ComplianceMatrix
+
+router = APIRouter(prefix="/compliance", tags=["compliance"])
+
+
+@router.get("/matrix", response_model=ComplianceMatrix)
+def get_compliance_matrix(
+    os_type: Optional[str] = Query(None, description="Only rules for this OS (ubuntu, windows)"),
+    packed: bool = Query(False, description="Return statuses as one character per rule"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the latest PASS/FAIL/ERROR of every active rule on every agent.
+    
+    - Columns: active rules (ordered by id), rows: agents
+    - packed=true: statuses is a string like "PPF-E" (see legend)
+    - Cells never reported by the agent are null / "-"
+    """
+    return crud.get_compliance_matrix(db, os_type=os_type, packed=packed)
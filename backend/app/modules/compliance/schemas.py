@@ -0,0 +1,30 @@
+"""Compliance schemas for response validation."""
+from pydantic import BaseModel, Field
+from typing import List, Optional, Union
+
+
+class MatrixRule(BaseModel):
+    """Rule column of the compliance matrix."""
+    id: int
+    agent_rule_id: Optional[str] = None
+    name: str
+    severity: Optional[str] = None
+
+
+class MatrixAgent(BaseModel):
+    """Agent row of the compliance matrix."""
+    id: int
+    hostname: str
+    statuses: Union[List[Optional[str]], str] = Field(
+        ...,
+        description="Status theo thứ tự rules: list PASS/FAIL/ERROR/null, hoặc chuỗi packed (P/F/E/-)"
+    )
+    counts: dict = Field(..., description="{pass, fail, error, unknown}")
+
+
+class ComplianceMatrix(BaseModel):
+    """Schema for the fleet x rules status grid."""
+    packed: bool = Field(False, description="statuses là chuỗi 1 ký tự / rule")
+    legend: Optional[dict] = Field(None, description="Ký tự packed -> status (chỉ khi packed)")
+    rules: List[MatrixRule]
+    agents: List[MatrixAgent]
@@ -1,16 +1,38 @@
 """Reports API router."""
 from fastapi import APIRouter, Depends, Query
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Callable, Iterator
 from datetime import datetime, timedelta
 
+from app.core.database import SessionLocal
 from app.core.dependencies import get_db
 from .service import ReportGenerator
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
 
+def _stream_with_session(stream: Callable[..., Iterator[bytes]], *args) -> Iterator[bytes]:
+    """
+    Run a streaming export with its own DB session.
+    
+    The request-scoped session from get_db may be closed before the response
+    body is sent, so the session lives exactly as long as the stream.
+    """
+    db = SessionLocal()
+    try:
+        yield from stream(db, *args)
+    finally:
+        db.close()
+
+
+def _period_label(date_from: Optional[datetime], date_to: Optional[datetime]) -> str:
+    """Format the report period for download filenames."""
+    date_from = date_from or datetime.now() - timedelta(days=30)
+    date_to = date_to or datetime.now()
+    return f"{date_from.strftime('%Y%m%d')}_{date_to.strftime('%Y%m%d')}"
+
+
 @router.get("/compliance/pdf")
 def generate_compliance_report_pdf(
     date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
@@ -26,15 +48,15 @@ def generate_compliance_report_pdf(
     
     Returns PDF file for download.
     """
-    # Parse dates
-    df = datetime.strptime(date_from, '%Y-%m-%d') if date_from else datetime.now() - timedelta(days=30)
-    dt = datetime.strptime(date_to, '%Y-%m-%d') if date_to else datetime.now()
+    # Parse dates (None = default period, which keeps the report cache key stable)
+    df = datetime.strptime(date_from, '%Y-%m-%d') if date_from else None
+    dt = datetime.strptime(date_to, '%Y-%m-%d') if date_to else None
     
     # Generate report
     pdf_bytes = ReportGenerator.generate_compliance_pdf(db, df, dt)
     
     # Return PDF response
-    filename = f"compliance_report_{df.strftime('%Y%m%d')}_{dt.strftime('%Y%m%d')}.pdf"
+    filename = f"compliance_report_{_period_label(df, dt)}.pdf"
     return Response(
         content=pdf_bytes,
         media_type="application/pdf",
@@ -49,8 +71,7 @@ def export_violations_csv(
     date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
     severity: Optional[str] = Query(None, description="Filter by severity"),
-    resolved: Optional[bool] = Query(None, description="Filter by resolved status"),
-    db: Session = Depends(get_db)
+    resolved: Optional[bool] = Query(None, description="Filter by resolved status")
 ):
     """
     Export violations to CSV format.
@@ -63,17 +84,14 @@ def export_violations_csv(
     
     Returns CSV file for download.
     """
-    # Parse dates
-    df = datetime.strptime(date_from, '%Y-%m-%d') if date_from else datetime.now() - timedelta(days=30)
-    dt = datetime.strptime(date_to, '%Y-%m-%d') if date_to else datetime.now()
-    
-    # Generate CSV
-    csv_bytes = ReportGenerator.generate_violations_csv(db, df, dt, severity, resolved)
+    # Parse dates (None = default period, which keeps the report cache key stable)
+    df = datetime.strptime(date_from, '%Y-%m-%d') if date_from else None
+    dt = datetime.strptime(date_to, '%Y-%m-%d') if date_to else None
     
-    # Return CSV response
-    filename = f"violations_export_{df.strftime('%Y%m%d')}_{dt.strftime('%Y%m%d')}.csv"
-    return Response(
-        content=csv_bytes,
+    # Stream CSV rows as they are read from the DB
+    filename = f"violations_export_{_period_label(df, dt)}.csv"
+    return StreamingResponse(
+        _stream_with_session(ReportGenerator.stream_violations_csv, df, dt, severity, resolved),
         media_type="text/csv",
         headers={
             "Content-Disposition": f"attachment; filename={filename}"
@@ -86,8 +104,7 @@ def export_violations_excel(
     date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
     severity: Optional[str] = Query(None, description="Filter by severity"),
-    resolved: Optional[bool] = Query(None, description="Filter by resolution status"),
-    db: Session = Depends(get_db)
+    resolved: Optional[bool] = Query(None, description="Filter by resolution status")
 ):
     """
     Export violations to Excel format.
@@ -100,17 +117,14 @@ def export_violations_excel(
     
     Returns Excel file for download.
     """
-    # Parse dates
-    df = datetime.strptime(date_from, '%Y-%m-%d') if date_from else datetime.now() - timedelta(days=30)
-    dt = datetime.strptime(date_to, '%Y-%m-%d') if date_to else datetime.now()
-    
-    # Generate Excel
-    excel_bytes = ReportGenerator.generate_violations_excel(db, df, dt, severity, resolved)
+    # Parse dates (None = default period, which keeps the report cache key stable)
+    df = datetime.strptime(date_from, '%Y-%m-%d') if date_from else None
+    dt = datetime.strptime(date_to, '%Y-%m-%d') if date_to else None
     
-    # Return Excel response
-    filename = f"violations_export_{df.strftime('%Y%m%d')}_{dt.strftime('%Y%m%d')}.xlsx"
-    return Response(
-        content=excel_bytes,
+    # Stream Excel workbook (built with a write-only sheet)
+    filename = f"violations_export_{_period_label(df, dt)}.xlsx"
+    return StreamingResponse(
+        _stream_with_session(ReportGenerator.stream_violations_excel, df, dt, severity, resolved),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={
             "Content-Disposition": f"attachment; filename={filename}"
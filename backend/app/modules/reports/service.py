@@ -2,23 +2,230 @@
 Report generation service for compliance and violations
 """
 
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Optional, List, Iterator, Dict, Tuple
+import csv
 import io
+import tempfile
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
-import pandas as pd
+from openpyxl import Workbook
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, literal, null, select, union_all
 
+from app.core.cache import SingleFlightCache
+from app.core.config import settings
 from app.modules.violations.models import Violation
 from app.modules.agents.models import Agent
 from app.modules.rules.models import Rule
 
+# Column headers for violation exports (CSV / Excel)
+EXPORT_COLUMNS = [
+    'Violation ID', 'Detected At', 'Agent', 'Rule ID', 'Rule Name', 'Severity', 'Message',
+    'Confidence Score', 'Resolved', 'Resolved At', 'Resolved By', 'Resolution Notes'
+]
+
+# Rows fetched from the DB (and flushed to the client) per batch
+EXPORT_BATCH_SIZE = 1000
+
+# Read size when streaming a finished xlsx file
+EXPORT_FILE_CHUNK = 64 * 1024
+
+
+@dataclass
+class ReportDataset:
+    """Summary figures for the PDF report of one period + filters."""
+    date_from: datetime
+    date_to: datetime
+    total_agents: int = 0
+    online_agents: int = 0
+    total_rules: int = 0
+    active_rules: int = 0
+    total_violations: int = 0
+    resolved_violations: int = 0
+    severity_counts: Dict[Optional[str], int] = field(default_factory=dict)
+    agent_counts: Dict[str, int] = field(default_factory=dict)
+    
+    def top_agents(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Agents with the most violations, highest first."""
+        return sorted(self.agent_counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+# Datasets keyed by (date_from, date_to, severity, resolved); export rows are
+# streamed from the DB and never cached
+report_cache = SingleFlightCache(
+    ttl=settings.REPORT_CACHE_TTL,
+    max_entries=settings.REPORT_CACHE_MAX_ENTRIES
+)
+
+
+def _default_period(
+    date_from: Optional[datetime],
+    date_to: Optional[datetime]
+) -> Tuple[datetime, datetime]:
+    """Fill in the default report period (last 30 days)."""
+    if date_from is None:
+        date_from = datetime.now() - timedelta(days=30)
+    if date_to is None:
+        date_to = datetime.now()
+    return date_from, date_to
+
+
+def _period_select(
+    columns,
+    date_from: datetime,
+    date_to: datetime,
+    severity: Optional[str] = None,
+    resolved: Optional[bool] = None
+):
+    """Select columns of the violations in the period, agent and rule joined, filters applied."""
+    stmt = (
+        select(*columns)
+        .outerjoin(Agent, Agent.id == Violation.agent_id)
+        .outerjoin(Rule, Rule.id == Violation.rule_id)
+        .where(
+            Violation.detected_at >= date_from,
+            Violation.detected_at <= date_to
+        )
+    )
+    
+    if severity:
+        stmt = stmt.where(Rule.severity == severity)
+    if resolved is True:
+        stmt = stmt.where(Violation.resolved_at.isnot(None))
+    elif resolved is False:
+        stmt = stmt.where(Violation.resolved_at.is_(None))
+    
+    return stmt
+
+
+def _export_query(
+    date_from: datetime,
+    date_to: datetime,
+    severity: Optional[str] = None,
+    resolved: Optional[bool] = None
+):
+    """Violations in the period with agent and rule joined, all filters in SQL."""
+    columns = (
+        Violation.id,
+        Violation.detected_at,
+        Violation.agent_id,
+        Agent.hostname,
+        Violation.rule_id,
+        Rule.name,
+        Rule.severity,
+        Violation.message,
+        Violation.confidence_score,
+        Violation.resolved_at,
+        Violation.resolved_by,
+        Violation.resolution_notes
+    )
+    return (
+        _period_select(columns, date_from, date_to, severity, resolved)
+        .order_by(Violation.detected_at.desc(), Violation.id.desc())
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+def _format_export_row(row) -> list:
+    """Convert one _export_query row into an export row (EXPORT_COLUMNS order)."""
+    return [
+        row.id,
+        row.detected_at.strftime('%Y-%m-%d %H:%M:%S') if row.detected_at else '',
+        row.hostname if row.hostname is not None else row.agent_id,
+        row.rule_id,
+        row.name or '',
+        row.severity.upper() if row.severity else '',
+        row.message or '',
+        row.confidence_score or 0,
+        'Yes' if row.resolved_at else 'No',
+        row.resolved_at.strftime('%Y-%m-%d %H:%M:%S') if row.resolved_at else '',
+        row.resolved_by or '',
+        row.resolution_notes or ''
+    ]
+
+
+def build_report_dataset(
+    db: Session,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    severity: Optional[str] = None,
+    resolved: Optional[bool] = None
+) -> ReportDataset:
+    """
+    Load a report dataset with one aggregate statement.
+    
+    The filtered violations are a CTE; agent/rule totals, violation totals
+    and the severity / per-agent breakdowns are GROUP BY branches of one
+    UNION ALL, tagged by `kind`, so only the aggregates leave the database.
+    """
+    date_from, date_to = _default_period(date_from, date_to)
+    dataset = ReportDataset(date_from=date_from, date_to=date_to)
+    
+    period = _period_select(
+        (Violation.resolved_at, Rule.id.label("rule_found"), Rule.severity, Agent.hostname),
+        date_from, date_to, severity, resolved
+    ).cte("period_violations")
+    
+    stmt = union_all(
+        select(
+            literal("agents").label("kind"), null().label("name"),
+            func.count(Agent.id).label("total"),
+            func.count(Agent.id).filter(Agent.is_online == True).label("subset")
+        ),
+        select(
+            literal("rules"), null(),
+            func.count(Rule.id), func.count(Rule.id).filter(Rule.active == True)
+        ),
+        select(
+            literal("violations"), null(),
+            func.count(), func.count(period.c.resolved_at)
+        ).select_from(period),
+        select(literal("severity"), period.c.severity, func.count(), null())
+        .where(period.c.rule_found.isnot(None))
+        .group_by(period.c.severity),
+        select(literal("agent"), period.c.hostname, func.count(), null())
+        .where(period.c.hostname.isnot(None))
+        .group_by(period.c.hostname)
+    )
+    
+    for kind, name, total, subset in db.execute(stmt):
+        if kind == "agents":
+            dataset.total_agents, dataset.online_agents = total, subset
+        elif kind == "rules":
+            dataset.total_rules, dataset.active_rules = total, subset
+        elif kind == "violations":
+            dataset.total_violations, dataset.resolved_violations = total, subset
+        elif kind == "severity":
+            dataset.severity_counts[name] = total
+        else:
+            dataset.agent_counts[name] = total
+    
+    return dataset
+
+
+def get_report_dataset(
+    db: Session,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    severity: Optional[str] = None,
+    resolved: Optional[bool] = None
+) -> ReportDataset:
+    """
+    Get the report dataset, cached for REPORT_CACHE_TTL.
+    
+    Pass None dates for the default period so repeated requests share a key.
+    """
+    key = (date_from, date_to, severity, resolved)
+    return report_cache.get_or_compute(
+        key, lambda: build_report_dataset(db, date_from, date_to, severity, resolved)
+    )
+
 
 class ReportGenerator:
     """Generate various compliance and violation reports"""
@@ -40,10 +247,8 @@ class ReportGenerator:
         Returns:
             PDF file as bytes
         """
-        if date_from is None:
-            date_from = datetime.now() - timedelta(days=30)
-        if date_to is None:
-            date_to = datetime.now()
+        data = get_report_dataset(db, date_from, date_to)
+        date_from, date_to = data.date_from, data.date_to
         
         # Create PDF buffer
         buffer = io.BytesIO()
@@ -86,31 +291,16 @@ class ReportGenerator:
         # Executive Summary
         elements.append(Paragraph("Executive Summary", heading_style))
         
-        # Get statistics
-        total_agents = db.query(Agent).count()
-        online_agents = db.query(Agent).filter(Agent.is_online == True).count()
-        total_rules = db.query(Rule).count()
-        active_rules = db.query(Rule).filter(Rule.active == True).count()
-        
-        violations_query = db.query(Violation).filter(
-            Violation.detected_at >= date_from,
-            Violation.detected_at <= date_to
-        )
-        total_violations = violations_query.count()
-        resolved_violations = violations_query.filter(
-            Violation.resolved_at.isnot(None)
-        ).count()
-        
         # Summary table
         summary_data = [
             ['Metric', 'Value'],
-            ['Total Agents', str(total_agents)],
-            ['Online Agents', str(online_agents)],
-            ['Total Rules', str(total_rules)],
-            ['Active Rules', str(active_rules)],
-            ['Total Violations', str(total_violations)],
-            ['Resolved Violations', str(resolved_violations)],
-            ['Unresolved Violations', str(total_violations - resolved_violations)],
+            ['Total Agents', str(data.total_agents)],
+            ['Online Agents', str(data.online_agents)],
+            ['Total Rules', str(data.total_rules)],
+            ['Active Rules', str(data.active_rules)],
+            ['Total Violations', str(data.total_violations)],
+            ['Resolved Violations', str(data.resolved_violations)],
+            ['Unresolved Violations', str(data.total_violations - data.resolved_violations)],
         ]
         
         summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
@@ -131,16 +321,8 @@ class ReportGenerator:
         # Violations by Severity
         elements.append(Paragraph("Violations by Severity", heading_style))
         
-        severity_stats = db.query(
-            Rule.severity,
-            func.count(Violation.id).label('count')
-        ).join(Violation, Violation.rule_id == Rule.id).filter(
-            Violation.detected_at >= date_from,
-            Violation.detected_at <= date_to
-        ).group_by(Rule.severity).all()
-        
         severity_data = [['Severity', 'Count']]
-        for severity, count in severity_stats:
+        for severity, count in data.severity_counts.items():
             severity_data.append([severity.upper() if severity else 'UNKNOWN', str(count)])
         
         if len(severity_data) > 1:
@@ -163,18 +345,8 @@ class ReportGenerator:
         # Top 10 Agents with Most Violations
         elements.append(Paragraph("Top 10 Agents with Most Violations", heading_style))
         
-        top_agents = db.query(
-            Agent.hostname,
-            func.count(Violation.id).label('violation_count')
-        ).join(Violation, Violation.agent_id == Agent.id).filter(
-            Violation.detected_at >= date_from,
-            Violation.detected_at <= date_to
-        ).group_by(Agent.id, Agent.hostname).order_by(
-            func.count(Violation.id).desc()
-        ).limit(10).all()
-        
         agent_data = [['Agent Hostname', 'Violation Count']]
-        for hostname, count in top_agents:
+        for hostname, count in data.top_agents(10):
             agent_data.append([hostname or 'Unknown', str(count)])
         
         if len(agent_data) > 1:
@@ -198,138 +370,124 @@ class ReportGenerator:
         return buffer.getvalue()
     
     @staticmethod
-    def generate_violations_csv(
+    def _violation_export_rows(
         db: Session,
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
         severity: Optional[str] = None,
         resolved: Optional[bool] = None
-    ) -> bytes:
+    ) -> Iterator[list]:
         """
-        Generate violations export in CSV format
+        Yield formatted export rows (same order as EXPORT_COLUMNS).
+        
+        Rows are streamed from the DB in batches of EXPORT_BATCH_SIZE as they
+        are read, so memory stays flat however large the export is.
+        """
+        date_from, date_to = _default_period(date_from, date_to)
+        for row in db.execute(_export_query(date_from, date_to, severity, resolved)):
+            yield _format_export_row(row)
+    
+    @staticmethod
+    def stream_violations_csv(
+        db: Session,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        severity: Optional[str] = None,
+        resolved: Optional[bool] = None
+    ) -> Iterator[bytes]:
+        """
+        Stream violations export as CSV chunks
         
         Args:
-            db: Database session
+            db: Database session (must stay open until the iterator is exhausted)
             date_from: Start date filter
             date_to: End date filter
             severity: Filter by severity (critical, high, medium, low)
             resolved: Filter by resolution status (True/False/None for all)
             
-        Returns:
-            CSV file as bytes
+        Yields:
+            UTF-8 encoded CSV chunks, header first
         """
-        if date_from is None:
-            date_from = datetime.now() - timedelta(days=30)
-        if date_to is None:
-            date_to = datetime.now()
-        
-        # Build query
-        query = db.query(Violation).filter(
-            Violation.detected_at >= date_from,
-            Violation.detected_at <= date_to
-        )
-        
-        if resolved is True:
-            query = query.filter(Violation.resolved_at.isnot(None))
-        elif resolved is False:
-            query = query.filter(Violation.resolved_at.is_(None))
-        
-        violations = query.all()
-        
-        # Prepare data
-        data = []
-        for v in violations:
-            # Filter by severity if provided
-            if severity and v.rule and v.rule.severity != severity:
-                continue
-                
-            data.append({
-                'Violation ID': v.id,
-                'Detected At': v.detected_at.strftime('%Y-%m-%d %H:%M:%S') if v.detected_at else '',
-                'Agent': v.agent.hostname if v.agent else v.agent_id,
-                'Rule ID': v.rule.id if v.rule else v.rule_id,
-                'Rule Name': v.rule.name if v.rule else '',
-                'Severity': v.rule.severity.upper() if v.rule and v.rule.severity else '',
-                'Message': v.message or '',
-                'Confidence Score': v.confidence_score or 0,
-                'Resolved': 'Yes' if v.resolved_at else 'No',
-                'Resolved At': v.resolved_at.strftime('%Y-%m-%d %H:%M:%S') if v.resolved_at else '',
-                'Resolved By': v.resolved_by or '',
-                'Resolution Notes': v.resolution_notes or ''
-            })
-        
-        # Convert to DataFrame and CSV
-        df = pd.DataFrame(data)
         buffer = io.StringIO()
-        df.to_csv(buffer, index=False)
-        return buffer.getvalue().encode('utf-8')
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(EXPORT_COLUMNS)
+        
+        rows = ReportGenerator._violation_export_rows(db, date_from, date_to, severity, resolved)
+        for count, row in enumerate(rows, 1):
+            writer.writerow(row)
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate(0)
+        
+        yield buffer.getvalue().encode('utf-8')
     
     @staticmethod
-    def generate_violations_excel(
+    def stream_violations_excel(
         db: Session,
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
         severity: Optional[str] = None,
         resolved: Optional[bool] = None
-    ) -> bytes:
+    ) -> Iterator[bytes]:
         """
-        Generate violations export in Excel format
+        Stream violations export as an Excel workbook
+        
+        Rows go through a write-only openpyxl workbook. An xlsx file is a zip
+        archive that is only complete once saved, so the workbook is spooled
+        to a temporary file and then streamed out in chunks.
         
         Args:
-            db: Database session
+            db: Database session (must stay open until the iterator is exhausted)
             date_from: Start date filter
             date_to: End date filter
             severity: Filter by severity
             resolved: Filter by resolution status
             
-        Returns:
-            Excel file as bytes
+        Yields:
+            Chunks of the xlsx file
         """
-        if date_from is None:
-            date_from = datetime.now() - timedelta(days=30)
-        if date_to is None:
-            date_to = datetime.now()
-        
-        # Build query
-        query = db.query(Violation).filter(
-            Violation.detected_at >= date_from,
-            Violation.detected_at <= date_to
-        )
-        
-        if resolved is True:
-            query = query.filter(Violation.resolved_at.isnot(None))
-        elif resolved is False:
-            query = query.filter(Violation.resolved_at.is_(None))
-        
-        violations = query.all()
-        
-        # Prepare data
-        data = []
-        for v in violations:
-            # Filter by severity if provided
-            if severity and v.rule and v.rule.severity != severity:
-                continue
-                
-            data.append({
-                'Violation ID': v.id,
-                'Detected At': v.detected_at.strftime('%Y-%m-%d %H:%M:%S') if v.detected_at else '',
-                'Agent': v.agent.hostname if v.agent else v.agent_id,
-                'Rule ID': v.rule.id if v.rule else v.rule_id,
-                'Rule Name': v.rule.name if v.rule else '',
-                'Severity': v.rule.severity.upper() if v.rule and v.rule.severity else '',
-                'Message': v.message or '',
-                'Confidence Score': v.confidence_score or 0,
-                'Resolved': 'Yes' if v.resolved_at else 'No',
-                'Resolved At': v.resolved_at.strftime('%Y-%m-%d %H:%M:%S') if v.resolved_at else '',
-                'Resolved By': v.resolved_by or '',
-                'Resolution Notes': v.resolution_notes or ''
-            })
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Violations')
+        sheet.append(EXPORT_COLUMNS)
+        
+        for row in ReportGenerator._violation_export_rows(db, date_from, date_to, severity, resolved):
+            sheet.append(row)
+        
+        with tempfile.TemporaryFile() as tmp:
+            workbook.save(tmp)
+            tmp.seek(0)
+            while chunk := tmp.read(EXPORT_FILE_CHUNK):
+                yield chunk
+    
+    @staticmethod
+    def generate_violations_csv(
+        db: Session,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        severity: Optional[str] = None,
+        resolved: Optional[bool] = None
+    ) -> bytes:
+        """
+        Generate violations export in CSV format
         
-        # Convert to DataFrame and Excel
-        df = pd.DataFrame(data)
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Violations', index=False)
+        Returns:
+            CSV file as bytes (see stream_violations_csv for large exports)
+        """
+        return b''.join(ReportGenerator.stream_violations_csv(db, date_from, date_to, severity, resolved))
+    
+    @staticmethod
+    def generate_violations_excel(
+        db: Session,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        severity: Optional[str] = None,
+        resolved: Optional[bool] = None
+    ) -> bytes:
+        """
+        Generate violations export in Excel format
         
-        buffer.seek(0)
-        return buffer.getvalue()
+        Returns:
+            Excel file as bytes (see stream_violations_excel for large exports)
+        """
+        return b''.join(ReportGenerator.stream_violations_excel(db, date_from, date_to, severity, resolved))
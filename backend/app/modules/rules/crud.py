@@ -1,11 +1,64 @@
 """Rule CRUD operations."""
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
 from typing import List, Optional
 from fastapi import HTTPException, status
 
+from app.modules.websocket.service import manager
 from .models import Rule
 from .schemas import RuleCreate, RuleUpdate
 
+# Cached number of active rules (used for agent compliance).
+# Invalidated whenever a rule is created, deleted or (de)activated, here or
+# on another worker (see reset_active_rules_count).
+_active_rules_count: Optional[int] = None
+
+
+def get_active_rules_count(db: Session) -> int:
+    """Get number of active rules (cached)."""
+    global _active_rules_count
+    if _active_rules_count is None:
+        _active_rules_count = db.query(Rule).filter(Rule.active == True).count()
+    return _active_rules_count
+
+
+async def get_active_rules_count_async(db: AsyncSession) -> int:
+    """Get number of active rules (cached), async session variant."""
+    global _active_rules_count
+    if _active_rules_count is None:
+        _active_rules_count = await db.scalar(
+            select(func.count(Rule.id)).where(Rule.active == True)
+        )
+    return _active_rules_count
+
+
+async def get_rule_severity_async(db: AsyncSession, rule_id: Optional[int]) -> Optional[str]:
+    """Get a rule's severity (None if the rule does not exist)."""
+    if rule_id is None:
+        return None
+    return await db.scalar(select(Rule.severity).where(Rule.id == rule_id))
+
+
+def invalidate_active_rules_count(db: Session) -> None:
+    """Drop cached active-rule count and refresh all agents' compliance."""
+    global _active_rules_count
+    _active_rules_count = None
+    
+    from app.modules.agents.crud import update_all_agents_compliance
+    update_all_agents_compliance(db)
+
+
+def reset_active_rules_count(event: str = "") -> None:
+    """Drop the cached active-rule count after a rule change on another worker."""
+    global _active_rules_count
+    if event.startswith("rule_"):
+        _active_rules_count = None
+
+
+# The worker that made the change refreshes compliance; the others only reset
+manager.add_remote_listener(reset_active_rules_count)
+
 
 def get_rule(db: Session, rule_id: int) -> Rule:
     """Get rule by ID. Raises 404 if not found."""
@@ -40,11 +93,15 @@ def get_rules(
     limit: int = 100,
     active: Optional[bool] = None,
     severity: Optional[str] = None,
-    os_type: Optional[str] = None
+    os_type: Optional[str] = None,
+    after_id: Optional[int] = None
 ) -> List[Rule]:
-    """Get list of rules with optional filters."""
+    """Get list of rules with optional filters, ordered by id (keyset after `after_id`)."""
     query = db.query(Rule)
     
+    if after_id is not None:
+        query = query.filter(Rule.id > after_id)
+    
     if active is not None:
         query = query.filter(Rule.active == active)
     
@@ -54,7 +111,7 @@ def get_rules(
     if os_type:
         query = query.filter(Rule.os_type == os_type)
     
-    return query.offset(skip).limit(limit).all()
+    return query.order_by(Rule.id).offset(skip).limit(limit).all()
 
 
 def create_rule(db: Session, rule: RuleCreate) -> Rule:
@@ -69,6 +126,9 @@ def create_rule(db: Session, rule: RuleCreate) -> Rule:
     db_rule = Rule(**rule.model_dump())
     db.add(db_rule)
     db.commit()
+    invalidate_active_rules_count(db)
+    # Refresh after invalidating: the compliance update commits and expires db_rule,
+    # and async callers must not lazy-load it on the event loop
     db.refresh(db_rule)
     return db_rule
 
@@ -89,7 +149,9 @@ def update_rule(db: Session, rule_id: int, rule_update: RuleUpdate) -> Rule:
         setattr(db_rule, field, value)
     
     db.commit()
-    db.refresh(db_rule)
+    if "active" in update_data:
+        invalidate_active_rules_count(db)
+    db.refresh(db_rule)  # After invalidating (see create_rule)
     return db_rule
 
 
@@ -99,6 +161,7 @@ def delete_rule(db: Session, rule_id: int) -> None:
     
     db.delete(db_rule)
     db.commit()
+    invalidate_active_rules_count(db)
 
 
 def toggle_rule_active(db: Session, rule_id: int) -> Rule:
@@ -107,6 +170,7 @@ def toggle_rule_active(db: Session, rule_id: int) -> Rule:
     
     db_rule.active = not db_rule.active
     db.commit()
+    invalidate_active_rules_count(db)
     db.refresh(db_rule)
     return db_rule
 
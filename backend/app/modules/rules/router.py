@@ -1,35 +1,86 @@
 """Rule API router."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.core.dependencies import get_db
+from app.core.pagination import decode_cursor, paginate
+from app.core.serialization import FastJSONResponse
 from app.modules.websocket.service import manager
-from . import crud
+from . import crud, service
 from .schemas import RuleCreate, RuleUpdate, RuleResponse
 
 router = APIRouter(prefix="/rules", tags=["rules"])
 
 @router.post("/", response_model=RuleResponse, status_code=status.HTTP_201_CREATED)
-def create_rule(rule: RuleCreate, db: Session = Depends(get_db)):
+async def create_rule(rule: RuleCreate, db: Session = Depends(get_db)):
     """
     Create a new CIS compliance rule.
     """
-    return crud.create_rule(db, rule)
+    created_rule = await run_in_threadpool(crud.create_rule, db, rule)
+    
+    # Broadcast creation
+    await manager.broadcast_rule_created({
+        "id": created_rule.id,
+        "name": created_rule.name,
+        "severity": created_rule.severity,
+        "is_active": created_rule.active
+    })
+    
+    return created_rule
 
 @router.get("/", response_model=List[RuleResponse])
 def list_rules(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
     active: Optional[bool] = None,
     severity: Optional[str] = None,
     os_type: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Get list of rules with optional filters.
+    Get list of rules with optional filters, ordered by id (cursor-paginated).
+    """
+    after = decode_cursor(cursor, int)
+    rules = crud.get_rules(
+        db, skip=skip, limit=limit + 1, active=active, severity=severity, os_type=os_type,
+        after_id=after[0] if after else None
+    )
+    return paginate(response, rules, limit, lambda rule: (rule.id,))
+
+@router.get("/bundle")
+def get_rule_bundle(
+    request: Request,
+    os_type: Optional[str] = Query(None, description="OS type: ubuntu, windows (all if omitted)"),
+    db: Session = Depends(get_db)
+):
     """
-    return crud.get_rules(db, skip=skip, limit=limit, active=active, severity=severity, os_type=os_type)
+    Versioned bundle of the active rules, for agents.
+    
+    Returns {"version", "os_type", "count", "rules": [...]} with a strong
+    ETag (gzip-encoded if the client accepts it). Send the ETag back in
+    If-None-Match to get 304 Not Modified while the rules are unchanged. The
+    bundle is built once per rule change and then served from memory.
+    """
+    bundle = service.get_rule_bundle(db, os_type)
+    
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "ETag": bundle.gzip_etag if use_gzip else bundle.etag,
+        "Cache-Control": "no-cache",  # Revalidate every time (cheap 304)
+        "Vary": "Accept-Encoding"
+    }
+    
+    if bundle.matches(request.headers.get("if-none-match")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(bundle.gzip_body, media_type="application/json", headers=headers)
+    return Response(bundle.body, media_type="application/json", headers=headers)
 
 @router.get("/agent/{agent_rule_id}", response_model=RuleResponse)
 def get_rule_by_agent_id(agent_rule_id: str, db: Session = Depends(get_db)):
@@ -54,7 +105,8 @@ async def update_rule(rule_id: int, rule_update: RuleUpdate, db: Session = Depen
     Update rule information.
     
     """
-    updated_rule = crud.update_rule(db, rule_id, rule_update)
+    # Rule writes recompute every agent's compliance; keep that off the event loop
+    updated_rule = await run_in_threadpool(crud.update_rule, db, rule_id, rule_update)
     
     # Broadcast update
     await manager.broadcast_rule_updated({
@@ -72,7 +124,7 @@ async def toggle_rule_active(rule_id: int, db: Session = Depends(get_db)):
     """
     Toggle rule active/inactive status.
     """
-    toggled_rule = crud.toggle_rule_active(db, rule_id)
+    toggled_rule = await run_in_threadpool(crud.toggle_rule_active, db, rule_id)
     
     # Broadcast toggle
     await manager.broadcast_rule_toggled({
@@ -83,12 +135,12 @@ async def toggle_rule_active(rule_id: int, db: Session = Depends(get_db)):
     
     return toggled_rule
 
-@router.delete("/{rule_id}")
+@router.delete("/{rule_id}", response_class=FastJSONResponse)
 async def delete_rule(rule_id: int, db: Session = Depends(get_db)):
     """
     Delete rule.
     """
-    crud.delete_rule(db, rule_id)
+    await run_in_threadpool(crud.delete_rule, db, rule_id)
     
     # Broadcast deletion
     await manager.broadcast_rule_deleted(str(rule_id))
@@ -0,0 +1,78 @@
+"""Rule service layer: versioned rule bundles for agents."""
+import gzip
+import hashlib
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import SingleFlightCache
+from app.core.config import settings
+from app.core.serialization import json_dumps
+from app.modules.websocket.service import manager
+from .models import Rule
+from .schemas import RuleResponse
+
+
+class RuleBundle:
+    """
+    Encoded bundle of the active rules for one os_type.
+
+    The version is a hash of the rules, so identical rule sets always get
+    the same ETag (across restarts and workers). Both the plain and the
+    gzip body are built once per version.
+    """
+
+    def __init__(self, os_type: Optional[str], rules: List[dict]):
+        self.version = hashlib.sha256(json_dumps(rules)).hexdigest()[:32]
+        self.count = len(rules)
+        self.body = json_dumps({
+            "version": self.version,
+            "os_type": os_type,
+            "count": self.count,
+            "rules": rules
+        })
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+
+        # Strong ETags differ per content encoding
+        self.etag = f'"{self.version}"'
+        self.gzip_etag = f'"{self.version}-gzip"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an If-None-Match header names this version (either encoding)."""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+
+# Bundles change only with the rules; the TTL only bounds staleness after direct DB edits
+bundle_cache = SingleFlightCache(ttl=settings.RULE_BUNDLE_CACHE_TTL)
+
+
+def build_rule_bundle(db: Session, os_type: Optional[str] = None) -> RuleBundle:
+    """Query the active rules (all OS types if os_type is None) into a bundle."""
+    query = db.query(Rule).filter(Rule.active == True)
+    if os_type:
+        query = query.filter(Rule.os_type == os_type)
+
+    rules = [
+        RuleResponse.model_validate(rule).model_dump(mode="json")
+        for rule in query.order_by(Rule.id)
+    ]
+    return RuleBundle(os_type, rules)
+
+
+def get_rule_bundle(db: Session, os_type: Optional[str] = None) -> RuleBundle:
+    """Get the rule bundle for os_type, built at most once per rule change."""
+    return bundle_cache.get_or_compute(("rule_bundle", os_type), lambda: build_rule_bundle(db, os_type))
+
+
+def invalidate_rule_bundles(event: str = "") -> None:
+    """Drop cached bundles after any rule create/update/toggle/delete."""
+    if event.startswith("rule_"):
+        bundle_cache.invalidate()
+
+
+# Rule changes here and on other workers
+manager.add_listener(invalidate_rule_bundles)
+manager.add_remote_listener(invalidate_rule_bundles)
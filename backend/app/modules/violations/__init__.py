@@ -6,7 +6,8 @@ from .schemas import (
     ViolationUpdate,
     ViolationResponse,
     ViolationWithDetail,
-    ViolationStats
+    ViolationStats,
+    ViolationTimeSeries
 )
 from .router import router
 
@@ -18,5 +19,6 @@ __all__ = [
     "ViolationResponse",
     "ViolationWithDetail",
     "ViolationStats",
+    "ViolationTimeSeries",
     "router"
 ]
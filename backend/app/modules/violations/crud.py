@@ -1,8 +1,11 @@
 """Violation CRUD operations."""
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, DateTime, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, status
 
 from .models import Violation
@@ -22,15 +25,35 @@ def get_violation(db: Session, violation_id: int) -> Violation:
     return db_violation
 
 
-def get_violations(
+async def get_violation_async(db: AsyncSession, violation_id: int) -> Violation:
+    """Get violation by ID (async session). Raises 404 if not found."""
+    db_violation = await db.get(Violation, violation_id)
+    if not db_violation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Violation with id {violation_id} not found"
+        )
+    return db_violation
+
+
+def _newest_first(query, after: Optional[Tuple[datetime, int]] = None):
+    """
+    Order violations newest first on (detected_at, id), optionally continuing
+    after a keyset cursor. Served by the (..., detected_at DESC, id DESC) indexes.
+    """
+    if after is not None:
+        query = query.filter(tuple_(Violation.detected_at, Violation.id) < tuple_(*after))
+    return query.order_by(Violation.detected_at.desc(), Violation.id.desc())
+
+
+def violations_query(
     db: Session,
-    skip: int = 0,
-    limit: int = 100,
     agent_id: int = None,
     rule_id: int = None,
-    severity: str = None
-) -> List[Violation]:
-    """Get list of violations with optional filters."""
+    severity: str = None,
+    after: Optional[Tuple[datetime, int]] = None
+):
+    """Filtered violations query, newest first (see get_violations)."""
     query = db.query(Violation)
     
     if agent_id is not None:
@@ -43,35 +66,49 @@ def get_violations(
         # Join with Rule to filter by severity
         query = query.join(Rule).filter(Rule.severity == severity)
     
-    return query.offset(skip).limit(limit).all()
+    return _newest_first(query, after)
+
+
+def get_violations(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    agent_id: int = None,
+    rule_id: int = None,
+    severity: str = None,
+    after: Optional[Tuple[datetime, int]] = None
+) -> List[Violation]:
+    """
+    Get list of violations with optional filters, newest first.
+    
+    Pass `after` = (detected_at, id) of the last row seen to page by keyset
+    instead of offset.
+    """
+    return violations_query(db, agent_id, rule_id, severity, after).offset(skip).limit(limit).all()
 
 
 def get_violations_by_agent(
     db: Session,
     agent_id: int,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None
 ) -> List[Violation]:
-    """Get violations by agent."""
-    return db.query(Violation)\
-        .filter(Violation.agent_id == agent_id)\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    """Get violations by agent, newest first."""
+    query = db.query(Violation).filter(Violation.agent_id == agent_id)
+    return _newest_first(query, after).offset(skip).limit(limit).all()
 
 
 def get_violations_by_rule(
     db: Session,
     rule_id: int,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None
 ) -> List[Violation]:
-    """Get violations by rule."""
-    return db.query(Violation)\
-        .filter(Violation.rule_id == rule_id)\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    """Get violations by rule, newest first."""
+    query = db.query(Violation).filter(Violation.rule_id == rule_id)
+    return _newest_first(query, after).offset(skip).limit(limit).all()
 
 
 def get_recent_violations(
@@ -89,10 +126,45 @@ def get_recent_violations(
         .all()
 
 
-def create_violation(db: Session, violation: ViolationCreate) -> Violation:
-    """Create new violation. Validates agent and rule exist."""
+# Who resolves a finding when a rescan reports the rule as passing
+AUTO_RESOLVED_BY = "agent"
+AUTO_RESOLUTION_NOTES = "Auto-resolved: rule passed on rescan"
+
+
+def upsert_open_findings_stmt(values: Optional[dict] = None):
+    """
+    INSERT ... ON CONFLICT for the open-finding unique index.
+    
+    A report for an (agent, rule) that already has an open finding bumps its
+    last_seen_at / occurrence_count and refreshes message and confidence
+    instead of inserting a new row. Returns (id, occurrence_count); a count
+    of 1 means a new finding was opened.
+    """
+    stmt = pg_insert(Violation)
+    if values is not None:
+        stmt = stmt.values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Violation.agent_id, Violation.rule_id],
+        index_where=Violation.resolved_at.is_(None),
+        set_={
+            "message": stmt.excluded.message,
+            "confidence_score": stmt.excluded.confidence_score,
+            "last_seen_at": func.now(),
+            "occurrence_count": Violation.occurrence_count + 1,
+        }
+    )
+    return stmt
+
+
+def create_violation(db: Session, violation: ViolationCreate) -> Tuple[Violation, bool]:
+    """
+    Open a finding, or record another occurrence of the open one.
+    
+    Validates agent and rule exist. Returns (violation, created) where
+    created is False when an existing open finding was updated.
+    """
     # Validate agent exists
-    from app.modules.agents.crud import get_agent
+    from app.modules.agents.crud import get_agent, apply_unresolved_delta
     try:
         get_agent(db, violation.agent_id)  # Will raise 404 if not found
     except HTTPException:
@@ -111,12 +183,80 @@ def create_violation(db: Session, violation: ViolationCreate) -> Violation:
             detail=f"Rule with id {violation.rule_id} not found"
         )
     
-    # Create violation
-    db_violation = Violation(**violation.model_dump())
-    db.add(db_violation)
+    stmt = upsert_open_findings_stmt(violation.model_dump()).returning(Violation)
+    db_violation = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+    
+    created = db_violation.occurrence_count == 1
+    if created:
+        apply_unresolved_delta(db, violation.agent_id, 1)
     db.commit()
     db.refresh(db_violation)
-    return db_violation
+    return db_violation, created
+
+
+async def create_violation_async(db: AsyncSession, violation: ViolationCreate) -> Tuple[Violation, bool]:
+    """Async session variant of create_violation."""
+    from app.modules.agents.crud import apply_unresolved_delta_async
+    
+    if await db.get(Agent, violation.agent_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Agent with id {violation.agent_id} not found"
+        )
+    if await db.get(Rule, violation.rule_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Rule with id {violation.rule_id} not found"
+        )
+    
+    stmt = upsert_open_findings_stmt(violation.model_dump()).returning(Violation)
+    db_violation = (await db.scalars(stmt, execution_options={"populate_existing": True})).one()
+    
+    created = db_violation.occurrence_count == 1
+    if created:
+        await apply_unresolved_delta_async(db, violation.agent_id, 1)
+    await db.commit()
+    await db.refresh(db_violation)
+    return db_violation, created
+
+
+def resolve_open_findings(
+    db: Session,
+    agent_id: int,
+    rule_ids: List[int],
+    resolved_by: str = AUTO_RESOLVED_BY,
+    resolution_notes: str = AUTO_RESOLUTION_NOTES
+) -> List[Tuple[int, int]]:
+    """
+    Resolve the agent's open findings for the given rules (no commit).
+    
+    Used when a rescan reports the rules as passing. Returns
+    [(violation_id, rule_id), ...] for the findings that were closed.
+    """
+    from app.modules.agents.crud import apply_unresolved_delta
+    
+    if not rule_ids:
+        return []
+    
+    resolved = db.execute(
+        update(Violation)
+        .where(
+            Violation.agent_id == agent_id,
+            Violation.rule_id.in_(rule_ids),
+            Violation.resolved_at.is_(None)
+        )
+        .values(
+            resolved_at=func.now(),
+            resolved_by=resolved_by,
+            resolution_notes=resolution_notes
+        )
+        .returning(Violation.id, Violation.rule_id),
+        execution_options={"synchronize_session": False}
+    ).all()
+    
+    if resolved:
+        apply_unresolved_delta(db, agent_id, -len(resolved))
+    return [tuple(row) for row in resolved]
 
 
 def update_violation(
@@ -135,29 +275,106 @@ def update_violation(
             detail="No fields to update"
         )
     
+    was_open = db_violation.resolved_at is None
+    
     for field, value in update_data.items():
         setattr(db_violation, field, value)
     
-    db.commit()
+    is_open = db_violation.resolved_at is None
+    agent_id, rule_id = db_violation.agent_id, db_violation.rule_id
+    if was_open != is_open:
+        from app.modules.agents.crud import apply_unresolved_delta
+        apply_unresolved_delta(db, agent_id, 1 if is_open else -1)
+    
+    try:
+        db.commit()
+    except IntegrityError:
+        # Reopening while a newer open finding exists for the same agent/rule
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Agent {agent_id} already has an open finding for rule {rule_id}"
+        )
     db.refresh(db_violation)
     return db_violation
 
 
+async def update_violation_async(
+    db: AsyncSession,
+    violation_id: int,
+    violation_update: ViolationUpdate
+) -> Violation:
+    """Async session variant of update_violation."""
+    from app.modules.agents.crud import apply_unresolved_delta_async
+    
+    db_violation = await get_violation_async(db, violation_id)
+    
+    update_data = violation_update.model_dump(exclude_unset=True)
+    
+    if not update_data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No fields to update"
+        )
+    
+    was_open = db_violation.resolved_at is None
+    
+    for field, value in update_data.items():
+        setattr(db_violation, field, value)
+    
+    is_open = db_violation.resolved_at is None
+    agent_id, rule_id = db_violation.agent_id, db_violation.rule_id
+    if was_open != is_open:
+        await apply_unresolved_delta_async(db, agent_id, 1 if is_open else -1)
+    
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Agent {agent_id} already has an open finding for rule {rule_id}"
+        )
+    await db.refresh(db_violation)
+    return db_violation
+
+
 def delete_violation(db: Session, violation_id: int) -> None:
     """Delete violation. Raises 404 if not found."""
+    from app.modules.agents.crud import apply_unresolved_delta
+    
     db_violation = get_violation(db, violation_id)
+    if db_violation.resolved_at is None:
+        apply_unresolved_delta(db, db_violation.agent_id, -1)
     db.delete(db_violation)
     db.commit()
 
 
+async def delete_violation_async(db: AsyncSession, violation_id: int) -> Violation:
+    """Async session variant of delete_violation. Returns the deleted violation."""
+    from app.modules.agents.crud import apply_unresolved_delta_async
+    
+    db_violation = await get_violation_async(db, violation_id)
+    if db_violation.resolved_at is None:
+        await apply_unresolved_delta_async(db, db_violation.agent_id, -1)
+    await db.delete(db_violation)
+    await db.commit()
+    return db_violation
+
 
 def delete_violations_by_agent(db: Session, agent_id: int) -> int:
     """Delete all violations for a specific agent. Returns count."""
-    deleted_count = db.query(Violation)\
+    from app.modules.agents.crud import apply_unresolved_delta
+    
+    unresolved_count = db.query(Violation)\
+        .filter(Violation.agent_id == agent_id, Violation.resolved_at.is_(None))\
+        .delete(synchronize_session=False)
+    resolved_count = db.query(Violation)\
         .filter(Violation.agent_id == agent_id)\
         .delete(synchronize_session=False)
+    apply_unresolved_delta(db, agent_id, -unresolved_count)
     db.commit()
-    return deleted_count
+    return unresolved_count + resolved_count
 
 def get_total_violations_count(db: Session) -> int:
     """Get total count of violations."""
@@ -209,24 +426,125 @@ def get_recent_violations_count(db: Session, hours: int = 24) -> int:
 
 
 
+# Supported time-series bucket sizes
+TIMESERIES_BUCKETS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+# Label format per bucket size
+TIMESERIES_LABELS = {
+    "hour": "%Y-%m-%dT%H:00",
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",
+}
+
+
+def _truncate_to_bucket(value: datetime, bucket: str) -> datetime:
+    """Truncate a naive UTC datetime the same way date_trunc() does."""
+    if bucket == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        value -= timedelta(days=value.weekday())  # ISO week starts on Monday
+    return value
+
+
+def get_violation_timeseries(
+    db: Session,
+    days: int = 7,
+    bucket: str = "day",
+    series: Optional[str] = None,
+    agent_id: Optional[int] = None
+) -> dict:
+    """
+    Get violation counts per time bucket over the last `days` days.
+    
+    Counts come from one GROUP BY date_trunc(bucket, detected_at) query
+    (optionally also grouped by severity or agent); empty buckets are
+    zero-filled here. Buckets are in UTC.
+    """
+    if bucket not in TIMESERIES_BUCKETS:
+        raise ValueError(f"Unsupported bucket: {bucket}")
+    
+    step = TIMESERIES_BUCKETS[bucket]
+    now = datetime.utcnow()
+    start = _truncate_to_bucket(now - timedelta(days=days) + step, bucket)
+    end = _truncate_to_bucket(now, bucket)
+    
+    buckets = []
+    current = start
+    while current <= end:
+        buckets.append(current)
+        current += step
+    bucket_index = {value: idx for idx, value in enumerate(buckets)}
+    
+    bucket_col = func.date_trunc(
+        bucket,
+        func.timezone("UTC", Violation.detected_at),
+        type_=DateTime
+    ).label("bucket")
+    
+    columns = [bucket_col]
+    if series == "severity":
+        columns.append(Rule.severity)
+    elif series == "agent":
+        columns.append(Violation.agent_id)
+    
+    query = db.query(*columns, func.count(Violation.id))
+    
+    if series == "severity":
+        query = query.join(Rule, Violation.rule_id == Rule.id)
+    
+    query = query.filter(Violation.detected_at >= start.replace(tzinfo=timezone.utc))
+    
+    if agent_id is not None:
+        query = query.filter(Violation.agent_id == agent_id)
+    
+    rows = query.group_by(*columns).all()
+    
+    totals = [0] * len(buckets)
+    series_counts = {}
+    
+    for row in rows:
+        bucket_start = row[0]
+        if bucket_start.tzinfo is not None:
+            bucket_start = bucket_start.astimezone(timezone.utc).replace(tzinfo=None)
+        
+        idx = bucket_index.get(bucket_start)
+        if idx is None:
+            continue
+        
+        count = row[-1]
+        totals[idx] += count
+        
+        if series:
+            key = str(row[1]) if row[1] is not None else "unknown"
+            series_counts.setdefault(key, [0] * len(buckets))[idx] += count
+    
+    if series == "severity":
+        for severity in ("critical", "high", "medium", "low"):
+            series_counts.setdefault(severity, [0] * len(buckets))
+    
+    label_format = TIMESERIES_LABELS[bucket]
+    
+    return {
+        "bucket": bucket,
+        "start": start,
+        "end": end + step,
+        "points": [
+            {"date": value.strftime(label_format), "count": count}
+            for value, count in zip(buckets, totals)
+        ],
+        "series": series_counts if series else None
+    }
+
+
 def get_7day_trend(db: Session) -> List[dict]:
     """Get 7-day violation trend (count per day for last 7 days)."""
-    today = datetime.utcnow().date()
-    trend = []
-    
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        day_start = datetime.combine(day, datetime.min.time())
-        day_end = datetime.combine(day, datetime.max.time())
-        count = db.query(Violation)\
-            .filter(Violation.detected_at >= day_start, Violation.detected_at <= day_end)\
-            .count()
-        trend.append({
-            "date": day.strftime("%Y-%m-%d"), 
-            "count": count
-        })
-    
-    return trend
+    return get_violation_timeseries(db, days=7, bucket="day")["points"]
 
 
 def get_top_5_recent_violations(db: Session) -> List[Violation]:
@@ -1,5 +1,5 @@
 """Violation model"""
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -12,7 +12,11 @@ class Violation(Base):
     rule_id = Column(Integer, ForeignKey("rules.id"))
     message = Column(String)
     confidence_score = Column(Float)  
-    detected_at = Column(DateTime(timezone=True), server_default=func.now())
+    detected_at = Column(DateTime(timezone=True), server_default=func.now())  # First seen
+    
+    # Open-finding lifecycle: rescans of a still-failing rule update these
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    occurrence_count = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Resolution tracking fields
     resolved_at = Column(DateTime(timezone=True), nullable=True)
@@ -22,3 +26,16 @@ class Violation(Base):
     # Relationships
     agent = relationship("Agent", back_populates="violations")
     rule = relationship("Rule", back_populates="violations")
+
+    __table_args__ = (
+        # Newest-first listing, globally and per agent/rule
+        Index("ix_violations_detected_at_id", detected_at.desc(), id.desc()),
+        Index("ix_violations_agent_id_detected_at", agent_id, detected_at.desc(), id.desc()),
+        Index("ix_violations_rule_id_detected_at", rule_id, detected_at.desc(), id.desc()),
+        # At most one open finding per (agent, rule); also serves open-per-agent lookups
+        Index(
+            "uq_violations_open_finding", agent_id, rule_id,
+            unique=True,
+            postgresql_where=resolved_at.is_(None)
+        ),
+    )
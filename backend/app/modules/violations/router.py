@@ -1,45 +1,55 @@
 """Violation API router."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from datetime import datetime
 from loguru import logger
 
-from app.core.dependencies import get_db
+from app.core.dependencies import get_db, get_async_db
+from app.core.pagination import decode_cursor, paginate
+from app.core.serialization import FastJSONResponse
+from app.core.streaming import ndjson_response, wants_ndjson
 from app.modules.websocket.service import manager
-from app.modules.agents import crud as agents_crud
-from . import crud
+from app.modules.rules.crud import get_rule_severity_async
+from . import crud, service
 from .schemas import (
     ViolationCreate,
     ViolationCreateFromAgent,
     ViolationUpdate, 
     ViolationResponse,
     ViolationWithDetail,
-    ViolationStats
+    ViolationStats,
+    ViolationTimeSeries
 )
 
 router = APIRouter(prefix="/violations", tags=["violations"])
 
 
 @router.post("/", response_model=ViolationResponse, status_code=status.HTTP_201_CREATED)
-async def create_violation(violation: ViolationCreate, db: Session = Depends(get_db)):
+async def create_violation(
+    violation: ViolationCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Create a new violation record.
+    
+    If the agent already has an open finding for the rule, that finding's
+    last_seen_at / occurrence_count are updated instead (200 OK).
     """
-    new_violation = crud.create_violation(db, violation)
-  
-    from app.modules.agents import crud as agents_crud
-    try:
-        logger.info(f"Updating compliance for agent {new_violation.agent_id}")
-        agents_crud.update_agent_compliance(db, new_violation.agent_id)
-        logger.info(f"Compliance updated successfully")
-    except Exception as e:
-        # Log but don't fail the request
-        logger.error(f"Failed to update agent compliance: {e}")
+    new_violation, created = await crud.create_violation_async(db, violation)
+    
+    if not created:
+        response.status_code = status.HTTP_200_OK
+        service.mark_stats_changed()
+        return new_violation
     
     await manager.broadcast_violation_created({
         "id": new_violation.id,
         "agent_id": new_violation.agent_id,
         "rule_id": new_violation.rule_id,
+        "severity": await get_rule_severity_async(db, new_violation.rule_id),
         "message": new_violation.message,
         "confidence_score": new_violation.confidence_score,
         "detected_at": new_violation.detected_at.isoformat() if new_violation.detected_at else None
@@ -49,9 +59,18 @@ async def create_violation(violation: ViolationCreate, db: Session = Depends(get
 
 
 @router.post("/from-agent", response_model=ViolationResponse, status_code=status.HTTP_201_CREATED)
-def create_violation_from_agent(violation: ViolationCreateFromAgent, db: Session = Depends(get_db)):
+def create_violation_from_agent(
+    violation: ViolationCreateFromAgent,
+    response: Response,
+    db: Session = Depends(get_db)
+):
     """
-    Create violation from agent (uses agent_rule_id instead of rule_id).
+    Report a check result from agent (uses agent_rule_id instead of rule_id).
+    
+    - FAIL/ERROR: opens a finding (201), or updates the open one (200)
+    - PASS: resolves the open finding (200), or 204 if there was none
+    
+    The rule's latest status is recorded in agent_rule_state either way.
     """
     from app.modules.rules import crud as rules_crud
     rule = rules_crud.get_rule_by_agent_id(db, violation.agent_rule_id)
@@ -62,6 +81,27 @@ def create_violation_from_agent(violation: ViolationCreateFromAgent, db: Session
             detail=f"Rule with agent_rule_id '{violation.agent_rule_id}' not found"
         )
     
+    from app.modules.agents.crud import get_agent
+    try:
+        get_agent(db, violation.agent_id)
+    except HTTPException:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Agent with id {violation.agent_id} not found"
+        )
+    
+    from app.modules.compliance.crud import record_rule_states
+    record_rule_states(db, violation.agent_id, {rule.id: (violation.status, violation.message)})
+    
+    if violation.status == "PASS":
+        resolved = crud.resolve_open_findings(db, violation.agent_id, [rule.id])
+        db.commit()
+        if not resolved:
+            return Response(status_code=status.HTTP_204_NO_CONTENT)
+        service.mark_stats_changed()
+        response.status_code = status.HTTP_200_OK
+        return crud.get_violation(db, resolved[0][0])
+    
     violation_data = ViolationCreate(
         agent_id=violation.agent_id,
         rule_id=rule.id, 
@@ -69,10 +109,14 @@ def create_violation_from_agent(violation: ViolationCreateFromAgent, db: Session
         confidence_score=violation.confidence_score
     )
     
-    return crud.create_violation(db, violation_data)
+    new_violation, created = crud.create_violation(db, violation_data)
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    service.mark_stats_changed()
+    return new_violation
 
 
-@router.post("/agents/{agent_id}/violations/bulk")
+@router.post("/agents/{agent_id}/violations/bulk", response_class=FastJSONResponse)
 def create_violations_bulk(
     agent_id: int,
     violations_data: dict,
@@ -84,81 +128,72 @@ def create_violations_bulk(
     - **agent_id**: ID of the agent reporting violations
     - **violations_data**: Dict with 'violations' list containing violation reports
     
-    Returns count of successfully created violations.
+    All items are applied in a single transaction: FAIL/ERROR items open or
+    update the (agent, rule) finding, PASS items resolve it. Returns counts
+    plus per-item status (created / updated / resolved / unchanged / error)
+    in 'results'.
     """
-    from app.modules.rules import crud as rules_crud
-    
     violations_list = violations_data.get('violations', [])
     
     if not violations_list:
         return {"message": "No violations to create", "created_count": 0}
     
-    created_count = 0
-    errors = []
-    
-    for idx, vio in enumerate(violations_list):
-        try:
-            # Lookup rule by agent_rule_id or rule_id
-            rule_id = vio.get('rule_id')
-            agent_rule_id = vio.get('agent_rule_id')
-            
-            if agent_rule_id:
-                try:
-                    rule = rules_crud.get_rule_by_agent_id(db, agent_rule_id)
-                    rule_id = rule.id
-                except HTTPException:
-                    errors.append(f"Violation {idx}: Rule '{agent_rule_id}' not found")
-                    continue
-            
-            if not rule_id:
-                errors.append(f"Violation {idx}: Missing rule_id or agent_rule_id")
-                continue
-            
-            # Create violation
-            violation_data = ViolationCreate(
-                agent_id=vio.get('agent_id', agent_id),
-                rule_id=rule_id,
-                message=vio.get('message', 'Violation detected'),
-                confidence_score=vio.get('confidence_score', 1.0)
-            )
-            
-            crud.create_violation(db, violation_data)
-            created_count += 1
-            
-        except Exception as e:
-            errors.append(f"Violation {idx}: {str(e)}")
-            continue
+    result = service.ingest_violations_bulk(db, agent_id, violations_list)
     
-    return {
-        "message": f"Created {created_count}/{len(violations_list)} violations",
-        "created_count": created_count,
-        "total_submitted": len(violations_list),
-        "errors": errors if errors else None
-    }
+    if result["created_count"] or result["updated_count"] or result["resolved_count"]:
+        service.mark_stats_changed()
+    
+    return result
+
 
 
+def _violation_key(violation):
+    """Keyset sort key of a violation list (newest first)."""
+    return violation.detected_at, violation.id
+
 
 @router.get("/", response_model=List[ViolationResponse])
 def list_violations(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
     agent_id: Optional[int] = Query(None, description="Filter by agent ID"),
     rule_id: Optional[int] = Query(None, description="Filter by rule ID"),
     severity: Optional[str] = Query(None, description="Filter by severity (critical, high, medium, low)"),
+    stream: bool = Query(False, description="Stream rows as NDJSON (same as Accept: application/x-ndjson)"),
     db: Session = Depends(get_db)
 ):
     """
-    Get list of violations with optional filters.
+    Get list of violations with optional filters, newest first.
+    
+    Pass the X-Next-Cursor response header back as `cursor` to get the next
+    page; every page costs the same regardless of depth. `skip` still works
+    but scans all skipped rows.
     
+    With `?stream=true` or `Accept: application/x-ndjson` the rows are
+    streamed as NDJSON (one object per line, no X-Next-Cursor).
     """
-    return crud.get_violations(
+    after = decode_cursor(cursor, datetime, int)
+    
+    if wants_ndjson(request, stream):
+        return ndjson_response(
+            lambda stream_db: crud.violations_query(stream_db, agent_id, rule_id, severity, after)
+            .offset(skip).limit(limit),
+            ViolationResponse
+        )
+    
+    violations = crud.get_violations(
         db, 
         skip=skip, 
-        limit=limit, 
+        limit=limit + 1, 
         agent_id=agent_id, 
         rule_id=rule_id, 
-        severity=severity
+        severity=severity,
+        after=after
     )
+    return paginate(response, violations, limit, _violation_key)
 
 @router.get("/recent", response_model=List[ViolationResponse])
 def get_recent_violations(
@@ -176,11 +211,14 @@ def get_recent_violations(
 def get_violation_statistics(db: Session = Depends(get_db)):
     """
     Get comprehensive violation statistics.
+    
+    Cached in-process; invalidated on every violation/agent/rule change.
+    Clients should refetch on the debounced `stats_changed` WebSocket event.
     """
-    return crud.get_violation_stats(db)
+    return service.get_violation_stats_cached(db)
 
 
-@router.get("/stats/count")
+@router.get("/stats/count", response_class=FastJSONResponse)
 def get_total_count(db: Session = Depends(get_db)):
     """Get total count of all violations."""
     return {
@@ -188,7 +226,7 @@ def get_total_count(db: Session = Depends(get_db)):
     }
 
 
-@router.get("/stats/by-severity")
+@router.get("/stats/by-severity", response_class=FastJSONResponse)
 def get_by_severity(db: Session = Depends(get_db)):
     """
     Get violations count grouped by severity.
@@ -198,7 +236,7 @@ def get_by_severity(db: Session = Depends(get_db)):
     return crud.get_violations_count_by_severity(db)
 
 
-@router.get("/stats/by-agent")
+@router.get("/stats/by-agent", response_class=FastJSONResponse)
 def get_by_agent(db: Session = Depends(get_db)):
     """
     Get violations count grouped by agent.
@@ -207,7 +245,7 @@ def get_by_agent(db: Session = Depends(get_db)):
     return crud.get_violations_count_by_agent(db)
 
 
-@router.get("/stats/recent-count")
+@router.get("/stats/recent-count", response_class=FastJSONResponse)
 def get_recent_count(
     hours: int = Query(24, ge=1, le=168, description="Number of hours (1-168)"),
     db: Session = Depends(get_db)
@@ -222,7 +260,7 @@ def get_recent_count(
     }
 
 
-@router.get("/stats/7day-trend")
+@router.get("/stats/7day-trend", response_class=FastJSONResponse)
 def get_7day_trend(db: Session = Depends(get_db)):
     """
     Get 7-day violation trend (count per day for last 7 days).
@@ -230,6 +268,28 @@ def get_7day_trend(db: Session = Depends(get_db)):
     return crud.get_7day_trend(db)
 
 
+@router.get("/stats/timeseries", response_model=ViolationTimeSeries)
+def get_violation_timeseries(
+    days: int = Query(7, ge=1, le=365, description="Window size in days (1-365)"),
+    bucket: str = Query("day", pattern="^(hour|day|week)$", description="Bucket size: hour, day, week"),
+    series: Optional[str] = Query(None, pattern="^(severity|agent)$", description="Optional breakdown: severity, agent"),
+    agent_id: Optional[int] = Query(None, description="Filter by agent ID"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get violation counts per hour/day/week over an arbitrary window.
+    
+    Computed with a single GROUP BY query; empty buckets are zero-filled.
+    """
+    if bucket == "hour" and days > 31:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Hourly buckets are limited to a 31-day window"
+        )
+    
+    return crud.get_violation_timeseries(db, days=days, bucket=bucket, series=series, agent_id=agent_id)
+
+
 @router.get("/stats/top-5-recent", response_model=List[ViolationResponse])
 def get_top_5_recent(db: Session = Depends(get_db)):
     """
@@ -242,27 +302,37 @@ def get_top_5_recent(db: Session = Depends(get_db)):
 @router.get("/agent/{agent_id}", response_model=List[ViolationResponse])
 def get_violations_by_agent(
     agent_id: int,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
     db: Session = Depends(get_db)
 ):
     """
-    Get all violations for a specific agent.
+    Get all violations for a specific agent, newest first (cursor-paginated).
     """
-    return crud.get_violations_by_agent(db, agent_id, skip=skip, limit=limit)
+    violations = crud.get_violations_by_agent(
+        db, agent_id, skip=skip, limit=limit + 1, after=decode_cursor(cursor, datetime, int)
+    )
+    return paginate(response, violations, limit, _violation_key)
 
 
 @router.get("/rule/{rule_id}", response_model=List[ViolationResponse])
 def get_violations_by_rule(
     rule_id: int,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
     db: Session = Depends(get_db)
 ):
     """
-    Get all violations for a specific rule.
+    Get all violations for a specific rule, newest first (cursor-paginated).
     """
-    return crud.get_violations_by_rule(db, rule_id, skip=skip, limit=limit)
+    violations = crud.get_violations_by_rule(
+        db, rule_id, skip=skip, limit=limit + 1, after=decode_cursor(cursor, datetime, int)
+    )
+    return paginate(response, violations, limit, _violation_key)
 
 
 @router.get("/{violation_id}", response_model=ViolationResponse)
@@ -276,24 +346,21 @@ def get_violation(violation_id: int, db: Session = Depends(get_db)):
 async def update_violation(
     violation_id: int, 
     violation_update: ViolationUpdate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update violation information.
     
     """
-    updated_violation = crud.update_violation(db, violation_id, violation_update)
-    
-    # Update agent compliance after resolution
-    try:
-        agents_crud.update_agent_compliance(db, updated_violation.agent_id)
-    except Exception as e:
-        logger.warning(f"Failed to update agent compliance: {str(e)}")
+    updated_violation = await crud.update_violation_async(db, violation_id, violation_update)
     
     # If resolved, broadcast resolution event
     if violation_update.resolved_at or violation_update.resolved_by:
         await manager.broadcast_violation_resolved({
             "id": updated_violation.id,
+            "agent_id": updated_violation.agent_id,
+            "rule_id": updated_violation.rule_id,
+            "severity": await get_rule_severity_async(db, updated_violation.rule_id),
             "resolved_at": updated_violation.resolved_at.isoformat() if updated_violation.resolved_at else None,
             "resolved_by": updated_violation.resolved_by,
             "resolution_notes": updated_violation.resolution_notes
@@ -301,28 +368,20 @@ async def update_violation(
     
     return updated_violation
 
-@router.delete("/{violation_id}")
-async def delete_violation(violation_id: int, db: Session = Depends(get_db)):
+@router.delete("/{violation_id}", response_class=FastJSONResponse)
+async def delete_violation(violation_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Delete a single violation.
     """
-    # Get violation first to retrieve agent_id before deletion
-    violation = crud.get_violation(db, violation_id)
-    if not violation:
-        raise HTTPException(status_code=404, detail="Violation not found")
-    
-    agent_id = violation.agent_id
-    
-    crud.delete_violation(db, violation_id)
-    
-    # Update agent compliance after deletion
-    try:
-        agents_crud.update_agent_compliance(db, agent_id)
-    except Exception as e:
-        logger.warning(f"Failed to update agent compliance: {str(e)}")
+    deleted = await crud.delete_violation_async(db, violation_id)  # Raises 404 if not found
     
     # Broadcast deletion
-    await manager.broadcast_violation_deleted(str(violation_id))
+    await manager.broadcast_violation_deleted(
+        str(violation_id),
+        agent_id=deleted.agent_id,
+        rule_id=deleted.rule_id,
+        severity=await get_rule_severity_async(db, deleted.rule_id)
+    )
     
     return {
         "message": "Violation deleted successfully",
@@ -330,12 +389,13 @@ async def delete_violation(violation_id: int, db: Session = Depends(get_db)):
     }
 
 
-@router.delete("/agent/{agent_id}/all")
+@router.delete("/agent/{agent_id}/all", response_class=FastJSONResponse)
 def delete_agent_violations(agent_id: int, db: Session = Depends(get_db)):
     """
     Delete all violations for a specific agent.
     """
     deleted_count = crud.delete_violations_by_agent(db, agent_id)
+    service.mark_stats_changed()
     return {
         "message": f"Deleted {deleted_count} violations for agent {agent_id}",
         "agent_id": agent_id,
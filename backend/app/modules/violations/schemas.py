@@ -1,6 +1,6 @@
 """Violation schemas for request/response validation."""
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Optional, Literal
 from datetime import datetime
 
 
@@ -35,6 +35,10 @@ class ViolationCreateFromAgent(BaseModel):
         le=1.0,
         description="Độ tin cậy (0.0-1.0)"
     )
+    status: Literal["FAIL", "ERROR", "PASS"] = Field(
+        default="FAIL",
+        description="Kết quả check: FAIL/ERROR mở (hoặc cập nhật) finding, PASS tự resolve finding đang mở"
+    )
 
 
 class ViolationUpdate(BaseModel):
@@ -56,6 +60,8 @@ class ViolationResponse(ViolationBase):
     """Schema for violation response."""
     id: int = Field(..., description="Violation ID")
     detected_at: datetime = Field(..., description="Thời điểm phát hiện violation")
+    last_seen_at: Optional[datetime] = Field(None, description="Lần gần nhất scan còn thấy violation")
+    occurrence_count: int = Field(1, description="Số lần scan phát hiện violation khi còn mở")
     resolved_at: Optional[datetime] = Field(None, description="Thời gian resolved")
     resolved_by: Optional[str] = Field(None, description="User đã resolve")
     resolution_notes: Optional[str] = Field(None, description="Ghi chú khi resolve")
@@ -93,4 +99,23 @@ class ViolationStats(BaseModel):
         ...,
         description="Top 5 agents có nhiều violations nhất: [{agent_id, hostname, violation_count}, ...]"
     )
+    trend: list = Field(
+        default_factory=list,
+        description="Violations mỗi ngày trong 7 ngày qua: [{date, count}, ...]"
+    )
+
+
+class ViolationTimeSeries(BaseModel):
+    """Schema for violation time-series counts."""
+    bucket: str = Field(..., description="Bucket size: hour, day, week")
+    start: datetime = Field(..., description="Bắt đầu bucket đầu tiên (UTC)")
+    end: datetime = Field(..., description="Kết thúc bucket cuối cùng (UTC, exclusive)")
+    points: list = Field(
+        ...,
+        description="Tổng violations mỗi bucket: [{date, count}, ...]"
+    )
+    series: Optional[dict] = Field(
+        None,
+        description="Counts theo severity hoặc agent, cùng thứ tự với points: {key: [count, ...]}"
+    )
 
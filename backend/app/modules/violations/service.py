@@ -0,0 +1,218 @@
+"""Violation service layer for bulk ingestion and cached statistics."""
+from sqlalchemy.orm import Session
+from typing import List
+from pydantic import ValidationError
+
+from . import crud
+from .models import Violation
+from .schemas import ViolationCreate
+from app.core.cache import SingleFlightCache
+from app.core.config import settings
+from app.modules.rules.models import Rule
+from app.modules.agents.crud import get_agent, apply_unresolved_delta
+from app.modules.compliance.crud import record_rule_states
+from app.modules.websocket.service import manager
+
+STATS_CACHE_KEY = "violation_stats"
+
+# Agent check results accepted by the bulk endpoint
+CHECK_STATUSES = {"FAIL", "ERROR", "PASS"}
+
+# Shared by all requests in this process; see mark_stats_changed()
+stats_cache = SingleFlightCache(ttl=settings.STATS_CACHE_TTL)
+
+
+def get_violation_stats_cached(db: Session) -> dict:
+    """
+    Get violation statistics, served from cache while fresh.
+    
+    Concurrent requests on a cold cache share a single computation.
+    """
+    return stats_cache.get_or_compute(STATS_CACHE_KEY, lambda: crud.get_violation_stats(db))
+
+
+def mark_stats_changed(event: str = "") -> None:
+    """Invalidate cached stats and schedule a debounced stats_changed push."""
+    stats_cache.invalidate()
+    manager.notify_stats_changed()
+
+
+# Every data-change broadcast invalidates the stats
+manager.add_listener(mark_stats_changed)
+
+# Changes made by other workers only invalidate; they push stats_changed themselves
+manager.add_remote_listener(lambda event: stats_cache.invalidate())
+
+
+def _violation_event(violation_id: int, agent_id: int, rule_id: int, severity_by_rule: dict) -> dict:
+    """WebSocket event data for a finding opened or resolved by bulk ingest."""
+    return {
+        "id": violation_id,
+        "agent_id": agent_id,
+        "rule_id": rule_id,
+        "severity": severity_by_rule.get(rule_id)
+    }
+
+
+def ingest_violations_bulk(db: Session, agent_id: int, violations_list: List[dict]) -> dict:
+    """
+    Apply a batch of agent check results in one transaction.
+
+    Rule references (agent_rule_id or rule_id) are resolved with one IN query
+    each and the agent is validated once. FAIL/ERROR items are upserted into
+    the open-finding index with a single executemany INSERT ... ON CONFLICT,
+    so a still-failing rule updates its open finding instead of adding a row;
+    PASS items resolve the open finding with a single UPDATE. The latest
+    status of every reported rule is upserted into agent_rule_state and the
+    agent's unresolved counter is adjusted in the same transaction. Returns
+    per-item status.
+    
+    New and resolved findings are announced with one coalesced WebSocket
+    event each per request (violations_created / violations_resolved).
+    """
+    get_agent(db, agent_id)  # Will raise 404 if not found
+
+    agent_rule_ids = {
+        vio.get('agent_rule_id') for vio in violations_list
+        if isinstance(vio, dict) and vio.get('agent_rule_id')
+    }
+    rule_ids = {
+        vio.get('rule_id') for vio in violations_list
+        if isinstance(vio, dict) and not vio.get('agent_rule_id') and isinstance(vio.get('rule_id'), int)
+    }
+
+    rules_by_agent_id = {}
+    severity_by_rule = {}   # rule_id -> severity, for event topics
+    if agent_rule_ids:
+        for agent_rule_id, rule_id, severity in (
+            db.query(Rule.agent_rule_id, Rule.id, Rule.severity)
+            .filter(Rule.agent_rule_id.in_(agent_rule_ids))
+            .all()
+        ):
+            rules_by_agent_id[agent_rule_id] = rule_id
+            severity_by_rule[rule_id] = severity
+
+    existing_rule_ids = set()
+    if rule_ids:
+        for rule_id, severity in db.query(Rule.id, Rule.severity).filter(Rule.id.in_(rule_ids)).all():
+            existing_rule_ids.add(rule_id)
+            severity_by_rule[rule_id] = severity
+
+    results = []
+    rows_by_rule = {}       # rule_id -> row to upsert (one per rule)
+    open_indexes = {}       # rule_id -> item indexes reporting FAIL/ERROR
+    pass_indexes = {}       # rule_id -> item indexes reporting PASS
+    rule_states = {}        # rule_id -> (status, output) for agent_rule_state
+
+    for idx, vio in enumerate(violations_list):
+        error = None
+        rule_id = None
+        check_status = vio.get('status', 'FAIL') if isinstance(vio, dict) else None
+
+        if not isinstance(vio, dict):
+            error = "Invalid violation payload"
+        elif vio.get('agent_id', agent_id) != agent_id:
+            error = f"agent_id {vio.get('agent_id')} does not match agent {agent_id}"
+        elif check_status not in CHECK_STATUSES:
+            error = f"Invalid status '{check_status}'"
+        elif vio.get('agent_rule_id'):
+            rule_id = rules_by_agent_id.get(vio['agent_rule_id'])
+            if rule_id is None:
+                error = f"Rule '{vio['agent_rule_id']}' not found"
+        elif vio.get('rule_id'):
+            rule_id = vio['rule_id']
+            if rule_id not in existing_rule_ids:
+                error = f"Rule with id {rule_id} not found"
+        else:
+            error = "Missing rule_id or agent_rule_id"
+
+        if error is None:
+            rule_states[rule_id] = (check_status, vio.get('message'))
+
+        if error is None and check_status == "PASS":
+            pass_indexes.setdefault(rule_id, []).append(idx)
+        elif error is None:
+            try:
+                violation_data = ViolationCreate(
+                    agent_id=agent_id,
+                    rule_id=rule_id,
+                    message=vio.get('message', 'Violation detected'),
+                    confidence_score=vio.get('confidence_score', 1.0)
+                )
+                # Latest report for a rule wins within the batch
+                rows_by_rule[rule_id] = violation_data.model_dump()
+                open_indexes.setdefault(rule_id, []).append(idx)
+            except ValidationError as e:
+                error = str(e)
+
+        results.append({
+            "index": idx,
+            "status": "error" if error else None,
+            "id": None,
+            "error": error
+        })
+
+    # A rule reported both ways in one batch stays open
+    resolved = crud.resolve_open_findings(
+        db, agent_id, [rule_id for rule_id in pass_indexes if rule_id not in rows_by_rule]
+    )
+    resolved_by_rule = {rule_id: violation_id for violation_id, rule_id in resolved}
+    for rule_id, indexes in pass_indexes.items():
+        for idx in indexes:
+            results[idx]["status"] = "resolved" if rule_id in resolved_by_rule else "unchanged"
+            results[idx]["id"] = resolved_by_rule.get(rule_id)
+
+    created_count = 0
+    created_events = []
+    if rows_by_rule:
+        # RETURNING row order is not the parameter order (updated rows keep their
+        # older ids), so match rows to rules by rule_id, unique within the batch
+        upserted = {
+            rule_id: (violation_id, occurrence_count)
+            for violation_id, rule_id, occurrence_count in db.execute(
+                crud.upsert_open_findings_stmt().returning(
+                    Violation.id, Violation.rule_id, Violation.occurrence_count
+                ),
+                list(rows_by_rule.values())
+            ).all()
+        }
+
+        for rule_id in rows_by_rule:
+            violation_id, occurrence_count = upserted[rule_id]
+            for position, idx in enumerate(open_indexes[rule_id]):
+                is_new = occurrence_count == 1 and position == 0
+                results[idx]["status"] = "created" if is_new else "updated"
+                results[idx]["id"] = violation_id
+            if occurrence_count == 1:
+                created_count += 1
+                created_events.append(_violation_event(violation_id, agent_id, rule_id, severity_by_rule))
+
+        if created_count:
+            apply_unresolved_delta(db, agent_id, created_count)
+
+    record_rule_states(db, agent_id, rule_states)
+    db.commit()
+
+    if created_events:
+        manager.queue_events("violation_created", created_events)
+    if resolved:
+        manager.queue_events("violation_resolved", [
+            _violation_event(violation_id, agent_id, rule_id, severity_by_rule)
+            for violation_id, rule_id in resolved
+        ])
+
+    errors = [f"Violation {r['index']}: {r['error']}" for r in results if r["error"]]
+    updated_count = len(rows_by_rule) - created_count
+
+    return {
+        "message": (
+            f"Processed {len(violations_list) - len(errors)}/{len(violations_list)} results: "
+            f"{created_count} created, {updated_count} updated, {len(resolved)} resolved"
+        ),
+        "created_count": created_count,
+        "updated_count": updated_count,
+        "resolved_count": len(resolved),
+        "total_submitted": len(violations_list),
+        "errors": errors if errors else None,
+        "results": results
+    }
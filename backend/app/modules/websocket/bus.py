@@ -0,0 +1,148 @@
+"""
+Event bus relaying WebSocket events between API worker processes.
+
+Each worker sends events to its own clients directly; the bus carries the
+encoded event to the other workers so they can relay it to theirs.
+"""
+
+import asyncio
+import uuid
+from typing import Callable, List, Optional
+
+from loguru import logger
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+# Postgres NOTIFY payloads must be shorter than 8000 bytes
+NOTIFY_MAX_PAYLOAD = 7900
+
+# Seconds between checks of the LISTEN connection
+RECONNECT_INTERVAL = 5.0
+
+
+class EventBus:
+    """
+    In-process bus (default): a single worker has no one to relay to.
+
+    Backends override start/publish/stop. `deliver` is called with the
+    encoded text and topics (None: all clients) of every event published by
+    another worker.
+    """
+
+    # Largest message publish() accepts, in bytes (None: unlimited)
+    max_payload: Optional[int] = None
+
+    async def start(self, deliver: Callable[[str, Optional[List[str]]], None]):
+        """Start receiving events from other workers."""
+
+    def publish(self, text: str, topics: Optional[List[str]] = None):
+        """Queue an encoded event for the other workers (never blocks)."""
+
+    async def stop(self):
+        """Stop receiving and release connections."""
+
+
+class PostgresEventBus(EventBus):
+    """
+    Relay events through Postgres LISTEN/NOTIFY on one channel.
+
+    Every worker LISTENs on a dedicated asyncpg connection and NOTIFYs on a
+    second one, drained in order by a single sender task. Payloads are
+    "<origin> <topics> <text>": the origin id lets a worker skip its own
+    events (already sent to its clients), topics are comma-separated ("*"
+    for all clients). Events published while a connection is down are not
+    replayed.
+    """
+
+    max_payload = NOTIFY_MAX_PAYLOAD
+
+    def __init__(self, dsn: str, channel: str = settings.EVENT_BUS_CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self._deliver: Optional[Callable[[str, Optional[List[str]]], None]] = None
+        self._listen_conn = None
+        self._publish_conn = None
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._send_task: Optional[asyncio.Task] = None
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        origin, topics, text = payload.split(" ", 2)
+        if origin != self.origin and self._deliver is not None:
+            self._deliver(text, None if topics == "*" else topics.split(","))
+
+    async def _listen(self):
+        import asyncpg
+
+        self._listen_conn = await asyncpg.connect(self.dsn)
+        await self._listen_conn.add_listener(self.channel, self._on_notify)
+        logger.info(f"Event bus listening on '{self.channel}' (origin {self.origin})")
+
+    async def _watch(self):
+        """Re-establish the LISTEN connection if it drops."""
+        while True:
+            await asyncio.sleep(RECONNECT_INTERVAL)
+            if self._listen_conn is not None and not self._listen_conn.is_closed():
+                continue
+            try:
+                await self._listen()
+            except Exception as e:
+                logger.error(f"Event bus reconnect failed: {e}")
+
+    async def _send_loop(self):
+        import asyncpg
+
+        while True:
+            payload = await self._outbox.get()
+            try:
+                if self._publish_conn is None or self._publish_conn.is_closed():
+                    self._publish_conn = await asyncpg.connect(self.dsn)
+                await self._publish_conn.execute(
+                    "SELECT pg_notify($1, $2)", self.channel, f"{self.origin} {payload}"
+                )
+            except Exception as e:
+                logger.error(f"Event bus publish failed: {e}")
+
+    async def start(self, deliver: Callable[[str, Optional[List[str]]], None]):
+        self._deliver = deliver
+        try:
+            await self._listen()
+        except Exception as e:
+            logger.error(f"Event bus connect failed, retrying: {e}")
+        loop = asyncio.get_running_loop()
+        self._watch_task = loop.create_task(self._watch())
+        self._send_task = loop.create_task(self._send_loop())
+
+    def publish(self, text: str, topics: Optional[List[str]] = None):
+        self._outbox.put_nowait(f"{'*' if topics is None else ','.join(topics)} {text}")
+
+    async def stop(self):
+        for task in (self._watch_task, self._send_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._watch_task = self._send_task = None
+
+        for conn in (self._listen_conn, self._publish_conn):
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        self._listen_conn = self._publish_conn = None
+
+
+def create_event_bus(
+    backend: str = settings.EVENT_BUS,
+    channel: str = settings.EVENT_BUS_CHANNEL
+) -> EventBus:
+    """Build the configured bus: 'inprocess' (default) or 'postgres' on `channel`."""
+    if backend == "postgres":
+        # asyncpg takes a plain postgresql:// DSN (no SQLAlchemy driver suffix)
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+        return PostgresEventBus(dsn.render_as_string(hide_password=False), channel)
+    if backend != "inprocess":
+        raise ValueError(f"Unknown EVENT_BUS backend '{backend}'")
+    return EventBus()
@@ -2,6 +2,7 @@
 WebSocket routes for real-time updates
 """
 
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from .service import manager
 from loguru import logger
@@ -11,7 +12,11 @@ router = APIRouter()
 
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    resume_from: Optional[int] = None,
+    epoch: Optional[str] = None
+):
     """
     WebSocket endpoint for real-time updates
     
@@ -24,23 +29,33 @@ async def websocket_endpoint(websocket: WebSocket):
     - agent_status_changed: Agent online/offline status changed
     - agent_updated: Agent details updated
     - agent_deleted: Agent deleted
+    - rule_created: Rule created
     - rule_updated: Rule details updated
     - rule_toggled: Rule active status toggled
     - rule_deleted: Rule deleted
+    - stats_changed: Dashboard statistics changed (debounced, refetch /violations/stats)
+    - resync_required: Missed events cannot be replayed after a reconnect (refetch)
+    
+    Clients receive every event until they subscribe; after that only
+    events matching their topics:
+    
+        {"type": "subscribe", "topics": ["agent:42", "violations:severity=critical"]}
+        {"type": "unsubscribe", "topics": ["agent:42"]}
+    
+    Topics: violations, violations:severity=<severity>, agent:<id>, agents,
+    rule:<id>, rules, stats, and "*" for everything. Both messages are
+    answered with {"type": "subscribed", "topics": [...current topics]}.
+    
+    Every event carries a "seq" number. To resume after a disconnect,
+    reconnect with ?resume_from=<last seq>&epoch=<epoch from "connected">:
+    the missed events are replayed, or a resync_required event tells the
+    client to refetch.
     """
     client_id = str(uuid.uuid4())
     
     try:
-        await manager.connect(websocket, client_id)
-        
-        # Send welcome message
-        await manager.send_personal_message({
-            "event": "connected",
-            "data": {
-                "client_id": client_id,
-                "message": "Connected to Baseline Monitor WebSocket"
-            }
-        }, client_id)
+        # Sends the welcome message, then any replayed events
+        await manager.connect(websocket, client_id, resume_from, epoch)
         
         # Keep connection alive and listen for client messages
         while True:
@@ -52,6 +67,19 @@ async def websocket_endpoint(websocket: WebSocket):
                 await manager.send_personal_message({
                     "type": "pong"
                 }, client_id)
+            
+            elif data.get("type") in ("subscribe", "unsubscribe"):
+                topics = data.get("topics")
+                if not isinstance(topics, list):
+                    topics = []
+                if data["type"] == "subscribe":
+                    current = manager.subscribe(client_id, topics)
+                else:
+                    current = manager.unsubscribe(client_id, topics)
+                await manager.send_personal_message({
+                    "type": "subscribed",
+                    "topics": current
+                }, client_id)
     
     except WebSocketDisconnect:
         manager.disconnect(client_id)
@@ -60,3 +88,14 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"WebSocket error for client {client_id}: {e}")
         manager.disconnect(client_id)
+
+
+@router.get("/ws/stats")
+def websocket_stats():
+    """
+    WebSocket fan-out metrics.
+    
+    Per-client queue depth (total / max), messages dropped under the
+    drop_oldest policy and clients disconnected for falling behind.
+    """
+    return manager.get_stats()
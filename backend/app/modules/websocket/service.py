@@ -3,126 +3,611 @@ WebSocket Manager for real-time updates
 Handles client connections and broadcasts events
 """
 
-from typing import Dict, List
+import asyncio
+import json
+import uuid
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 from fastapi import WebSocket
 from loguru import logger
 
+from app.core.config import settings
+from app.core.serialization import json_dumps
+from .bus import EventBus, create_event_bus
+
+
+# Slow-consumer policies for a full client queue
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+# Close code for clients dropped for not keeping up (1013: try again later)
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+# Topic every event matches; clients start subscribed to it
+ALL_TOPICS = "*"
+
+# Events merged per coalescing window: {event: batch event}
+BATCH_EVENTS = {
+    "violation_created": "violations_created",
+    "violation_resolved": "violations_resolved",
+}
+
+# Reasons a resume_from reconnect cannot be replayed
+RESYNC_UNKNOWN_EPOCH = "unknown_epoch"      # server restarted or another worker
+RESYNC_GAP_TOO_OLD = "gap_too_old"          # missed events left the replay buffer
+
+# Limits on client subscriptions
+MAX_TOPICS_PER_CLIENT = 200
+MAX_TOPIC_LENGTH = 100
+
+
+def violation_topics(
+    agent_id: Optional[int] = None,
+    rule_id: Optional[int] = None,
+    severity: Optional[str] = None
+) -> List[str]:
+    """Topics of a violation event: violations, agent:<id>, rule:<id>, violations:severity=<s>"""
+    topics = ["violations"]
+    if agent_id is not None:
+        topics.append(f"agent:{agent_id}")
+    if rule_id is not None:
+        topics.append(f"rule:{rule_id}")
+    if severity:
+        topics.append(f"violations:severity={severity}")
+    return topics
+
+
+class ClientConnection:
+    """
+    One WebSocket client with a bounded outbound queue.
+    
+    A dedicated writer task drains the queue, so a slow client only delays
+    its own messages.
+    """
+    
+    def __init__(self, client_id: str, websocket: WebSocket, queue_size: int):
+        self.client_id = client_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.writer: Optional[asyncio.Task] = None
+        
+        # Subscribed topics; replaced by the first explicit subscribe
+        self.topics: Set[str] = {ALL_TOPICS}
+        self.explicit_topics = False
+    
+    def enqueue(self, text: str, policy: str) -> bool:
+        """Queue an encoded message. Returns False if the client should be dropped."""
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            if policy != DROP_OLDEST:
+                return False
+        
+        # Make room by discarding the oldest pending message
+        self.queue.get_nowait()
+        self.queue.put_nowait(text)
+        self.dropped += 1
+        return True
+
 
 class ConnectionManager:
     """Manages WebSocket connections and message broadcasting"""
     
-    def __init__(self):
-        # Active connections: {client_id: websocket}
-        self.active_connections: Dict[str, WebSocket] = {}
+    def __init__(
+        self,
+        stats_debounce: float = settings.STATS_PUSH_DEBOUNCE,
+        queue_size: int = settings.WS_SEND_QUEUE_SIZE,
+        slow_client_policy: str = settings.WS_SLOW_CLIENT_POLICY,
+        coalesce_window: float = settings.WS_COALESCE_WINDOW,
+        replay_buffer: int = settings.WS_REPLAY_BUFFER,
+        bus: Optional[EventBus] = None
+    ):
+        # Active connections: {client_id: ClientConnection}
+        self.active_connections: Dict[str, ClientConnection] = {}
+        
+        # Outbound queue bound and what to do when a client falls behind
+        self.queue_size = queue_size
+        self.slow_client_policy = slow_client_policy
+        
+        # Subscription index: {topic: {client_id}}
+        self._subscribers: Dict[str, Set[str]] = {ALL_TOPICS: set()}
+        
+        # Fan-out counters since startup
+        self.dropped_messages = 0
+        self.slow_disconnects = 0
+        
+        # Callbacks run with the event name after every data-change broadcast
+        self._listeners: List[Callable[[str], None]] = []
+        
+        # Callbacks run with the event name for events relayed from other workers
+        self._remote_listeners: List[Callable[[str], None]] = []
+        
+        # Relays events to/from other worker processes
+        self.bus = bus or create_event_bus()
+        
+        # Sequence numbers stamped on broadcasts; only comparable within one epoch
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        
+        # Recent broadcasts for resume_from replay: deque of (seq, text, topics)
+        self._history: deque = deque(maxlen=replay_buffer)
+        
+        # Violation events waiting for the coalescing window: {event: [(data, topics)]}
+        self.coalesce_window = coalesce_window
+        self._batches: Dict[str, List[Tuple[dict, List[str]]]] = {}
+        self._batch_task: Optional[asyncio.Task] = None
+        
+        # Debounced stats_changed push
+        self.stats_debounce = stats_debounce
+        self._stats_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def add_listener(self, callback: Callable[[str], None]):
+        """Register a callback invoked with the event name on each data-change broadcast"""
+        self._listeners.append(callback)
+    
+    def add_remote_listener(self, callback: Callable[[str], None]):
+        """Register a callback invoked with the event name for events from other workers"""
+        self._remote_listeners.append(callback)
+    
+    def _notify_listeners(self, event: str):
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Broadcast listener failed for {event}: {e}")
+    
+    def _call_on_loop(self, callback: Callable[[], None]):
+        """Run callback on the event loop; from a threadpool thread, schedule it there."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(callback)
+            return
+        callback()
+    
+    def notify_stats_changed(self):
+        """
+        Schedule one stats_changed event after the debounce window.
+        
+        Safe to call from sync handlers running in the threadpool.
+        Further calls inside the window are coalesced into the same push.
+        """
+        self._call_on_loop(self._schedule_stats_changed)
+    
+    def _schedule_stats_changed(self):
+        if self._stats_task is None or self._stats_task.done():
+            self._stats_task = asyncio.get_running_loop().create_task(self._emit_stats_changed())
+    
+    async def _emit_stats_changed(self):
+        await asyncio.sleep(self.stats_debounce)
+        self._stats_task = None
+        await self.broadcast({"event": "stats_changed", "data": {}}, topics=["stats"])
+    
+    def queue_events(self, event: str, items: List[dict]):
+        """
+        Queue violation events for the next coalescing window.
+        
+        Safe to call from sync handlers running in the threadpool. Items
+        queued within one window go out as one batch message.
+        """
+        self._call_on_loop(lambda: self._add_to_batch(event, items))
+    
+    def _add_to_batch(self, event: str, items: List[dict]):
+        batch = self._batches.setdefault(event, [])
+        for data in items:
+            topics = violation_topics(data.get("agent_id"), data.get("rule_id"), data.get("severity"))
+            batch.append((data, topics))
+        
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.get_running_loop().create_task(self._emit_batches())
+    
+    async def _emit_batches(self):
+        await asyncio.sleep(self.coalesce_window)
+        self._batch_task = None
+        self._flush_batches()
     
-    async def connect(self, websocket: WebSocket, client_id: str):
-        """Accept and register a new client connection"""
+    def _flush_batches(self):
+        """
+        Send queued violation events: a lone event as-is, several of the same
+        type as one batch message with counts and ids.
+        """
+        batches, self._batches = self._batches, {}
+        
+        for event, items in batches.items():
+            if len(items) == 1:
+                data, topics = items[0]
+                self._send({"event": event, "data": data}, topics=topics)
+                logger.info(f"Broadcasted {event}: {data.get('id')}")
+                continue
+            
+            topics = set()
+            for _, item_topics in items:
+                topics.update(item_topics)
+            
+            self._send({
+                "event": BATCH_EVENTS[event],
+                "data": {
+                    "count": len(items),
+                    "ids": [data.get("id") for data, _ in items],
+                    "agent_ids": sorted({data["agent_id"] for data, _ in items if data.get("agent_id") is not None}),
+                    "rule_ids": sorted({data["rule_id"] for data, _ in items if data.get("rule_id") is not None})
+                }
+            }, topics=sorted(topics))
+            logger.info(f"Broadcasted {BATCH_EVENTS[event]}: {len(items)} event(s)")
+    
+    async def connect(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        resume_from: Optional[int] = None,
+        epoch: Optional[str] = None
+    ):
+        """
+        Accept and register a new client connection and queue its welcome
+        message.
+        
+        A reconnecting client passes the last seq it received (and the epoch
+        from its previous welcome message): the events it missed are queued
+        right after the welcome, before any new broadcast. If they cannot be
+        replayed it gets a resync_required event instead and should refetch.
+        """
+        self._loop = asyncio.get_running_loop()
         await websocket.accept()
-        self.active_connections[client_id] = websocket
+        client = ClientConnection(client_id, websocket, self.queue_size)
+        client.writer = self._loop.create_task(self._write_loop(client))
+        self.active_connections[client_id] = client
+        self._subscribers[ALL_TOPICS].add(client_id)
         logger.info(f"WebSocket client connected: {client_id}. Total: {len(self.active_connections)}")
+        
+        # No await from here on: nothing can be broadcast between the replay and live events
+        self._enqueue(client, json_dumps({
+            "event": "connected",
+            "data": {
+                "client_id": client_id,
+                "message": "Connected to Baseline Monitor WebSocket",
+                "seq": self.seq,
+                "epoch": self.epoch
+            }
+        }).decode("utf-8"))
+        
+        if resume_from is not None:
+            self._resume(client, resume_from, epoch)
+    
+    def _resume(self, client: ClientConnection, resume_from: int, epoch: Optional[str]):
+        """Queue the events after resume_from, or resync_required if that is not possible"""
+        reason = None
+        if epoch != self.epoch or resume_from > self.seq:
+            reason = RESYNC_UNKNOWN_EPOCH
+        elif resume_from < self.seq and (not self._history or self._history[0][0] > resume_from + 1):
+            reason = RESYNC_GAP_TOO_OLD
+        
+        missed = []
+        if reason is None:
+            # History is ordered by seq; walk back from the newest event
+            for seq, text, topics in reversed(self._history):
+                if seq <= resume_from:
+                    break
+                if topics is None or ALL_TOPICS in client.topics or client.topics.intersection(topics):
+                    missed.append(text)
+            # Leave room for the welcome message; a replay that overflows the queue is not a replay
+            if len(missed) >= self.queue_size - 1:
+                reason = RESYNC_GAP_TOO_OLD
+        
+        if reason is not None:
+            self._enqueue(client, json_dumps({
+                "event": "resync_required",
+                "data": {"seq": self.seq, "epoch": self.epoch, "reason": reason}
+            }).decode("utf-8"))
+            logger.info(f"WebSocket client {client.client_id} must resync from {resume_from}: {reason}")
+            return
+        
+        for text in reversed(missed):
+            self._enqueue(client, text)
+        logger.info(f"Replayed {len(missed)} event(s) to {client.client_id} from seq {resume_from}")
     
     def disconnect(self, client_id: str):
         """Remove a client from active connections"""
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
+        client = self.active_connections.pop(client_id, None)
+        if client is not None:
+            self._unindex(client_id, client.topics)
+            self.dropped_messages += client.dropped
+            if client.writer is not None:
+                client.writer.cancel()
             logger.info(f"WebSocket client disconnected: {client_id}. Total: {len(self.active_connections)}")
     
+    def _unindex(self, client_id: str, topics: Iterable[str]):
+        for topic in topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(client_id)
+                if not subscribers and topic != ALL_TOPICS:
+                    del self._subscribers[topic]
+    
+    def subscribe(self, client_id: str, topics: Iterable[str]) -> List[str]:
+        """
+        Subscribe a client to topics; returns its current subscriptions.
+        
+        A new client receives every event ("*"); its first subscribe replaces
+        that with the given topics. Invalid topics and topics beyond
+        MAX_TOPICS_PER_CLIENT are ignored.
+        """
+        client = self.active_connections.get(client_id)
+        if client is None:
+            return []
+        
+        if not client.explicit_topics:
+            self._unindex(client_id, client.topics)
+            client.topics = set()
+            client.explicit_topics = True
+        
+        for topic in topics:
+            if len(client.topics) >= MAX_TOPICS_PER_CLIENT:
+                break
+            if isinstance(topic, str) and 0 < len(topic) <= MAX_TOPIC_LENGTH:
+                client.topics.add(topic)
+                self._subscribers.setdefault(topic, set()).add(client_id)
+        
+        return sorted(client.topics)
+    
+    def unsubscribe(self, client_id: str, topics: Iterable[str]) -> List[str]:
+        """Unsubscribe a client from topics; returns its current subscriptions."""
+        client = self.active_connections.get(client_id)
+        if client is None:
+            return []
+        
+        removed = client.topics.intersection(t for t in topics if isinstance(t, str))
+        client.topics -= removed
+        client.explicit_topics = True
+        self._unindex(client_id, removed)
+        return sorted(client.topics)
+    
+    def _recipients(self, topics: Optional[Iterable[str]]) -> Set[str]:
+        """Client ids subscribed to any of the topics (all clients if topics is None)"""
+        if topics is None:
+            return set(self.active_connections)
+        
+        recipients = set(self._subscribers[ALL_TOPICS])
+        for topic in topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers:
+                recipients |= subscribers
+        return recipients
+    
+    async def _write_loop(self, client: ClientConnection):
+        """Send a client's queued messages in order until it disconnects"""
+        try:
+            while True:
+                text = await client.queue.get()
+                await client.websocket.send_text(text)
+        except Exception as e:
+            logger.error(f"Error sending message to {client.client_id}: {e}")
+            self.disconnect(client.client_id)
+    
+    def _drop_slow_client(self, client: ClientConnection):
+        """Disconnect a client whose queue is full (disconnect policy)"""
+        self.slow_disconnects += 1
+        logger.warning(f"WebSocket client {client.client_id} too slow, disconnecting")
+        self.disconnect(client.client_id)
+        asyncio.get_running_loop().create_task(self._close_quietly(client.websocket))
+    
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            await websocket.close(code=SLOW_CLIENT_CLOSE_CODE)
+        except Exception:
+            pass
+    
+    def _enqueue(self, client: ClientConnection, text: str):
+        if not client.enqueue(text, self.slow_client_policy):
+            self._drop_slow_client(client)
+    
     async def send_personal_message(self, message: dict, client_id: str):
-        """Send message to a specific client"""
-        if client_id in self.active_connections:
-            try:
-                await self.active_connections[client_id].send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending message to {client_id}: {e}")
-                self.disconnect(client_id)
+        """Send message to a specific client (queued behind pending broadcasts)"""
+        client = self.active_connections.get(client_id)
+        if client is not None:
+            self._enqueue(client, json_dumps(message).decode("utf-8"))
     
-    async def broadcast(self, message: dict, exclude: List[str] = None):
-        """Broadcast message to all connected clients (optionally exclude some)"""
-        exclude = exclude or []
-        disconnected = []
+    async def broadcast(
+        self,
+        message: dict,
+        exclude: List[str] = None,
+        topics: Optional[Iterable[str]] = None
+    ):
+        """
+        Broadcast message to clients subscribed to any of `topics` (all
+        clients if topics is None), optionally excluding some.
         
-        for client_id, connection in self.active_connections.items():
-            if client_id not in exclude:
+        Recipients come from the subscription index, so the cost depends on
+        the matching clients, not on all connections. The message is encoded
+        once and queued for each recipient; this never waits on a socket, so
+        one slow client cannot hold up the others or the request that
+        triggered the broadcast.
+        """
+        # Queued violation events happened first; send them before this one
+        if self._batches:
+            self._flush_batches()
+        self._send(message, exclude, topics)
+    
+    def _send(
+        self,
+        message: dict,
+        exclude: List[str] = None,
+        topics: Optional[Iterable[str]] = None
+    ):
+        topics = list(topics) if topics is not None else None
+        text = json_dumps(message).decode("utf-8")
+        self._fan_out(self._sequence(text, topics), topics, exclude)
+        self._publish(message, text, topics)
+    
+    def _sequence(self, text: str, topics: Optional[List[str]]) -> str:
+        """
+        Stamp an encoded event with the next seq and record it for replay.
+        
+        Spliced into the JSON text rather than re-encoded; events are relayed
+        between workers unstamped and each worker numbers them itself.
+        """
+        self.seq += 1
+        text = f'{{"seq":{self.seq},{text[1:]}'
+        self._history.append((self.seq, text, topics))
+        return text
+    
+    def _fan_out(self, text: str, topics: Optional[List[str]], exclude: List[str] = None):
+        recipients = self._recipients(topics)
+        if exclude:
+            recipients.difference_update(exclude)
+        
+        for client_id in recipients:
+            client = self.active_connections.get(client_id)
+            if client is not None:
+                self._enqueue(client, text)
+    
+    def _publish(self, message: dict, text: str, topics: Optional[List[str]]):
+        """Relay an encoded event to the other workers"""
+        max_payload = self.bus.max_payload
+        if max_payload is not None and len(text.encode("utf-8")) + len(",".join(topics or ())) > max_payload:
+            # Too big for the bus; other workers' clients get the event without its
+            # data, matched on collection topics only (e.g. "agents", not "agent:42")
+            text = json_dumps({"event": message.get("event"), "data": {"truncated": True}}).decode("utf-8")
+            topics = [topic for topic in topics if ":" not in topic] if topics is not None else None
+        self.bus.publish(text, topics)
+    
+    def _relay(self, text: str, topics: Optional[List[str]]):
+        """Deliver an event published by another worker to local clients"""
+        self._fan_out(self._sequence(text, topics), topics)
+        
+        if self._remote_listeners:
+            event = json.loads(text).get("event", "")
+            for callback in self._remote_listeners:
                 try:
-                    await connection.send_json(message)
+                    callback(event)
                 except Exception as e:
-                    logger.error(f"Error broadcasting to {client_id}: {e}")
-                    disconnected.append(client_id)
-        
-        # Clean up disconnected clients
-        for client_id in disconnected:
-            self.disconnect(client_id)
+                    logger.error(f"Remote listener failed for {event}: {e}")
+    
+    async def start(self):
+        """Start relaying events between workers (call from the app's event loop)"""
+        self._loop = asyncio.get_running_loop()
+        await self.bus.start(self._relay)
+    
+    async def stop(self):
+        """Send queued violation events and stop the event bus"""
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            self._batch_task = None
+        self._flush_batches()
+        await self.bus.stop()
+    
+    def get_stats(self) -> dict:
+        """Fan-out metrics: queue depth per client, dropped messages, slow disconnects"""
+        depths = [client.queue.qsize() for client in self.active_connections.values()]
+        return {
+            "clients": len(depths),
+            "topics": len(self._subscribers),
+            "queue_size": self.queue_size,
+            "slow_client_policy": self.slow_client_policy,
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "dropped_messages": self.dropped_messages + sum(
+                client.dropped for client in self.active_connections.values()
+            ),
+            "slow_disconnects": self.slow_disconnects,
+            "seq": self.seq,
+            "replay_buffer": len(self._history)
+        }
     
     async def broadcast_violation_created(self, violation_data: dict):
-        """Broadcast when a new violation is created"""
-        await self.broadcast({
-            "event": "violation_created",
-            "data": violation_data
-        })
-        logger.info(f"Broadcasted violation_created: {violation_data.get('id')}")
+        """Broadcast when a new violation is created (coalesced, see queue_events)"""
+        self._notify_listeners("violation_created")
+        self._add_to_batch("violation_created", [violation_data])
     
     async def broadcast_violation_resolved(self, violation_data: dict):
-        """Broadcast when a violation is resolved"""
-        await self.broadcast({
-            "event": "violation_resolved",
-            "data": violation_data
-        })
-        logger.info(f"Broadcasted violation_resolved: {violation_data.get('id')}")
+        """Broadcast when a violation is resolved (coalesced, see queue_events)"""
+        self._notify_listeners("violation_resolved")
+        self._add_to_batch("violation_resolved", [violation_data])
     
-    async def broadcast_violation_deleted(self, violation_id: str):
-        """Broadcast when a violation is deleted"""
+    async def broadcast_violation_deleted(
+        self,
+        violation_id: str,
+        agent_id: Optional[int] = None,
+        rule_id: Optional[int] = None,
+        severity: Optional[str] = None
+    ):
+        """Broadcast when a violation is deleted (agent/rule/severity select the topics)"""
+        self._notify_listeners("violation_deleted")
         await self.broadcast({
             "event": "violation_deleted",
             "data": {"id": violation_id}
-        })
+        }, topics=violation_topics(agent_id, rule_id, severity))
         logger.info(f"Broadcasted violation_deleted: {violation_id}")
     
     async def broadcast_agent_status_changed(self, agent_data: dict):
-        """Broadcast when agent status changes (online/offline)"""
+        """Broadcast when agent status changes (online/offline), single agent or a batch"""
+        self._notify_listeners("agent_status_changed")
+        agent_ids = agent_data.get("agent_ids", [agent_data.get("id")])
         await self.broadcast({
             "event": "agent_status_changed",
             "data": agent_data
-        })
-        logger.info(f"Broadcasted agent_status_changed: {agent_data.get('id')}")
+        }, topics=["agents"] + [f"agent:{agent_id}" for agent_id in agent_ids if agent_id is not None])
+        if "agent_ids" in agent_data:
+            logger.info(f"Broadcasted agent_status_changed: {len(agent_data['agent_ids'])} agent(s)")
+        else:
+            logger.info(f"Broadcasted agent_status_changed: {agent_data.get('id')}")
     
     async def broadcast_agent_updated(self, agent_data: dict):
         """Broadcast when agent details are updated"""
+        self._notify_listeners("agent_updated")
         await self.broadcast({
             "event": "agent_updated",
             "data": agent_data
-        })
+        }, topics=["agents", f"agent:{agent_data.get('id')}"])
         logger.info(f"Broadcasted agent_updated: {agent_data.get('id')}")
     
     async def broadcast_agent_deleted(self, agent_id: str):
         """Broadcast when an agent is deleted"""
+        self._notify_listeners("agent_deleted")
         await self.broadcast({
             "event": "agent_deleted",
             "data": {"id": agent_id}
-        })
+        }, topics=["agents", f"agent:{agent_id}"])
         logger.info(f"Broadcasted agent_deleted: {agent_id}")
     
+    async def broadcast_rule_created(self, rule_data: dict):
+        """Broadcast when a rule is created"""
+        self._notify_listeners("rule_created")
+        await self.broadcast({
+            "event": "rule_created",
+            "data": rule_data
+        }, topics=["rules", f"rule:{rule_data.get('id')}"])
+        logger.info(f"Broadcasted rule_created: {rule_data.get('id')}")
+    
     async def broadcast_rule_updated(self, rule_data: dict):
         """Broadcast when a rule is updated"""
+        self._notify_listeners("rule_updated")
         await self.broadcast({
             "event": "rule_updated",
             "data": rule_data
-        })
+        }, topics=["rules", f"rule:{rule_data.get('id')}"])
         logger.info(f"Broadcasted rule_updated: {rule_data.get('id')}")
     
     async def broadcast_rule_toggled(self, rule_data: dict):
         """Broadcast when a rule is toggled (active/inactive)"""
+        self._notify_listeners("rule_toggled")
         await self.broadcast({
             "event": "rule_toggled",
             "data": rule_data
-        })
+        }, topics=["rules", f"rule:{rule_data.get('id')}"])
         logger.info(f"Broadcasted rule_toggled: {rule_data.get('id')}")
     
     async def broadcast_rule_deleted(self, rule_id: str):
         """Broadcast when a rule is deleted"""
+        self._notify_listeners("rule_deleted")
         await self.broadcast({
             "event": "rule_deleted",
             "data": {"id": rule_id}
-        })
+        }, topics=["rules", f"rule:{rule_id}"])
         logger.info(f"Broadcasted rule_deleted: {rule_id}")
 
 
@@ -0,0 +1,128 @@
+"""
+Script benchmark các query nóng của bảng violations (EXPLAIN ANALYZE).
+
+Chạy trước và sau migration b8d41f6e0a27 để so sánh plan / thời gian:
+
+Usage:
+    python scripts/benchmark_indexes.py --seed 10000000     # sinh dữ liệu giả (chỉ dùng DB test!)
+    python scripts/benchmark_indexes.py --label before
+    alembic upgrade head
+    python scripts/benchmark_indexes.py --label after
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add parent directory to path so we can import 'app'
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+
+# (name, SQL) - các query tương ứng với list / filter / compliance trong API
+HOT_QUERIES = [
+    ("list_recent",
+     "SELECT * FROM violations ORDER BY detected_at DESC, id DESC LIMIT 50"),
+    ("list_by_agent",
+     "SELECT * FROM violations WHERE agent_id = :agent_id "
+     "ORDER BY detected_at DESC, id DESC LIMIT 50"),
+    ("list_by_rule",
+     "SELECT * FROM violations WHERE rule_id = :rule_id "
+     "ORDER BY detected_at DESC, id DESC LIMIT 50"),
+    ("unresolved_by_agent",
+     "SELECT COUNT(*) FROM violations WHERE agent_id = :agent_id AND resolved_at IS NULL"),
+    ("unresolved_per_agent",
+     "SELECT agent_id, COUNT(*) FROM violations WHERE resolved_at IS NULL GROUP BY agent_id"),
+    ("last_7_days",
+     "SELECT date_trunc('day', detected_at), COUNT(*) FROM violations "
+     "WHERE detected_at >= now() - interval '7 days' GROUP BY 1"),
+]
+
+
+def seed_violations(conn, rows: int, agents: int):
+    """Sinh dữ liệu giả bằng generate_series (nhanh hơn nhiều so với insert từ Python)."""
+    print(f" Seeding {rows:,} violations across {agents} agents...")
+
+    conn.execute(text(
+        "INSERT INTO agents (hostname, ip_address, os, version, is_online) "
+        "SELECT 'bench-' || g, '10.0.0.' || (g % 255), 'linux', 'bench', false "
+        "FROM generate_series(1, :agents) g "
+        "WHERE NOT EXISTS (SELECT 1 FROM agents WHERE hostname = 'bench-' || g)"
+    ), {"agents": agents})
+
+    rule_ids = conn.execute(text("SELECT id FROM rules")).scalars().all()
+    if not rule_ids:
+        raise SystemExit(" No rules in database - run scripts/seed_data.py first")
+
+    # uq_violations_open_finding: tối đa một finding chưa resolve cho mỗi
+    # (agent_id, rule_id) → chỉ dòng đầu tiên của mỗi cặp (và chỉ khi cặp đó
+    # chưa có finding mở từ lần seed trước) được để resolved_at = NULL
+    conn.execute(text(
+        "INSERT INTO violations (agent_id, rule_id, message, confidence_score, detected_at, resolved_at) "
+        "SELECT s.agent_id, s.rule_id, 'benchmark violation', 1.0, s.detected_at, "
+        "       CASE WHEN s.want_open "
+        "             AND row_number() OVER (PARTITION BY s.agent_id, s.rule_id, s.want_open ORDER BY s.g) = 1 "
+        "             AND NOT EXISTS (SELECT 1 FROM violations v WHERE v.agent_id = s.agent_id "
+        "                             AND v.rule_id = s.rule_id AND v.resolved_at IS NULL) "
+        "            THEN NULL ELSE now() END "
+        "FROM (SELECT g, "
+        "             a.ids[1 + (g % array_length(a.ids, 1))] AS agent_id, "
+        "             r.ids[1 + (g % array_length(r.ids, 1))] AS rule_id, "
+        "             now() - (g % 43200) * interval '1 minute' AS detected_at, "
+        "             g % 5 = 0 AS want_open "
+        "      FROM generate_series(1, :rows) g, "
+        "           (SELECT array_agg(id) AS ids FROM agents WHERE hostname LIKE 'bench-%') a, "
+        "           (SELECT array_agg(id) AS ids FROM rules) r) s"
+    ), {"rows": rows})
+    conn.execute(text("ANALYZE violations"))
+    print(" Seed done")
+
+
+def explain(conn, sql: str, params: dict):
+    """Chạy EXPLAIN (ANALYZE, BUFFERS) và trả về (plan, execution time ms)."""
+    plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params).scalars().all()
+    exec_ms = None
+    for line in plan:
+        if line.startswith("Execution Time:"):
+            exec_ms = float(line.split(":")[1].strip().split()[0])
+    return plan, exec_ms
+
+
+def run_benchmark(label: str, verbose: bool):
+    """In plan + thời gian của từng hot query."""
+    with engine.connect() as conn:
+        params = {
+            "agent_id": conn.execute(text(
+                "SELECT agent_id FROM violations GROUP BY agent_id ORDER BY COUNT(*) DESC LIMIT 1"
+            )).scalar(),
+            "rule_id": conn.execute(text(
+                "SELECT rule_id FROM violations GROUP BY rule_id ORDER BY COUNT(*) DESC LIMIT 1"
+            )).scalar(),
+        }
+        total = conn.execute(text("SELECT COUNT(*) FROM violations")).scalar()
+
+        print(f"\n Benchmark [{label}] - {total:,} violations")
+        print("=" * 60)
+
+        for name, sql in HOT_QUERIES:
+            plan, exec_ms = explain(conn, sql, params)
+            print(f"{name:<24} {exec_ms if exec_ms is not None else '?':>10} ms")
+            if verbose:
+                for line in plan:
+                    print(f"    {line}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark violation hot-path queries")
+    parser.add_argument("--label", default="current", help="Tên lần chạy (before/after)")
+    parser.add_argument("--seed", type=int, default=0, help="Số violations giả cần sinh (vd 10000000)")
+    parser.add_argument("--agents", type=int, default=500, help="Số agents giả khi seed")
+    parser.add_argument("--quiet", action="store_true", help="Không in plan chi tiết")
+    args = parser.parse_args()
+
+    if args.seed:
+        with engine.begin() as conn:
+            seed_violations(conn, args.seed, args.agents)
+
+    run_benchmark(args.label, verbose=not args.quiet)
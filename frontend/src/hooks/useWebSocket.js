@@ -3,6 +3,9 @@ import { useEffect, useRef, useState, useCallback } from 'react';
 const WS_URL = import.meta.env.VITE_WS_URL || 'ws://localhost:8000/api/v1/ws';
 const RECONNECT_DELAY = 3000;
 const PING_INTERVAL = 30000;
+// Spread reconnects and refetches of many tabs after a backend restart
+const RECONNECT_JITTER = 2000;
+const RESYNC_JITTER = 5000;
 
 /**
  * Custom hook for WebSocket connection with auto-reconnect
@@ -10,12 +13,18 @@ const PING_INTERVAL = 30000;
  * @param {Object} options - Configuration options
  * @param {Function} options.onViolationCreated - Callback for new violations
  * @param {Function} options.onViolationResolved - Callback for resolved violations
+ * @param {Function} options.onViolationsCreated - Callback for a batch of new violations (coalesced server-side)
+ * @param {Function} options.onViolationsResolved - Callback for a batch of resolved violations (coalesced server-side)
  * @param {Function} options.onViolationDeleted - Callback for deleted violations
  * @param {Function} options.onAgentUpdated - Callback for agent updates
+ * @param {Function} options.onAgentStatusChanged - Callback for online/offline changes (batched server-side)
  * @param {Function} options.onAgentDeleted - Callback for agent deletions
+ * @param {Function} options.onRuleCreated - Callback for new rules
  * @param {Function} options.onRuleUpdated - Callback for rule updates
  * @param {Function} options.onRuleToggled - Callback for rule toggle
  * @param {Function} options.onRuleDeleted - Callback for rule deletions
+ * @param {Function} options.onStatsChanged - Callback when dashboard stats changed (debounced server-side)
+ * @param {Function} options.onResync - Callback when missed events could not be replayed after a reconnect (refetch everything)
  * @param {boolean} options.autoConnect - Auto-connect on mount (default: true)
  * @returns {Object} - { isConnected, reconnect, disconnect }
  */
@@ -23,12 +32,18 @@ export function useWebSocket(options = {}) {
   const {
     onViolationCreated,
     onViolationResolved,
+    onViolationsCreated,
+    onViolationsResolved,
     onViolationDeleted,
     onAgentUpdated,
+    onAgentStatusChanged,
     onAgentDeleted,
+    onRuleCreated,
     onRuleUpdated,
     onRuleToggled,
     onRuleDeleted,
+    onStatsChanged,
+    onResync,
     autoConnect = true
   } = options;
 
@@ -37,6 +52,10 @@ export function useWebSocket(options = {}) {
   const reconnectTimeoutRef = useRef(null);
   const pingIntervalRef = useRef(null);
   const shouldReconnectRef = useRef(true);
+  const resyncTimeoutRef = useRef(null);
+  // Last event seq received and the server epoch it belongs to, for resume_from
+  const lastSeqRef = useRef(null);
+  const epochRef = useRef(null);
 
   const clearTimers = useCallback(() => {
     if (reconnectTimeoutRef.current) {
@@ -62,10 +81,30 @@ export function useWebSocket(options = {}) {
     try {
       const message = JSON.parse(event.data);
       
+      if (typeof message.seq === 'number') {
+        lastSeqRef.current = message.seq;
+      }
+      
       // Handle different event types
       switch (message.event) {
         case 'connected':
           console.log('WebSocket connected:', message.data);
+          // Fresh session: start counting from here (a resume keeps its seq for the replay)
+          if (epochRef.current !== message.data.epoch) {
+            epochRef.current = message.data.epoch;
+            lastSeqRef.current = message.data.seq;
+          }
+          break;
+        
+        case 'resync_required':
+          console.log('WebSocket resync required:', message.data.reason);
+          epochRef.current = message.data.epoch;
+          lastSeqRef.current = message.data.seq;
+          clearTimeout(resyncTimeoutRef.current);
+          resyncTimeoutRef.current = setTimeout(
+            () => onResync?.(message.data),
+            Math.random() * RESYNC_JITTER
+          );
           break;
         
         case 'violation_created':
@@ -76,6 +115,14 @@ export function useWebSocket(options = {}) {
           onViolationResolved?.(message.data);
           break;
         
+        case 'violations_created':
+          onViolationsCreated?.(message.data);
+          break;
+        
+        case 'violations_resolved':
+          onViolationsResolved?.(message.data);
+          break;
+        
         case 'violation_deleted':
           onViolationDeleted?.(message.data);
           break;
@@ -84,10 +131,18 @@ export function useWebSocket(options = {}) {
           onAgentUpdated?.(message.data);
           break;
         
+        case 'agent_status_changed':
+          onAgentStatusChanged?.(message.data);
+          break;
+        
         case 'agent_deleted':
           onAgentDeleted?.(message.data);
           break;
         
+        case 'rule_created':
+          onRuleCreated?.(message.data);
+          break;
+        
         case 'rule_updated':
           onRuleUpdated?.(message.data);
           break;
@@ -100,6 +155,10 @@ export function useWebSocket(options = {}) {
           onRuleDeleted?.(message.data);
           break;
         
+        case 'stats_changed':
+          onStatsChanged?.(message.data);
+          break;
+        
         default:
           // Handle pong or unknown messages
           if (message.type !== 'pong') {
@@ -112,12 +171,18 @@ export function useWebSocket(options = {}) {
   }, [
     onViolationCreated,
     onViolationResolved,
+    onViolationsCreated,
+    onViolationsResolved,
     onViolationDeleted,
     onAgentUpdated,
+    onAgentStatusChanged,
     onAgentDeleted,
+    onRuleCreated,
     onRuleUpdated,
     onRuleToggled,
-    onRuleDeleted
+    onRuleDeleted,
+    onStatsChanged,
+    onResync
   ]);
 
   const connect = useCallback(() => {
@@ -126,8 +191,12 @@ export function useWebSocket(options = {}) {
     }
 
     try {
-      console.log('Connecting to WebSocket:', WS_URL);
-      const ws = new WebSocket(WS_URL);
+      // Resume where the previous connection left off (server replays the gap)
+      const url = epochRef.current && lastSeqRef.current !== null
+        ? `${WS_URL}?resume_from=${lastSeqRef.current}&epoch=${epochRef.current}`
+        : WS_URL;
+      console.log('Connecting to WebSocket:', url);
+      const ws = new WebSocket(url);
 
       ws.onopen = () => {
         console.log('WebSocket connected');
@@ -149,8 +218,9 @@ export function useWebSocket(options = {}) {
 
         // Auto-reconnect if enabled
         if (shouldReconnectRef.current) {
-          console.log(`Reconnecting in ${RECONNECT_DELAY / 1000}s...`);
-          reconnectTimeoutRef.current = setTimeout(connect, RECONNECT_DELAY);
+          const delay = RECONNECT_DELAY + Math.random() * RECONNECT_JITTER;
+          console.log(`Reconnecting in ${(delay / 1000).toFixed(1)}s...`);
+          reconnectTimeoutRef.current = setTimeout(connect, delay);
         }
       };
 
@@ -164,6 +234,7 @@ export function useWebSocket(options = {}) {
   const disconnect = useCallback(() => {
     shouldReconnectRef.current = false;
     clearTimers();
+    clearTimeout(resyncTimeoutRef.current);
     
     if (wsRef.current) {
       wsRef.current.close();
@@ -72,8 +72,6 @@ export default function Dashboard() {
   // WebSocket connection with real-time updates
   const { isConnected } = useWebSocket({
     onViolationCreated: (data) => {
-      // Refresh stats when new violation is created
-      fetchAllStats();
       fetchRecentViolations();
       
       // Show toast notification for critical violations
@@ -85,23 +83,36 @@ export default function Dashboard() {
       }
     },
     onViolationResolved: () => {
-      // Refresh stats when violation is resolved
-      fetchAllStats();
+      fetchRecentViolations();
+    },
+    onViolationsCreated: () => {
+      // One event per ingest burst, however many findings it opened
+      fetchRecentViolations();
+    },
+    onViolationsResolved: () => {
       fetchRecentViolations();
     },
     onViolationDeleted: () => {
-      // Refresh stats when violation is deleted
-      fetchAllStats();
       fetchRecentViolations();
     },
     onAgentUpdated: () => {
-      // Refresh agent stats
       fetchAgents();
-      fetchAllStats();
+    },
+    onAgentStatusChanged: () => {
+      // One event per offline sweep, however many agents it flipped
+      fetchAgents();
     },
     onAgentDeleted: () => {
-      // Refresh agent stats
       fetchAgents();
+    },
+    onStatsChanged: () => {
+      // Server coalesces bursts of changes into one stats_changed event
+      fetchAllStats();
+    },
+    onResync: () => {
+      // Missed events could not be replayed (e.g. backend restarted)
+      fetchAgents();
+      fetchRecentViolations();
       fetchAllStats();
     }
   });